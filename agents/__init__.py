@@ -14,6 +14,10 @@ class Incident(BaseModel):
     time_in_service: Optional[str] = None
     notes: Optional[str] = None
     lab_summary: Optional[str] = None
+    # from uploaded photos (/api/analyze/joint): predicted damage class and
+    # the mechanisms it points to, which lead the reasoner's candidate list
+    visual_damage: Optional[str] = None
+    visual_mechanisms: List[str] = []
 
 class SimilarCase(BaseModel):
     id: str
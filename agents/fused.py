@@ -0,0 +1,53 @@
+from typing import List, Tuple
+from agents import Incident, SimilarCase, MechanismsOut, Mechanism, RecsOut
+from agents.reasoner import _candidate_list
+from agents.recommender import _gaps
+from utils.llm import call_llm
+from utils.prompts import FUSED_SYS
+import json
+from dotenv import load_dotenv
+load_dotenv()
+
+def build_fused_prompt(case: Incident,
+                       similar_cases: List[SimilarCase],
+                       handbook_snips: List[dict]) -> str:
+    candidates = _candidate_list(handbook_snips, similar_cases, case=case)
+
+    return f"""{FUSED_SYS}
+
+New case JSON:
+{case.model_dump()}
+
+Candidate mechanisms: {candidates}
+
+Similar cases (id/title/snippet/mechanism/similarity):
+{[c.model_dump() for c in similar_cases]}
+
+Handbook excerpts (ids/sources only):
+{[{"id": s.get("id"), "source": s.get("source") or (s.get("metadata") or {}).get("source")} for s in handbook_snips]}
+
+Choose 1–3 mechanisms, then give recommendations for them.
+Return JSON only."""
+
+def parse_fused(raw: str, case: Incident) -> Tuple[MechanismsOut, RecsOut]:
+    """Validate a fused reply; raises ValueError if it does not fit the schemas."""
+    try:
+        data = json.loads(raw)
+        mechs = MechanismsOut(mechanisms=[Mechanism(**m) for m in data["mechanisms"]])
+        recs = dict(data["recommendations"])
+        recs["gaps"] = sorted(set((recs.get("gaps") or []) + _gaps(case)))
+        return mechs, RecsOut(**recs)
+    except Exception as e:
+        raise ValueError(f"fused agent returned invalid output: {e}") from e
+
+def fused_agent(case: Incident,
+                similar_cases: List[SimilarCase],
+                handbook_snips: List[dict]) -> Tuple[MechanismsOut, RecsOut]:
+    """
+    Reasoner + recommender in one LLM round trip.
+    Raises ValueError if the reply does not validate, so callers can fall
+    back to the two-call path.
+    """
+    prompt = build_fused_prompt(case, similar_cases, handbook_snips)
+    raw = call_llm(prompt, json_expected=True, caller="fused")
+    return parse_fused(raw, case)
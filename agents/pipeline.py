@@ -0,0 +1,205 @@
+import contextvars
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+from agents import Incident, SimilarCase, MechanismsOut, Mechanism, RecsOut
+from agents.reasoner import reasoner, MECH_KEYWORDS, _candidate_list
+from agents.recommender import recommender
+from agents.fused import fused_agent
+from utils.llm_telemetry import llm_call
+from utils.metrics import SPECULATION_RUNS
+from utils.pools import ForkSafePool
+
+# "two-call":    reasoner, then recommender on its output (two LLM round trips)
+# "fused":       one call returning mechanisms and recommendations together
+# "speculative": one recommender call per likely mechanism starts while the
+#                reasoner runs; their results are kept if the reasoner picks
+#                only from those mechanisms
+AGENT_MODES = ("two-call", "fused", "speculative")
+
+# Candidates the speculative recommender is run on
+SPEC_TOP_K = 3
+
+
+# Shared by speculative recommender calls (SPEC_TOP_K per in-flight request)
+_spec_pool = ForkSafePool(8 * SPEC_TOP_K, thread_name_prefix="spec-recs")
+
+
+def default_mode() -> str:
+    """Agent mode from MECC_AGENT_MODE, defaulting to the two-call path."""
+    mode = os.environ.get("MECC_AGENT_MODE", "two-call")
+    return mode if mode in AGENT_MODES else "two-call"
+
+
+def two_call(case: Incident,
+             similar_cases: List[SimilarCase],
+             handbook_snips: List[dict]) -> Tuple[MechanismsOut, RecsOut]:
+    mechs_out = reasoner(case=case, similar_cases=similar_cases, handbook_snips=handbook_snips)
+    recs_out = recommender(case=case, mechanisms=mechs_out, handbook_snips=handbook_snips)
+    return mechs_out, recs_out
+
+
+# ---- speculative execution ----
+
+class SpeculationStats:
+    """Hit rate and latency saved by speculative recommender runs."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.hits = 0
+        self.errors = 0
+        self.saved_ms = 0.0
+
+    def record(self, hit: bool, saved_ms: float, error: bool = False):
+        SPECULATION_RUNS.inc(1, "error" if error else "hit" if hit else "miss")
+        with self.lock:
+            self.runs += 1
+            self.hits += int(hit)
+            self.errors += int(error)
+            self.saved_ms += saved_ms
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                "runs": self.runs,
+                "hits": self.hits,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / self.runs, 3) if self.runs else None,
+                "latency_saved_ms_total": round(self.saved_ms, 1),
+                "latency_saved_ms_avg": round(self.saved_ms / self.runs, 1) if self.runs else None,
+            }
+
+
+SPECULATION = SpeculationStats()
+
+
+def _norm(name: str) -> str:
+    return " ".join((name or "").lower().replace("-", " ").split())
+
+
+def speculative_candidates(handbook_snips: List[dict],
+                           similar_cases: List[SimilarCase],
+                           k: int = SPEC_TOP_K,
+                           case: Optional[Incident] = None) -> List[str]:
+    """
+    Top-k of the reasoner's shortlist, ranked by how often each mechanism
+    appears in the similar cases and handbook text (the shortlist itself is
+    unordered). Mechanisms implied by the case photos rank first.
+    """
+    text = " ".join(s.get("text", "") for s in handbook_snips).lower()
+    case_mechs = [_norm(c.mechanism) for c in similar_cases or [] if getattr(c, "mechanism", None)]
+
+    def score(name: str) -> int:
+        n = _norm(name)
+        kw = next((m for m in MECH_KEYWORDS if _norm(m) == n), n)
+        return 2 * case_mechs.count(n) + text.count(kw)
+
+    visual = {_norm(v) for v in getattr(case, "visual_mechanisms", None) or []}
+    candidates = _candidate_list(handbook_snips, similar_cases, case=case)
+    return sorted(candidates, key=lambda c: (_norm(c) not in visual, -score(c), c))[:k]
+
+
+def _chosen(mechanisms: MechanismsOut) -> List[str]:
+    """Normalized names the reasoner chose, deduplicated in order."""
+    return list(dict.fromkeys(_norm(m.name) for m in mechanisms.mechanisms if m.name))
+
+
+def _covers(speculated: List[str], chosen: MechanismsOut) -> bool:
+    """
+    Speculation hits when every mechanism the reasoner chose was guessed.
+    Each guess has its own recommender run, so the advice is assembled from
+    the chosen ones only and rejected guesses contribute nothing.
+    """
+    names = _chosen(chosen)
+    return bool(names) and set(names) <= {_norm(n) for n in speculated}
+
+
+def _merge_recs(parts: List[RecsOut]) -> RecsOut:
+    """One RecsOut from per-mechanism ones; repeated items are kept once."""
+    merged = {"immediate": [], "medium_term": [], "long_term": [], "monitoring": []}
+    for part in parts:
+        for field, items in merged.items():
+            for item in getattr(part, field):
+                if item not in items:
+                    items.append(item)
+    gaps = sorted({g for part in parts for g in part.gaps})
+    return RecsOut(**merged, gaps=gaps)
+
+
+def _timed_recommender(case: Incident, mechanisms: MechanismsOut, handbook_snips: List[dict]):
+    t0 = time.perf_counter()
+    with llm_call("recommender_speculative"):
+        recs = recommender(case=case, mechanisms=mechanisms, handbook_snips=handbook_snips)
+    return recs, (time.perf_counter() - t0) * 1000
+
+
+def speculative(case: Incident,
+                similar_cases: List[SimilarCase],
+                handbook_snips: List[dict]) -> Tuple[MechanismsOut, RecsOut]:
+    """
+    Start one recommender call per likely mechanism while the reasoner runs.
+    On a hit (the reasoner chose only guessed mechanisms) the chosen ones'
+    recommendations are merged and returned as soon as they are done; on a
+    miss they are discarded and the recommender re-runs on the reasoner's
+    actual selection.
+    """
+    guess = speculative_candidates(handbook_snips, similar_cases, case=case)
+    # copy the context so the background calls keep this request's telemetry tags
+    spec_futures = {
+        _norm(n): _spec_pool.submit(
+            contextvars.copy_context().run, _timed_recommender, case,
+            MechanismsOut(mechanisms=[
+                Mechanism(name=n, confidence=0.5, reasoning="Candidate from retrieved evidence.")
+            ]),
+            handbook_snips)
+        for n in guess
+    }
+
+    t0 = time.perf_counter()
+    mechs_out = reasoner(case=case, similar_cases=similar_cases, handbook_snips=handbook_snips)
+    reasoner_ms = (time.perf_counter() - t0) * 1000
+
+    if _covers(guess, mechs_out):
+        try:
+            results = [spec_futures[n].result() for n in _chosen(mechs_out)]
+            overlapped_ms = (time.perf_counter() - t0) * 1000
+            # sequential cost would have been reasoner + recommender
+            spec_ms = max(ms for _, ms in results)
+            SPECULATION.record(True, max(0.0, reasoner_ms + spec_ms - overlapped_ms))
+            return mechs_out, _merge_recs([recs for recs, _ in results])
+        except Exception as e:
+            print("Speculative recommender failed, re-running:", e)
+            SPECULATION.record(False, 0.0, error=True)
+    else:
+        SPECULATION.record(False, 0.0)
+    for f in spec_futures.values():
+        f.cancel()  # no-op if already running or done; results are ignored
+
+    recs_out = recommender(case=case, mechanisms=mechs_out, handbook_snips=handbook_snips)
+    return mechs_out, recs_out
+
+
+def run_agents(case: Incident,
+               similar_cases: List[SimilarCase],
+               handbook_snips: List[dict],
+               mode: Optional[str] = None) -> Tuple[MechanismsOut, RecsOut, str]:
+    """
+    Run the agents in the given mode (or the configured default).
+    Returns (mechanisms, recommendations, mode actually used); a fused reply
+    that fails validation falls back to the two-call path.
+    """
+    mode = mode or default_mode()
+    if mode not in AGENT_MODES:
+        raise ValueError(f"agent mode must be one of {AGENT_MODES}, got {mode!r}")
+
+    if mode == "fused":
+        try:
+            return (*fused_agent(case, similar_cases, handbook_snips), "fused")
+        except ValueError as e:
+            print("Fused agent failed, falling back to two calls:", e)
+    elif mode == "speculative":
+        return (*speculative(case, similar_cases, handbook_snips), "speculative")
+
+    return (*two_call(case, similar_cases, handbook_snips), "two-call")
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from agents import Incident, SimilarCase, MechanismsOut, Mechanism
 from utils.llm import call_llm
 from utils.prompts import REASONER_SYS
@@ -14,8 +14,13 @@ MECH_KEYWORDS = [
 
 def _candidate_list(handbook_snips: List[dict],
                     similar_cases: List[SimilarCase],
-                    max_k: int = 6) -> List[str]:
-    """Build a short, deduped mechanism shortlist from handbook + similar cases."""
+                    max_k: int = 6,
+                    case: Optional[Incident] = None) -> List[str]:
+    """
+    Build a short, deduped mechanism shortlist from handbook + similar cases.
+    Mechanisms implied by the case photos (case.visual_mechanisms) come first.
+    """
+    visual = list(getattr(case, "visual_mechanisms", None) or [])
     text = " ".join(s.get("text", "") for s in handbook_snips).lower()
     found = set()
 
@@ -30,18 +35,18 @@ def _candidate_list(handbook_snips: List[dict],
             found.add(c.mechanism)
 
     # 3) fallback if empty
-    if not found:
+    if not found and not visual:
         found = {"CO2 corrosion", "MIC", "erosion-corrosion"}
 
-    return list(found)[:max_k]
+    seen = {v.lower() for v in visual}
+    return (visual + [f for f in found if f.lower() not in seen])[:max_k]
 
-def reasoner(case: Incident,
-             similar_cases: List[SimilarCase],
-             handbook_snips: List[dict]) -> MechanismsOut:
+def build_reasoner_prompt(case: Incident,
+                          similar_cases: List[SimilarCase],
+                          handbook_snips: List[dict]) -> str:
+    candidates = _candidate_list(handbook_snips, similar_cases, case=case)
 
-    candidates = _candidate_list(handbook_snips, similar_cases)
-
-    prompt = f"""{REASONER_SYS}
+    return f"""{REASONER_SYS}
 
 New case JSON:
 {case.model_dump()}
@@ -56,9 +61,8 @@ Handbook excerpts (ids/sources only):
 
 Choose 1–3 mechanisms with confidence and reasoning. Cite evidence by case id or handbook id.
 Return JSON only."""
-    raw = call_llm(prompt, json_expected=True)
 
-    # Robust JSON handling
+def parse_mechanisms(raw: str) -> MechanismsOut:
     try:
         data = json.loads(raw)
         items = data.get("mechanisms", [])
@@ -69,4 +73,12 @@ Return JSON only."""
                   "evidence": []}]
 
     mechs = [Mechanism(**m) for m in items]
-    return MechanismsOut(mechanisms=mechs)
\ No newline at end of file
+    return MechanismsOut(mechanisms=mechs)
+
+def reasoner(case: Incident,
+             similar_cases: List[SimilarCase],
+             handbook_snips: List[dict]) -> MechanismsOut:
+
+    prompt = build_reasoner_prompt(case, similar_cases, handbook_snips)
+    raw = call_llm(prompt, json_expected=True, caller="reasoner")
+    return parse_mechanisms(raw)
\ No newline at end of file
@@ -10,10 +10,9 @@ def _gaps(case: Incident) -> List[str]:
     must = ["material", "environment", "observed_damage", "time_in_service"]
     return [f"Missing {k.replace('_', ' ')}" for k in must if not getattr(case, k)]
 
-def recommender(case: Incident,
-                mechanisms: MechanismsOut,
-                handbook_snips: List[dict]) -> RecsOut:
-    
+def build_recs_prompt(case: Incident,
+                      mechanisms: MechanismsOut,
+                      handbook_snips: List[dict]) -> str:
     # safely build handbook refs list
     hb_refs = [
         {
@@ -23,7 +22,7 @@ def recommender(case: Incident,
         for s in handbook_snips
     ]
 
-    prompt = f"""{RECS_SYS}
+    return f"""{RECS_SYS}
 
 Incident:
 {case.model_dump()}
@@ -38,7 +37,15 @@ Return valid JSON with keys: immediate, medium_term, long_term, monitoring, gaps
 No prose, no markdown — only valid JSON.
 """
 
-    raw = call_llm(prompt, json_expected=True)
+def parse_recs(raw: str, case: Incident) -> RecsOut:
     data = json.loads(raw)
     data["gaps"] = sorted(set((data.get("gaps") or []) + _gaps(case)))
-    return RecsOut(**data)
\ No newline at end of file
+    return RecsOut(**data)
+
+def recommender(case: Incident,
+                mechanisms: MechanismsOut,
+                handbook_snips: List[dict]) -> RecsOut:
+
+    prompt = build_recs_prompt(case, mechanisms, handbook_snips)
+    raw = call_llm(prompt, json_expected=True, caller="recommender")
+    return parse_recs(raw, case)
\ No newline at end of file
@@ -0,0 +1,116 @@
+from typing import Iterator, List, Optional, Tuple
+from agents import Incident, SimilarCase, Mechanism
+from agents.reasoner import build_reasoner_prompt, parse_mechanisms
+from agents.recommender import build_recs_prompt, parse_recs
+from agents.fused import build_fused_prompt, parse_fused
+from agents.pipeline import default_mode
+from utils.json_stream import JsonStreamParser
+from utils.llm import json_object_text, stream_llm
+
+REC_GROUPS = ("immediate", "medium_term", "long_term", "monitoring")
+
+# (event name, payload) pairs, in the order the UI should render them
+Event = Tuple[str, dict]
+
+
+def _mechanism_event(value) -> Optional[Event]:
+    try:
+        return "mechanism", Mechanism(**value).model_dump()
+    except Exception:
+        return None  # incomplete/invalid item; the final "mechanisms" event has the truth
+
+
+def _stream_json(prompt: str, caller: str, on_value) -> Iterator[Event]:
+    """
+    Stream one LLM call through the incremental parser. on_value(path, value)
+    maps completed values to events. The final event is ("_raw", {"text": ...}).
+    """
+    parser = JsonStreamParser(max_depth=2)
+    raw: List[str] = []
+    for piece in stream_llm(prompt, json_expected=True, caller=caller):
+        raw.append(piece)
+        for path, value in parser.feed(piece):
+            event = on_value(path, value)
+            if event is not None:
+                yield event
+    yield "_raw", {"text": json_object_text("".join(raw))}
+
+
+def _reasoner_value(path, value) -> Optional[Event]:
+    if len(path) == 2 and path[0] == "mechanisms":
+        return _mechanism_event(value)
+    return None
+
+
+def _recs_value(path, value) -> Optional[Event]:
+    if len(path) == 1 and path[0] in REC_GROUPS and isinstance(value, list):
+        return "recommendation_group", {"group": path[0], "items": value}
+    return None
+
+
+def _fused_value(path, value) -> Optional[Event]:
+    if len(path) == 2 and path[0] == "recommendations":
+        return _recs_value(path[1:], value)
+    return _reasoner_value(path, value)
+
+
+def stream_two_call(case: Incident,
+                    similar_cases: List[SimilarCase],
+                    handbook_snips: List[dict]) -> Iterator[Event]:
+    raw = ""
+    for event in _stream_json(build_reasoner_prompt(case, similar_cases, handbook_snips),
+                              "reasoner", _reasoner_value):
+        if event[0] == "_raw":
+            raw = event[1]["text"]
+        else:
+            yield event
+    mechs_out = parse_mechanisms(raw)
+    yield "mechanisms", {"mechanisms": [m.model_dump() for m in mechs_out.mechanisms]}
+
+    for event in _stream_json(build_recs_prompt(case, mechs_out, handbook_snips),
+                              "recommender", _recs_value):
+        if event[0] == "_raw":
+            raw = event[1]["text"]
+        else:
+            yield event
+    yield "recommendations", parse_recs(raw, case).model_dump()
+
+
+def stream_fused(case: Incident,
+                 similar_cases: List[SimilarCase],
+                 handbook_snips: List[dict]) -> Iterator[Event]:
+    raw = ""
+    for event in _stream_json(build_fused_prompt(case, similar_cases, handbook_snips),
+                              "fused", _fused_value):
+        if event[0] == "_raw":
+            raw = event[1]["text"]
+        else:
+            yield event
+    try:
+        mechs_out, recs_out = parse_fused(raw, case)
+    except ValueError as e:
+        print("Fused agent failed, falling back to two calls:", e)
+        yield "notice", {"message": "fused reply invalid; re-running as two calls"}
+        yield from stream_two_call(case, similar_cases, handbook_snips)
+        return
+    yield "mechanisms", {"mechanisms": [m.model_dump() for m in mechs_out.mechanisms]}
+    yield "recommendations", recs_out.model_dump()
+
+
+def stream_agents(case: Incident,
+                  similar_cases: List[SimilarCase],
+                  handbook_snips: List[dict],
+                  mode: Optional[str] = None) -> Iterator[Event]:
+    """
+    Agent output as events, while the model is still writing:
+      mechanism             one per mechanism, as soon as its JSON object closes
+      mechanisms            the validated MechanismsOut
+      recommendation_group  {group, items} per group as it closes
+      recommendations       the validated RecsOut (gaps merged)
+    Speculative mode has nothing to gain here and streams as two-call.
+    """
+    mode = mode or default_mode()
+    if mode == "fused":
+        yield from stream_fused(case, similar_cases, handbook_snips)
+    else:
+        yield from stream_two_call(case, similar_cases, handbook_snips)
@@ -1,8 +1,14 @@
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, abort, g, request, jsonify, send_file, stream_with_context
+import contextvars
+from io import BytesIO
 from pathlib import Path 
+import json
+import os
 import sys 
+import time
 from typing import List, Dict
+import uuid
 from flask_cors import CORS
 
 ROOT = Path(__file__).resolve().parent
@@ -11,16 +17,73 @@ SCRIPTS = ROOT / "scripts"
 if str(SCRIPTS) not in sys.path:
     sys.path.append(str(SCRIPTS))
 
-from rag_faiss_client import get_rag_evidence
-from api571_loader import get_mechanism_entry, get_mechanism_name
+from rag_faiss_client import EMBEDDER, embed_query, get_rag_evidence, get_rag_evidence_by_vector
+from api571_loader import (
+    catalogue_digest, get_mechanism_name, get_mechanism_snippet, search_mechanisms,
+)
+from mechanism_suggester import suggest_mechanisms, warm_up as warm_up_suggester
+from cv_classifier import (
+    CV_MODEL, DEFAULT_TOP_K, batch_stats, cache_stats, classify_image, decode_image, model_info,
+    persist_upload, upload_name,
+)
+from model_registry import REGISTRY
+from visual_evidence import (
+    aggregate_predictions, cases_for_label, damage_hint, steer_query_vector,
+    warm_up as warm_up_visual_hints,
+)
+from visual_index import IndexUnavailable, archive_file, get_index, similar_images
 
 from agents import Incident, SimilarCase
-from agents.reasoner import reasoner
-from agents.recommender import recommender
+from agents.pipeline import AGENT_MODES, SPECULATION, run_agents, default_mode as default_agent_mode
+from agents.streaming import stream_agents
+from utils.llm_telemetry import TELEMETRY, llm_call
+from utils.metrics import (
+    HTTP_SECONDS, render_metrics, request_spans, server_timing, span, span_totals, start_request,
+)
+from utils.pools import ForkSafePool
+
+class InMemoryRequest(Request):
+    """Keep uploaded files in memory instead of spooling them to a temp file."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return BytesIO()
+
 
 app = Flask(__name__)
+app.request_class = InMemoryRequest
+# uploads live in memory, so cap their size (MB)
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MECC_MAX_UPLOAD_MB", "20")) * 1024 * 1024
 CORS(app)
 
+
+# ---- per-stage timings: Server-Timing header + /metrics ----
+@app.before_request
+def _start_timing():
+    g.started = time.perf_counter()
+    start_request()
+
+
+@app.after_request
+def _add_server_timing(response):
+    elapsed = time.perf_counter() - g.get("started", time.perf_counter())
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_SECONDS.observe(elapsed, endpoint, str(response.status_code))
+    # streamed bodies run after this; their stages go into the final event instead
+    response.headers["Server-Timing"] = server_timing(request_spans(), elapsed)
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus text format: stage, HTTP and LLM latency histograms, token
+    counters. Under gunicorn the totals of all workers (see utils.metrics).
+    """
+    return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def docs_to_handbook_snips(hb_docs) -> List[Dict]:
     snips = []
     for i, d in enumerate(hb_docs):
@@ -42,39 +105,19 @@ def docs_to_similar_cases(case_docs) -> List[SimilarCase]:
             id=md.get("case_id", f"case-{i}"),
             title=md.get("file_name", "unknown_case"),
             snippet=snippet,
-            mechanism=md.get("section", ""),
+            # case chunks carry their report section, not a mechanism label
+            mechanism=md.get("mechanism"),
             similarity=1.0 / (1.0 + md.get("score", 0.0)),
         )
         sims.append(sim)
     return sims
 
 def add_api571_snip(handbook_snips: List[Dict], mech_id: str) -> List[Dict]:
-    entry = get_mechanism_entry(mech_id)
-    if not entry:
+    # snippet text is pre-rendered once per mechanism by api571_loader
+    text = get_mechanism_snippet(mech_id)
+    if not text:
         return handbook_snips
 
-    lines = []
-    name = entry.get("name", mech_id)
-    lines.append(f"API 571 mechanism {mech_id}: {name}")
-
-    def add_block(label, key):
-        val = entry.get(key)
-        if not val:
-            return
-        if isinstance(val, list):
-            val = "\n".join(val)
-        lines.append(f"{label}: {val}")
-
-    add_block("Description of damage", "description_of_damage")
-    add_block("Affected materials", "affected_materials")
-    add_block("Critical factors", "critical_factors")
-    add_block("Affected units / equipment", "affected_units_equipment")
-    add_block("Appearance / morphology", "appearance")
-    add_block("Prevention / mitigation", "prevention_mitigation")
-    add_block("Inspection / monitoring", "inspection_monitoring")
-
-    text = "\n".join(lines)
-
     api_snip = {
         "id": f"api571-{mech_id}",
         "source": "api571",
@@ -85,62 +128,122 @@ def add_api571_snip(handbook_snips: List[Dict], mech_id: str) -> List[Dict]:
     return [api_snip] + handbook_snips
 
 
+def _suggestion_text(data: Dict) -> str:
+    parts = [data.get("description"), data.get("material"), data.get("environment")]
+    return ". ".join(p.strip() for p in parts if p and p.strip())
 
-# API endpoints 
 
-@app.post("/api/analyze")
-def analyze():
-    """
-    JSON in:
-    {
-      "description": "...",          # required
-      "mechanism_id": "3.2",         # required (from dropdown in UI)
-      "material": "Carbon steel",    # optional
-      "environment": "Wet CO2 ...",  # optional
-      "time_in_service": "5 years"   # optional
-    }
-    """
-    data = request.get_json(force=True) or {}
+class BadRequest(ValueError):
+    pass
+
 
+def _validate(data: Dict) -> str:
+    """Check the fields every analyze endpoint needs; returns the description."""
     description = (data.get("description") or "").strip()
     if not description:
-        return jsonify({"error": "description is required"}), 400
+        raise BadRequest("description is required")
+
+    agent_mode = data.get("agent_mode")
+    if agent_mode and agent_mode not in AGENT_MODES:
+        raise BadRequest(f"agent_mode must be one of {list(AGENT_MODES)}")
+    return description
+
+
+def _choose_mechanism(data: Dict):
+    """(mech_id, mech_name, suggestions); suggestions only when the UI sent no id."""
+    # No mechanism from the UI -> pick the closest API 571 entry locally
+    suggestions = []
+    mech_id = data.get("mechanism_id")
+    if not mech_id:
+        with span("suggest_mechanism"):
+            suggestions = suggest_mechanisms(_suggestion_text(data), k=5)
+        mech_id = suggestions[0]["id"] if suggestions else "3.2"
+    mech_id = str(mech_id)
+    return mech_id, get_mechanism_name(mech_id), suggestions
+
+
+def _rag_query(data: Dict, mech_id: str, mech_name: str) -> str:
+    return (
+        f"Failure mechanism: {mech_name} (API571 {mech_id}). "
+        f"Observed damage: {(data.get('description') or '').strip()}. "
+        f"Environment: {data.get('environment') or ''}."
+    )
 
-    mech_id = str(data.get("mechanism_id") or "3.2")
-    mech_name = get_mechanism_name(mech_id)
 
+def _build_incident(data: Dict, description: str, **extra) -> Incident:
     # Build Incident – we keep extra fields optional
-    incident = Incident(
+    return Incident(
         material=data.get("material") or "",
         environment=data.get("environment") or "",
         observed_damage=description,
         time_in_service=data.get("time_in_service") or "",
         description=description,
+        **extra,
     )
 
-    # Build RAG query
-    query = (
-        f"Failure mechanism: {mech_name} (API571 {mech_id}). "
-        f"Observed damage: {incident.observed_damage}. "
-        f"Environment: {incident.environment}."
-    )
 
-    hb_docs, case_docs = get_rag_evidence(query, k=8)
+def _evidence(hb_docs, case_docs, mech_id: str):
+    """(similar_cases, handbook_snips) from retrieved docs, API 571 entry first."""
     handbook_snips = docs_to_handbook_snips(hb_docs)
     similar_cases = docs_to_similar_cases(case_docs)
-    handbook_snips = add_api571_snip(handbook_snips, mech_id)
+    with span("api571_snip"):
+        handbook_snips = add_api571_snip(handbook_snips, mech_id)
+    return similar_cases, handbook_snips
 
-    mechs_out = reasoner(
-        case=incident,
-        similar_cases=similar_cases,
-        handbook_snips=handbook_snips,
-    )
 
-    recs_out = recommender(
-        case=incident,
-        mechanisms=mechs_out,
-        handbook_snips=handbook_snips,
-    )
+def _prepare_analysis(data: Dict) -> Dict:
+    """
+    Validate an analyze request and gather everything the agents need:
+    mechanism choice, Incident, retrieved handbook snippets and similar cases.
+    """
+    description = _validate(data)
+    agent_mode = data.get("agent_mode")
+    mech_id, mech_name, suggestions = _choose_mechanism(data)
+    incident = _build_incident(data, description)
+
+    hb_docs, case_docs = get_rag_evidence(_rag_query(data, mech_id, mech_name), k=8)
+    similar_cases, handbook_snips = _evidence(hb_docs, case_docs, mech_id)
+
+    return {
+        "incident": incident,
+        "similar_cases": similar_cases,
+        "handbook_snips": handbook_snips,
+        "mech_id": mech_id,
+        "mech_name": mech_name,
+        "suggestions": suggestions,
+        "agent_mode": agent_mode,
+        # Tag the agent calls so telemetry can add up tokens per request
+        "request_id": uuid.uuid4().hex[:12],
+    }
+
+
+# API endpoints 
+
+@app.post("/api/analyze")
+def analyze():
+    """
+    JSON in:
+    {
+      "description": "...",          # required
+      "mechanism_id": "3.2",         # optional (dropdown in UI; suggested from text if missing)
+      "material": "Carbon steel",    # optional
+      "environment": "Wet CO2 ...",  # optional
+      "time_in_service": "5 years",  # optional
+      "agent_mode": "fused"          # optional: "two-call" | "fused" | "speculative"
+                                     #   (default: MECC_AGENT_MODE)
+    }
+    """
+    data = request.get_json(force=True) or {}
+    try:
+        prep = _prepare_analysis(data)
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    with llm_call(request_id=prep["request_id"]), span("agents"):
+        mechs_out, recs_out, agent_mode = run_agents(
+            prep["incident"], prep["similar_cases"], prep["handbook_snips"],
+            mode=prep["agent_mode"],
+        )
 
     # Serialize to plain JSON
     mechanisms_json = [m.model_dump() for m in mechs_out.mechanisms]
@@ -149,14 +252,134 @@ def analyze():
     return jsonify({
         "mechanisms": mechanisms_json,
         "recommendations": recs_json,
-        "mechanism_label": mech_name,
-        "mechanism_id": mech_id,
+        "mechanism_label": prep["mech_name"],
+        "mechanism_id": prep["mech_id"],
+        "mechanism_suggestions": prep["suggestions"],
+        "request_id": prep["request_id"],
+        "agent_mode": agent_mode,
     })
 
+
+def _sse(event: str, payload: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/analyze/stream")
+def analyze_stream():
+    """
+    Same input as /api/analyze; answers with server-sent events:
+      meta, evidence, mechanism (one per item), mechanisms,
+      recommendation_group (one per group), recommendations, done | error
+    Evidence is sent as soon as retrieval finishes, then agent output is
+    forwarded while the model is still writing it. Invalid input is
+    rejected with 400 before the stream starts, as in /api/analyze.
+    """
+    data = request.get_json(force=True) or {}
+    try:
+        _validate(data)
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    started = time.perf_counter()
+
+    def events():
+        # headers are already sent when this runs; collect stages for the done event
+        start_request()
+        try:
+            prep = _prepare_analysis(data)
+        except Exception as e:
+            print("Streaming analysis failed before the agents:", e)
+            yield _sse("error", {"error": str(e)})
+            return
+
+        agent_mode = prep["agent_mode"] or default_agent_mode()
+        if agent_mode == "speculative":
+            agent_mode = "two-call"  # streaming already overlaps with the model
+        yield _sse("meta", {
+            "request_id": prep["request_id"],
+            "mechanism_id": prep["mech_id"],
+            "mechanism_label": prep["mech_name"],
+            "mechanism_suggestions": prep["suggestions"],
+            "agent_mode": agent_mode,
+        })
+        yield _sse("evidence", {
+            "similar_cases": [c.model_dump() for c in prep["similar_cases"]],
+            "handbook": [{"id": s.get("id"), "source": s.get("source"), "score": s.get("score")}
+                         for s in prep["handbook_snips"]],
+        })
+
+        first_seen: Dict[str, float] = {}
+        try:
+            # held across yields: this generator runs start to finish in one thread
+            with llm_call(request_id=prep["request_id"]):
+                for event, payload in stream_agents(prep["incident"], prep["similar_cases"],
+                                                    prep["handbook_snips"], mode=agent_mode):
+                    first_seen.setdefault(event, round((time.perf_counter() - started) * 1000, 1))
+                    yield _sse(event, payload)
+        except Exception as e:
+            print("Streaming analysis failed:", e)
+            yield _sse("error", {"error": str(e)})
+            return
+
+        yield _sse("done", {"elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                            "first_event_ms": first_seen,
+                            "stages_ms": span_totals(request_spans())})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/llm/telemetry")
+def llm_telemetry():
+    """Per-caller LLM latency/token percentiles for calls made by this process."""
+    return jsonify({**TELEMETRY.summary(), "speculation": SPECULATION.summary()})
+
+
+@app.get("/api/mechanisms/search")
+def mechanisms_search():
+    """
+    GET /api/mechanisms/search?q=amine&limit=20
+    Keyword lookup over API 571 mechanisms for the UI dropdown.
+    An empty q lists mechanisms in catalogue order.
+    """
+    q = request.args.get("q", "")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 100))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    return jsonify({"query": q, "results": search_mechanisms(q, limit=limit)})
+
+
+@app.route("/api/mechanisms/suggest", methods=["GET", "POST"])
+def mechanisms_suggest():
+    """
+    Rank API 571 mechanisms for an incident description without an LLM call.
+    POST JSON {"description": "...", "material": "...", "environment": "...", "k": 5}
+    or GET ?q=...&k=5
+    """
+    data = request.get_json(silent=True) or {}
+    if request.method == "GET":
+        data = {"description": request.args.get("q", ""), "k": request.args.get("k", 5)}
+
+    text = _suggestion_text(data)
+    if not text:
+        return jsonify({"error": "description is required"}), 400
+    try:
+        k = max(1, min(int(data.get("k") or 5), 20))
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer"}), 400
+
+    return jsonify({"suggestions": suggest_mechanisms(text, k=k)})
+
     
-from Computer_Vision import model 
 @app.route("/api/_imgcv", methods=["POST"])
 def imgcv():
+    """
+    Multipart upload (field "file") -> top-k class probabilities.
+    The image is decoded in memory; nothing is written unless the request
+    (form/query "persist=1") or MECC_PERSIST_UPLOADS asks for it, and then
+    only on a background thread. Optional "k" (1-20, default 5).
+    """
     if "file" not in request.files:
         return jsonify({"error": "No file part"}), 400
 
@@ -165,26 +388,270 @@ def imgcv():
     if file.filename == "":
         return jsonify({"error": "No selected file"}), 400
 
-    # save uploaded file
-    upload_folder = os.path.join(os.path.dirname(__file__), "uploads")
-    os.makedirs(upload_folder, exist_ok=True)
-
-    img_path = os.path.join(upload_folder, file.filename)
-    file.save(img_path)
+    try:
+        k = int(request.values.get("k", DEFAULT_TOP_K))
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+    k = max(1, min(k, 20))
 
-    print("Image saved at:", img_path)
+    data = file.read()
+    try:
+        image = decode_image(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
-        results = model(img_path, save=True, conf=0.5)  
-        results[0].show()
+        pred = classify_image(image, k=k)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    return jsonify({
+    out = {
         "message": "Image processed successfully",
-        "image_path": img_path
-    }), 200
+        "prediction": pred["top1"],
+        "predictions": pred["topk"],
+        "inference_ms": pred["inference_ms"],
+        "cache": pred["cache"],
+        "model_version": CV_MODEL.version,
+    }
+    persist = request.values.get("persist", os.environ.get("MECC_PERSIST_UPLOADS", "0"))
+    if persist.lower() in ("1", "true", "yes"):
+        persist_upload(data, file.filename)
+        out["stored_as"] = upload_name(data, file.filename)
+
+    return jsonify(out), 200
+
+
+@app.get("/api/cv/stats")
+def cv_stats():
+    """Classifier runtime, result-cache hit rates and micro-batching stats."""
+    return jsonify({"model": model_info(), "cache": cache_stats(), "batching": batch_stats()})
+
+
+@app.post("/api/cv/similar")
+def cv_similar():
+    """
+    Multipart upload (field "file") -> the k most visually similar archive
+    images (backbone-feature cosine), with their labels and, per label,
+    past cases retrieved for that damage class. Optional "k" (1-50, default 5).
+    """
+    file = request.files.get("file")
+    if file is None or file.filename == "":
+        return jsonify({"error": "No file part"}), 400
+    try:
+        k = max(1, min(int(request.values.get("k", 5)), 50))
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+    try:
+        image = decode_image(file.read())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        out = similar_images(image, k=k)
+    except IndexUnavailable as e:
+        return jsonify({"error": str(e)}), 409
+
+    for hit in out["results"]:
+        hit["url"] = f"/api/cv/archive/{hit['path']}"
+    labels = list(dict.fromkeys(hit["label"] for hit in out["results"]))
+    try:
+        out["cases"] = {label: cases_for_label(label) for label in labels}
+    except Exception as e:
+        print("Linked case lookup failed:", e)
+        out["cases"] = {}
+    return jsonify(out)
+
+
+@app.get("/api/cv/archive/<path:rel>")
+def cv_archive_image(rel):
+    """Serve an indexed archive image (only paths that are in the visual index)."""
+    path = archive_file(rel)
+    if path is None or not path.is_file():
+        abort(404)
+    return send_file(path)
+
+
+@app.get("/api/models")
+def models():
+    """Active version per model (cache keys), pending loads and draining versions."""
+    return jsonify({"versions": REGISTRY.versions(), **REGISTRY.info()})
+
+
+@app.post("/api/models/reload")
+def models_reload():
+    """
+    Re-read data/models.json and hot-swap changed models, or load one model's
+    manifest entry: {"name": "cv_classifier", "version": "train8"}. Only specs
+    from the manifest are loaded; the version must match its entry.
+    Loading happens in the background; poll GET /api/models for progress.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get("name"):
+        try:
+            spec = REGISTRY.spec_for(data["name"])
+        except (OSError, ValueError) as e:
+            return jsonify({"error": f"could not read manifest: {e}"}), 500
+        if spec is None or spec.get("version") != data.get("version"):
+            return jsonify({"error": f"{data['name']} {data.get('version')!r} is not in the manifest"}), 400
+        try:
+            REGISTRY.load(data["name"], spec)
+        except (KeyError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({data["name"]: "loading"}), 202
+    try:
+        return jsonify(REGISTRY.reload()), 202
+    except (OSError, ValueError) as e:
+        return jsonify({"error": f"could not read manifest: {e}"}), 500
+
+
+# ---- joint image + text analysis ----
+MAX_JOINT_IMAGES = int(os.environ.get("MECC_JOINT_MAX_IMAGES", "8"))
+# photo class must reach this mean probability before it steers retrieval
+JOINT_MIN_PROB = float(os.environ.get("MECC_JOINT_MIN_PROB", "0.4"))
+# weight of the damage-class phrase added to the query vector
+JOINT_HINT_WEIGHT = float(os.environ.get("MECC_JOINT_HINT_WEIGHT", "0.35"))
+
+
+_joint_pool = ForkSafePool(int(os.environ.get("MECC_JOINT_WORKERS", "8")), thread_name_prefix="joint")
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _text_branch(data: Dict, embedder) -> Dict:
+    """Mechanism choice + query embedding: everything retrieval needs except the photo."""
+    mech_id, mech_name, suggestions = _choose_mechanism(data)
+    query = _rag_query(data, mech_id, mech_name)
+    return {"mech_id": mech_id, "mech_name": mech_name, "suggestions": suggestions,
+            "query": query, "vector": embed_query(query, embedder)}
+
+
+@app.post("/api/analyze/joint")
+def analyze_joint():
+    """
+    multipart/form-data: the /api/analyze fields as form fields plus one or
+    more photos in "images" (or "file").
+
+    Photo classification and the text side (mechanism suggestion, query
+    embedding) run concurrently; the predicted damage class then nudges the
+    FAISS query vector and leads the reasoner's candidate list. Retrieval
+    after the join is a single vector search, so latency is about
+    max(CV, text) + LLM. A failed classification falls back to text only.
+    """
+    data = request.form.to_dict()
+    try:
+        description = _validate(data)
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    files = [f for f in request.files.getlist("images") + request.files.getlist("file") if f.filename]
+    if not files:
+        return jsonify({"error": "at least one image is required"}), 400
+    if len(files) > MAX_JOINT_IMAGES:
+        return jsonify({"error": f"at most {MAX_JOINT_IMAGES} images"}), 400
+    try:
+        images = [decode_image(f.read()) for f in files]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    started = time.perf_counter()
+    # one embedder version for the query vector, hint vector and index search
+    with EMBEDDER.acquire() as embedder:
+        # run in a copy of this request's context so worker stages reach Server-Timing
+        cv_futures = [_joint_pool.submit(contextvars.copy_context().run, _timed, classify_image, img)
+                      for img in images]
+        text_future = _joint_pool.submit(contextvars.copy_context().run, _timed, _text_branch,
+                                         data, embedder)
+
+        try:
+            text, text_ms = text_future.result()
+        except Exception as e:
+            for f in cv_futures:
+                f.cancel()  # no-op if already running; its result is ignored
+            return jsonify({"error": str(e)}), 500
+        try:
+            cv_results = [f.result() for f in cv_futures]
+            preds = [p for p, _ in cv_results]
+            cv_ms = max(ms for _, ms in cv_results)
+            vision = aggregate_predictions(preds)
+        except Exception as e:
+            print("Joint analysis: image classification failed, continuing with text only:", e)
+            vision, cv_ms = {"error": str(e)}, None
+        parallel_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        hint = None
+        if vision and "label" in vision and vision["prob"] >= JOINT_MIN_PROB:
+            hint = damage_hint(vision["label"])
+        if vision and "label" in vision:
+            vision["hint"] = hint
+
+        t0 = time.perf_counter()
+        vector = steer_query_vector(text["vector"], hint, JOINT_HINT_WEIGHT, embedder)
+        hb_docs, case_docs = get_rag_evidence_by_vector(vector, k=8, bundle=embedder)
+        similar_cases, handbook_snips = _evidence(hb_docs, case_docs, text["mech_id"])
+        retrieval_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    visual = {}
+    if vision and "label" in vision:
+        visual["visual_damage"] = f"{vision['label']} (p={vision['prob']:.2f}, {vision['photos']} photo(s))"
+    if hint:
+        visual["visual_mechanisms"] = hint["mechanisms"]
+    incident = _build_incident(data, description, **visual)
+
+    request_id = uuid.uuid4().hex[:12]
+    t0 = time.perf_counter()
+    with llm_call(request_id=request_id), span("agents"):
+        mechs_out, recs_out, agent_mode = run_agents(incident, similar_cases, handbook_snips,
+                                                     mode=data.get("agent_mode"))
+    agents_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    return jsonify({
+        "mechanisms": [m.model_dump() for m in mechs_out.mechanisms],
+        "recommendations": recs_out.model_dump(),
+        "mechanism_label": text["mech_name"],
+        "mechanism_id": text["mech_id"],
+        "mechanism_suggestions": text["suggestions"],
+        "vision": vision,
+        "request_id": request_id,
+        "agent_mode": agent_mode,
+        "model_versions": REGISTRY.versions(),
+        "timings_ms": {
+            "cv": cv_ms,
+            "text": text_ms,
+            "cv_and_text": parallel_ms,
+            "retrieval": retrieval_ms,
+            "agents": agents_ms,
+            "total": round((time.perf_counter() - started) * 1000, 1),
+        },
+    })
+
+
+def preload():
+    """
+    Load every model and index up front: the FAISS store and its embedding
+    model, the API 571 catalogue and mechanism matrix, the hint vectors, the
+    CV model and the visual index. gunicorn.conf.py runs this in the master
+    so forked workers share the pages copy-on-write instead of each loading
+    its own copy on first request.
+    """
+    t0 = time.perf_counter()
+    EMBEDDER.current()
+    catalogue_digest()
+    warm_up_suggester()
+    warm_up_visual_hints()
+    CV_MODEL.current()
+    get_index()
+    print(f"[serve] preloaded {REGISTRY.versions()} in {time.perf_counter() - t0:.1f}s")
+
 
 if __name__ == "__main__":
+    # Embed the API 571 catalogue and photo hint phrases before the first request needs them
+    warm_up_suggester()
+    warm_up_visual_hints()
+    REGISTRY.watch(float(os.environ.get("MECC_MODEL_WATCH_S", "0")))
+
     # Run dev server
     app.run(host="127.0.0.1", port=5000, debug=True)
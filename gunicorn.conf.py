@@ -0,0 +1,179 @@
+# gunicorn.conf.py
+"""
+Production serving: one master that preloads every model, forked workers
+that share those pages copy-on-write.
+
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py                      # MECC_BIND, default 127.0.0.1:5000
+    MECC_WORKERS=4 MECC_THREADS=8 gunicorn -c gunicorn.conf.py
+
+`python app.py` is still the development server (one process, reloader).
+
+Settings (env):
+  MECC_BIND            address, default 127.0.0.1:5000
+  MECC_WORKERS         worker processes, default min(4, cpus)
+  MECC_THREADS         request threads per worker (gthread), default 8;
+                       analyses mostly wait on the LLM, so threads are cheap
+  MECC_TORCH_THREADS   torch/FAISS intra-op threads per worker, default
+                       cpus // workers so workers don't oversubscribe cores
+  MECC_PRELOAD         1 (default) = load models in the master before forking;
+                       0 = every worker loads its own copy (for comparison)
+  MECC_MAX_REQUESTS    recycle a worker after N requests (0 = never); a fresh
+                       fork shares the master's pages again
+  MECC_MODEL_WATCH_S   per-worker manifest polling, default 10 (see below)
+  MECC_PIDFILE         default data/gunicorn.pid
+  MECC_METRICS_DIR     per-worker /metrics snapshots, default data/metrics
+  MECC_METRICS_FLUSH_S how often each worker writes its snapshot, default 5
+
+Fork safety. The master loads models in its main thread only and starts no
+other threads, so no lock is held when it forks. What a worker cannot
+inherit is reset by at-fork hooks in the modules that own it
+(os.register_at_fork): the thread pools (utils.pools.ForkSafePool) in
+app.py, agents/pipeline.py, cv_classifier.py and the model registry, the
+CV micro-batcher thread, the registry's manifest watcher, the OpenAI client (HTTP connection pool), the
+SQLite handles of the LLM response store and the CV result cache, the
+telemetry file handle and the /metrics series. Torch and FAISS use OpenMP,
+which breaks in a child forked after the parent ran a parallel region, so
+the master runs single-threaded (OMP_NUM_THREADS=1) and each worker sets
+its own thread count after the fork. The master also calls gc.freeze()
+after preloading, so the workers' garbage collector never writes to (and
+thereby copies) the pages holding the preloaded objects.
+
+Reloading:
+  kill -HUP  <master>   new workers forked from the same master, old ones
+                        finish in-flight requests (graceful_timeout) and exit;
+                        picks up config changes, not new code or models
+  kill -USR2 <master>   re-exec: a new master imports the current code and
+                        preloads the current models next to the old one; then
+                        kill -WINCH <old master> and kill -QUIT <old master>
+  data/models.json      each worker polls the manifest and hot-swaps (see
+                        scripts/model_registry.py). POST /api/models/reload
+                        only reaches the worker that answers it. A swapped
+                        model is private to each worker, so after large
+                        swaps prefer USR2 to get sharing back.
+
+Metrics. The series behind /metrics live in each worker's memory, and a
+scrape reaches whichever worker accepts it, so per-process numbers would
+jump between scrapes. Every worker therefore writes its series to
+MECC_METRICS_DIR/<pid>.json and /metrics answers with the sum over all
+workers (utils.metrics.render_metrics); an exited worker's last snapshot is
+folded into retired.json by the master (child_exit), so counters stay
+monotonic across recycling and rate() works. Scrape the one bind address
+as usual; totals lag by at most MECC_METRICS_FLUSH_S. The directory is
+emptied when the master starts.
+
+Memory. scripts/worker_memory.py prints RSS, PSS and shared/private pages
+for the master and each worker. RSS counts shared pages in every process
+that maps them; PSS splits them, so the sum of PSS is what the box
+actually spends. Compare the two modes after the same warm-up traffic
+(e.g. scripts/load_test.py --requests 200), and keep both results:
+
+    MECC_PRELOAD=0 gunicorn -c gunicorn.conf.py &
+    python scripts/worker_memory.py --out data/telemetry/rss_no_preload.json
+    MECC_PRELOAD=1 gunicorn -c gunicorn.conf.py &
+    python scripts/worker_memory.py --out data/telemetry/rss_preload.json
+
+STILL OPEN: no before/after figures have been recorded yet (they need a
+box with the models, torch and gunicorn installed). Until they are, the
+saving is unverified. The expectation is that each worker's RSS stays
+about the same with preloading while most of it becomes shared
+(Shared_Clean/Shared_Dirty) pages, so total PSS drops towards one copy of
+the models plus each worker's private pages (request state, torch scratch
+buffers, anything written after the fork). Replace this paragraph with
+the measured totals.
+"""
+import gc
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+# before anything imports torch/faiss in the master (see "Fork safety")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+# read by utils.metrics at import, so set before the app is loaded
+os.environ.setdefault("MECC_METRICS_DIR", str(ROOT / "data" / "metrics"))
+
+CPUS = os.cpu_count() or 2
+
+wsgi_app = "app:app"
+chdir = str(ROOT)
+bind = os.environ.get("MECC_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("MECC_WORKERS") or min(4, CPUS))
+worker_class = "gthread"
+threads = int(os.environ.get("MECC_THREADS", "8"))
+preload_app = os.environ.get("MECC_PRELOAD", "1") != "0"
+
+# an analysis can spend a minute in the LLM; gthread workers heartbeat from
+# their main loop, so this only catches hung workers
+timeout = 180
+graceful_timeout = 90
+keepalive = 5
+max_requests = int(os.environ.get("MECC_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+pidfile = os.environ.get("MECC_PIDFILE") or str(ROOT / "data" / "gunicorn.pid")
+accesslog = "-"
+
+TORCH_THREADS = int(os.environ.get("MECC_TORCH_THREADS") or max(1, CPUS // workers))
+MODEL_WATCH_S = float(os.environ.get("MECC_MODEL_WATCH_S", "10"))
+METRICS_FLUSH_S = float(os.environ.get("MECC_METRICS_FLUSH_S", "5"))
+
+
+def _app_module():
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    import app
+    return app
+
+
+def _set_compute_threads(n: int):
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(n)
+    if "faiss" in sys.modules:
+        sys.modules["faiss"].omp_set_num_threads(n)
+
+
+def _metrics_module():
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    from utils import metrics
+    return metrics
+
+
+def on_starting(server):
+    """Master: drop snapshots left by a previous run."""
+    metrics_dir = Path(os.environ["MECC_METRICS_DIR"])
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    for p in metrics_dir.glob("*.json"):
+        p.unlink()
+
+
+def when_ready(server):
+    """Master: load everything once, then freeze it out of the GC's reach."""
+    if not preload_app:
+        return
+    _app_module().preload()
+    gc.collect()
+    gc.freeze()
+    server.log.info("preloaded models; %d workers x %d threads, %d torch threads each",
+                    workers, threads, TORCH_THREADS)
+
+
+def post_worker_init(worker):
+    # pools, clients and SQLite handles were already reset by the at-fork hooks
+    app = _app_module()
+    if not preload_app:
+        app.preload()  # no shared copy: each worker loads its own
+    _set_compute_threads(TORCH_THREADS)
+    app.REGISTRY.watch(MODEL_WATCH_S)
+    _metrics_module().start_snapshots(METRICS_FLUSH_S)
+
+
+def worker_exit(server, worker):
+    # last snapshot, so child_exit retires everything this worker counted
+    _metrics_module().write_snapshot()
+
+
+def child_exit(server, worker):
+    _metrics_module().retire(worker.pid)
@@ -1,20 +1,23 @@
 # rag/ingest.py
 from pathlib import Path
-import pdfplumber, json, re
+import json, re, sys
 from tqdm import tqdm
 
+# Add project root to Python path (for utils.pdf)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.pdf import extract_text
+
 DATA_DIR = Path("data")
 CASES_DIR = DATA_DIR / "cases"
 HB_DIR    = DATA_DIR / "handbook"
 OUT_JSONL = DATA_DIR / "rag_corpus.jsonl"
 
 def read_pdf(path: Path) -> str:
-    parts = []
-    with pdfplumber.open(str(path)) as pdf:
-        for p in pdf.pages:
-            txt = p.extract_text() or ""
-            parts.append(txt)
-    return "\n".join(parts)
+    # page text comes from the shared extraction cache
+    return extract_text(path, sep="\n")
 
 def chunk(text: str, max_chars: int = 800):
     # split on double newlines then pack paragraphs
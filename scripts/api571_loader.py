@@ -1,21 +1,72 @@
+import bisect
+import hashlib
 import json
+import pickle
+import re
 from pathlib import Path
 from functools import lru_cache
+from typing import Dict, List
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 
 API571_PATH = BASE_DIR / "data" / "api571_mechanisms_clean.json"
+# Precompiled form of API571_PATH, written by scripts/build_api571_index.py
+API571_COMPILED_PATH = BASE_DIR / "data" / "api571_index.pkl"
 
+COMPILED_FORMAT = 2
+
+# Blocks rendered into the snippet given to the agents (label, entry key)
+SNIPPET_BLOCKS = [
+    ("Description of damage", ("description_of_damage", "description")),
+    ("Affected materials", ("affected_materials",)),
+    ("Critical factors", ("critical_factors",)),
+    ("Affected units / equipment", ("affected_units_equipment",)),
+    ("Appearance / morphology", ("appearance",)),
+    ("Prevention / mitigation", ("prevention_mitigation",)),
+    ("Inspection / monitoring", ("inspection_monitoring",)),
+]
+
+# Fields covered by the keyword index and how much a hit in each counts
+SEARCH_FIELDS = {
+    "name": 5.0,
+    "affected_materials": 2.0,
+    "critical_factors": 1.0,
+    "affected_units_equipment": 1.0,
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "b", "c", "d", "e", "f", "g", "h", "i", "an", "and", "are", "as", "at",
+    "be", "by", "for", "from", "in", "is", "it", "of", "on", "or", "such",
+    "that", "the", "to", "with",
+}
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _as_text(val) -> str:
+    if isinstance(val, list):
+        return "\n".join(val)
+    return val or ""
+
+
+def render_snippet(mech_id: str, entry: dict) -> str:
+    """Text block used as the API 571 'handbook snippet' for a mechanism."""
+    lines = [f"API 571 mechanism {mech_id}: {entry.get('name', mech_id)}"]
+    for label, keys in SNIPPET_BLOCKS:
+        val = next((entry.get(k) for k in keys if entry.get(k)), None)
+        if val:
+            lines.append(f"{label}: {_as_text(val)}")
+    return "\n".join(lines)
 
-@lru_cache(maxsize=1)
-def _load_index():
-    """
-    Load API571 mechanisms as a dict indexed by 'id'.
-    The raw JSON is a list of entries.
-    """
-    with open(API571_PATH, "r", encoding="utf-8") as f:
-        raw = json.load(f)
 
+def _source_digest() -> str:
+    return hashlib.sha1(API571_PATH.read_bytes()).hexdigest()
+
+
+def _raw_to_index(raw) -> Dict[str, dict]:
     # If it's already a dict, just return it
     if isinstance(raw, dict):
         return raw
@@ -30,6 +81,72 @@ def _load_index():
     return index
 
 
+def compile_catalogue(raw, source_digest: str = "") -> dict:
+    """
+    Precompute everything the API needs per mechanism:
+      - entries:  id -> original entry
+      - order:    ids in catalogue order (rank: id -> position)
+      - snippets: id -> rendered snippet text
+      - vocab:    sorted list of indexed tokens (for prefix search)
+      - postings: token -> {id: weight} over SEARCH_FIELDS
+    """
+    entries = _raw_to_index(raw)
+    order = list(entries.keys())
+
+    postings: Dict[str, Dict[str, float]] = {}
+    for mech_id, entry in entries.items():
+        for fld, weight in SEARCH_FIELDS.items():
+            for tok in set(_tokens(_as_text(entry.get(fld)))):
+                hits = postings.setdefault(tok, {})
+                hits[mech_id] = hits.get(mech_id, 0.0) + weight
+
+    return {
+        "format": COMPILED_FORMAT,
+        "source_digest": source_digest,
+        "entries": entries,
+        "order": order,
+        "rank": {mid: i for i, mid in enumerate(order)},
+        "snippets": {mid: render_snippet(mid, e) for mid, e in entries.items()},
+        "vocab": sorted(postings),
+        "postings": postings,
+    }
+
+
+def build_compiled_store(out_path: Path = API571_COMPILED_PATH) -> dict:
+    """Compile API571_PATH and pickle the result next to it."""
+    with open(API571_PATH, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    store = compile_catalogue(raw, _source_digest())
+    with open(out_path, "wb") as f:
+        pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return store
+
+
+@lru_cache(maxsize=1)
+def _load_store() -> dict:
+    """
+    Load the compiled catalogue. Falls back to compiling the JSON in memory
+    when the pickle is missing or was built from a different JSON file.
+    """
+    digest = _source_digest()
+    if API571_COMPILED_PATH.exists():
+        with open(API571_COMPILED_PATH, "rb") as f:
+            store = pickle.load(f)
+        if store.get("format") == COMPILED_FORMAT and store.get("source_digest") == digest:
+            return store
+
+    with open(API571_PATH, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return compile_catalogue(raw, digest)
+
+
+def _load_index():
+    """
+    API571 mechanisms as a dict indexed by 'id'.
+    """
+    return _load_store()["entries"]
+
+
 def get_mechanism_entry(mech_id: str):
     """
     Return the API571 entry for a mechanism id like '3.2'.
@@ -43,4 +160,74 @@ def get_mechanism_name(mech_id: str) -> str:
     entry = get_mechanism_entry(mech_id)
     if not entry:
         return str(mech_id)
-    return entry.get("name", str(mech_id))
\ No newline at end of file
+    return entry.get("name", str(mech_id))
+
+
+def catalogue_digest() -> str:
+    """Digest of the JSON the loaded catalogue was compiled from."""
+    return _load_store()["source_digest"]
+
+
+def iter_mechanisms():
+    """(id, entry) pairs in catalogue order."""
+    store = _load_store()
+    return [(mid, store["entries"][mid]) for mid in store["order"]]
+
+
+def get_mechanism_snippet(mech_id: str):
+    """Pre-rendered snippet text for a mechanism id, or None if unknown."""
+    return _load_store()["snippets"].get(str(mech_id))
+
+
+def search_mechanisms(query: str, limit: int = 20) -> List[dict]:
+    """
+    Keyword search over names, materials, critical factors and affected units.
+
+    Every query word must match (the last one as a prefix, so partial input
+    from the UI dropdown works). An exact id like '3.2' is returned first.
+    An empty query lists the catalogue in order.
+    """
+    store = _load_store()
+    entries, order = store["entries"], store["order"]
+    query = (query or "").strip()
+
+    if not query:
+        ids = order[:limit]
+        return [{"id": mid, "name": entries[mid].get("name", mid), "score": 0.0} for mid in ids]
+
+    vocab, postings = store["vocab"], store["postings"]
+    words = _tokens(query)
+    scores: Dict[str, float] = {}
+
+    for i, word in enumerate(words):
+        if i == len(words) - 1:
+            # prefix match on the last word: all vocab entries in [word, word + "\uffff")
+            lo = bisect.bisect_left(vocab, word)
+            hi = bisect.bisect_left(vocab, word + "\uffff")
+            matched = vocab[lo:hi]
+        else:
+            matched = [word] if word in postings else []
+
+        word_scores: Dict[str, float] = {}
+        for tok in matched:
+            # an exact token is worth more than a longer completion
+            boost = 1.0 if tok == word else 0.5
+            for mid, w in postings[tok].items():
+                word_scores[mid] = max(word_scores.get(mid, 0.0), w * boost)
+
+        if i == 0:
+            scores = word_scores
+        else:
+            scores = {mid: s + word_scores[mid] for mid, s in scores.items() if mid in word_scores}
+        if not scores:
+            break
+
+    if query in entries:
+        scores[query] = scores.get(query, 0.0) + 100.0
+
+    rank = store["rank"]
+    ranked = sorted(scores.items(), key=lambda kv: (-kv[1], rank.get(kv[0], 0)))
+    return [
+        {"id": mid, "name": entries[mid].get("name", mid), "score": round(s, 3)}
+        for mid, s in ranked[:limit]
+    ]
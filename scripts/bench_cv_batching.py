@@ -0,0 +1,121 @@
+"""
+CPU-only load test for the CV micro-batcher.
+
+Runs closed-loop clients (each sends its next image as soon as the last one
+returns) against the classifier for several (max_batch, max_wait_ms)
+settings and prints throughput, per-request latency and the batch-size
+histogram for each, so the throughput/latency tradeoff can be read off
+directly.
+
+    python scripts/bench_cv_batching.py --clients 8 --requests 200
+    python scripts/bench_cv_batching.py --images "Image for CV" --configs 1:0 4:5 8:10 16:20
+"""
+import os
+
+# CPU only, regardless of what the box has
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+# Add project root to Python path (for utils.metrics)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.metrics import percentile
+
+from cv_batcher import MicroBatcher
+from cv_classifier import IMG_SIZE, decode_image, predict_probs, warm_up
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def load_images(folder: str, limit: int) -> List[np.ndarray]:
+    if not folder:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8) for _ in range(limit)]
+    paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_EXTS)[:limit]
+    return [decode_image(p.read_bytes()) for p in paths]
+
+
+def run_config(images: List[np.ndarray], max_batch: int, max_wait_ms: float,
+               clients: int, requests: int) -> dict:
+    batcher = MicroBatcher(predict_probs, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    latencies: List[float] = []
+    lock = threading.Lock()
+    counter = [0]
+
+    def client():
+        while True:
+            with lock:
+                i = counter[0]
+                if i >= requests:
+                    return
+                counter[0] += 1
+            t0 = time.perf_counter()
+            batcher(images[i % len(images)])
+            with lock:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    batcher.close()
+
+    stats = batcher.stats.summary()
+    return {
+        "max_batch": max_batch,
+        "max_wait_ms": max_wait_ms,
+        "throughput": requests / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean_batch": stats["mean_batch_size"],
+        "histogram": stats["batch_size_histogram"],
+    }
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Load-test CV micro-batching on CPU.")
+    ap.add_argument("--images", default="", help="folder of images (default: random arrays)")
+    ap.add_argument("--clients", type=int, default=8, help="concurrent closed-loop clients")
+    ap.add_argument("--requests", type=int, default=200, help="requests per configuration")
+    ap.add_argument("--configs", nargs="+", default=["1:0", "4:5", "8:10", "16:20"],
+                    help="max_batch:max_wait_ms pairs to compare")
+    ap.add_argument("--threads", type=int, default=0, help="torch CPU threads (0 = default)")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    images = load_images(args.images, limit=max(32, args.clients * 4))
+    print(f"{len(images)} images, {args.clients} clients, {args.requests} requests per config")
+    warm_up()
+
+    print(f"\n{'batch':>5s} {'wait':>5s} {'img/s':>7s} {'p50 ms':>8s} {'p95 ms':>8s} "
+          f"{'p99 ms':>8s} {'mean bs':>7s}  histogram")
+    for cfg in args.configs:
+        max_batch, max_wait = cfg.split(":")
+        r = run_config(images, int(max_batch), float(max_wait), args.clients, args.requests)
+        print(f"{r['max_batch']:5d} {r['max_wait_ms']:5g} {r['throughput']:7.1f} "
+              f"{r['p50']:8.1f} {r['p95']:8.1f} {r['p99']:8.1f} {r['mean_batch']:7.2f}  "
+              f"{r['histogram']}")
+
+
+if __name__ == "__main__":
+    main()
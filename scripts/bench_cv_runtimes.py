@@ -0,0 +1,127 @@
+"""
+Accuracy-parity and CPU latency benchmark: best.pt vs its ONNX / OpenVINO exports.
+
+    python scripts/bench_cv_runtimes.py --data /path/to/my_dataset/test
+    python scripts/bench_cv_runtimes.py --data ... --runtimes torch onnx openvino --batch 8 --threads 4
+
+--data is the held-out test split in the layout Computer_Vision.ipynb trains
+from (one subfolder per class). For each runtime it reports top-1/top-5
+accuracy, top-1 agreement with the .pt model, single-image latency
+(p50/p95) and batched throughput. Runs on CPU only.
+"""
+import os
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+# Add project root to Python path (for utils.metrics)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.metrics import percentile
+
+from cv_classifier import PT_WEIGHTS, RUNTIMES, decode_image, open_model, predict_probs, weights_for
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def load_split(folder: Path, limit: int = 0) -> List[Tuple[np.ndarray, str]]:
+    """(image, class label) pairs from a class-per-subfolder split."""
+    paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+    if limit:
+        paths = paths[:limit]
+    return [(decode_image(p.read_bytes()), p.parent.name) for p in paths]
+
+
+def evaluate(model, samples, batch: int, repeats: int) -> dict:
+    images = [img for img, _ in samples]
+    labels = [label for _, label in samples]
+
+    predict_probs(images[:1], model=model)  # warm-up
+
+    # single-image latency (also gives the predictions for accuracy)
+    lat, probs = [], []
+    for img in images:
+        t0 = time.perf_counter()
+        p, names = predict_probs([img], model=model)[0]
+        lat.append((time.perf_counter() - t0) * 1000)
+        probs.append(p)
+
+    # batched throughput
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(images), batch):
+            predict_probs(images[i:i + batch], model=model)
+    throughput = repeats * len(images) / (time.perf_counter() - t0)
+
+    index = {name: i for i, name in names.items()}
+    top1 = top5 = 0
+    for p, label in zip(probs, labels):
+        order = np.argsort(-p)
+        true = index.get(label)
+        top1 += int(order[0] == true)
+        top5 += int(true in order[:5])
+    n = len(samples)
+    return {
+        "top1": top1 / n,
+        "top5": top5 / n,
+        "pred": [int(p.argmax()) for p in probs],
+        "p50": percentile(lat, 50),
+        "p95": percentile(lat, 95),
+        "throughput": throughput,
+    }
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Compare CV classifier runtimes on CPU.")
+    ap.add_argument("--data", required=True, help="test split folder (one subfolder per class)")
+    ap.add_argument("--runtimes", nargs="+", default=list(RUNTIMES), choices=RUNTIMES)
+    ap.add_argument("--weights", default=str(PT_WEIGHTS), help=".pt the exports were made from")
+    ap.add_argument("--batch", type=int, default=8, help="batch size for the throughput pass")
+    ap.add_argument("--repeats", type=int, default=1, help="throughput passes over the split")
+    ap.add_argument("--limit", type=int, default=0, help="use only the first N images")
+    ap.add_argument("--threads", type=int, default=0, help="torch CPU threads (0 = default)")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    samples = load_split(Path(args.data), limit=args.limit)
+    if not samples:
+        raise SystemExit(f"no images under {args.data}")
+    print(f"{len(samples)} test images, batch {args.batch}, "
+          f"{len({label for _, label in samples})} classes")
+
+    pt = Path(args.weights)
+    results = {}
+    for runtime in args.runtimes:
+        path = weights_for(runtime, pt)
+        if not path.exists():
+            print(f"[skip] {runtime}: {path} not found (run scripts/export_cv_model.py)")
+            continue
+        results[runtime] = evaluate(open_model(path), samples, args.batch, args.repeats)
+        results[runtime]["model"] = path.name
+
+    ref = results.get("torch")
+    print(f"\n{'runtime':<9s} {'model':<28s} {'top1':>6s} {'top5':>6s} {'agree':>6s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'img/s':>7s}")
+    for runtime, r in results.items():
+        agree = (np.mean([a == b for a, b in zip(r["pred"], ref["pred"])]) if ref else float("nan"))
+        print(f"{runtime:<9s} {r['model']:<28s} {r['top1']:6.1%} {r['top5']:6.1%} {agree:6.1%} "
+              f"{r['p50']:8.1f} {r['p95']:8.1f} {r['throughput']:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark the single-pass report segmenter against the old per-pattern
+re.search approach on the extracted case files, and check its sections on
+reports whose segmentation has regressed before.
+
+    python scripts/bench_report_sections.py [--repeat 20]
+    python scripts/bench_report_sections.py --check     # exit 1 on a mismatch
+
+Speed is not a reason to prefer the single pass per report: the legacy
+search stops at the first hit of each pattern, so it is faster on three of
+the five reports (e.g. Wendland, about 0.9 ms vs 2.6 ms). It is slower where
+patterns have no match and the whole uppercased text is scanned once per
+pattern (TPC about 25 ms vs 2.6 ms, Chevron 11 ms vs 8 ms), which dominates
+the total. What the single pass buys is correctness: headings must stand on
+their own line in upper or title case, TOC pages are skipped and chapter
+headings win over summary subsections of the same name.
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+from report_sections import SECTION_HEADINGS, find_toc_pages, segment_report
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RAW_DIR = BASE_DIR / "data" / "extracted_cases"
+
+# file name -> {section key: (page_start, page_end) or None for "not found"}
+EXPECTED = {
+    # table cell "safety management" (p.110) was taken as safety_issues, and the
+    # summary subsection "1.6 Recommendations" (p.13) ran on to p.76
+    "Chevron_Regulatory_Report_11102014_FINAL_-_post_raw.txt": {
+        "executive_summary": (7, 14),
+        "incident_description": None,
+        "technical_analysis": (76, 92),
+        "safety_issues": None,
+        "recommendations": (96, 103),
+        "key_lessons": None,
+    },
+}
+
+
+def legacy_positions(text: str):
+    """The heading search previously copy-pasted into the ingest scripts."""
+    upper = text.upper()
+    positions = {}
+    for key, patterns in SECTION_HEADINGS.items():
+        for pat in patterns:
+            m = re.search(pat, upper)
+            if m:
+                if key not in positions or m.start() < positions[key]:
+                    positions[key] = m.start()
+                break
+    return positions
+
+
+def check(name: str, seg) -> list:
+    """Mismatches between seg and EXPECTED[name], as printable lines."""
+    errors = []
+    for key, want in EXPECTED.get(name, {}).items():
+        s = seg.sections.get(key)
+        got = (s.page_start, s.page_end) if s else None
+        if got != want:
+            errors.append(f"{name}: {key} expected {want}, got {got}")
+    return errors
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--check", action="store_true", help="only compare with EXPECTED")
+    args = ap.parse_args()
+
+    if args.check:
+        errors = []
+        for name in EXPECTED:
+            text = (RAW_DIR / name).read_text(encoding="utf-8", errors="ignore")
+            errors += check(name, segment_report(text))
+        print("\n".join(errors) or f"{len(EXPECTED)} report(s) segmented as expected")
+        sys.exit(1 if errors else 0)
+
+    txt_files = sorted(RAW_DIR.glob("*.txt"))
+    if not txt_files:
+        print(f"No .txt files found in {RAW_DIR}")
+        return
+
+    total_old = total_new = 0.0
+    for txt_path in txt_files:
+        text = txt_path.read_text(encoding="utf-8", errors="ignore")
+        old_ms = _time(legacy_positions, text, args.repeat)
+        new_ms = _time(segment_report, text, args.repeat)
+        total_old += old_ms
+        total_new += new_ms
+
+        seg = segment_report(text)
+        old = legacy_positions(text)
+        print(f"\n{txt_path.name}  ({len(text) / 1024:.0f} KB, {seg.num_pages} pages, "
+              f"TOC pages {sorted(find_toc_pages(text, seg.page_starts))})")
+        print(f"  legacy {old_ms:7.2f} ms   single-pass {new_ms:7.2f} ms")
+        for key in SECTION_HEADINGS:
+            s = seg.sections.get(key)
+            new_desc = (f"p.{s.page_start}-{s.page_end} '{s.heading}' ({len(s.text)} chars)"
+                        if s else "-")
+            old_desc = f"p.{seg.page_at(old[key])}" if key in old else "-"
+            print(f"  {key:22s} legacy {old_desc:7s} -> {new_desc}")
+
+    print(f"\nTotal per pass: legacy {total_old:.2f} ms, single-pass {total_new:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
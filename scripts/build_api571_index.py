@@ -0,0 +1,28 @@
+"""
+Compile data/api571_mechanisms_clean.json into data/api571_index.pkl:
+pre-rendered snippet text per mechanism plus an inverted keyword index.
+
+Re-run after clean_api571.py; the API falls back to compiling in memory
+if the pickle is missing or out of date.
+"""
+import time
+
+from api571_loader import API571_COMPILED_PATH, build_compiled_store, search_mechanisms
+
+
+def main():
+    t0 = time.perf_counter()
+    store = build_compiled_store()
+    print(f"Compiled {len(store['entries'])} mechanisms, {len(store['vocab'])} index terms "
+          f"in {(time.perf_counter() - t0) * 1000:.1f} ms → {API571_COMPILED_PATH}")
+
+    # quick lookup timing on the freshly built store
+    n = 2000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        search_mechanisms("carbon steel amine")
+    print(f"search_mechanisms: {(time.perf_counter() - t0) / n * 1e6:.1f} µs/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,53 @@
+import argparse
 import os
 import re
 import json
+import random
+import sys
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from openai import OpenAI
 
+# Add project root to Python path (for utils.llm_store)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.llm_store import StoredClient
+from utils.llm_telemetry import TELEMETRY, llm_call, print_report
+
+from llm_concurrency import Progress, RateLimiter
+from map_reduce import (
+    count_tokens, done_future, estimate_calls, split_into_pieces, submit_map_reduce,
+)
+from report_sections import segment_report
+from run_manifest import (
+    STATUS_DONE, STATUS_FAILED, STATUS_PARTIAL, RunManifest,
+    prompt_version, run_key, text_hash, write_json_atomic,
+)
+
 # ---------------- CONFIG ----------------
 
 MODEL_NAME = "gpt-4-turbo-mini"  # You can change this later if you want
 
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 2.0  # seconds, doubled per attempt
+
 # Project-relative paths (portable)
 BASE_DIR = Path(__file__).resolve().parents[1]
 RAW_DIR = BASE_DIR / "data" / "extracted_cases"
 OUT_DIR = BASE_DIR / "data" / "cases_structured_llm"
 OUT_DIR.mkdir(exist_ok=True)
+# Per-case / per-section checkpoints for resuming interrupted runs
+MANIFEST_PATH = OUT_DIR / "_manifest.jsonl"
 
 # Set your API key in the environment before running:
 #   setx OPENAI_API_KEY "your-key-here"  (Windows)
-client = OpenAI()
-
-# Canonical section keys and possible headings (in UPPERCASE)
-SECTION_HEADINGS = {
-    "executive_summary": [
-        r"EXECUTIVE SUMMARY",
-        r"SUMMARY",
-        r"ABSTRACT",
-    ],
-    "incident_description": [
-        r"INCIDENT DESCRIPTION",
-        r"DESCRIPTION OF INCIDENT",
-        r"DESCRIPTION OF THE INCIDENT",
-        r"ACCIDENT DESCRIPTION",
-        r"BACKGROUND OF THE INCIDENT",
-    ],
-    "technical_analysis": [
-        r"TECHNICAL ANALYSIS",
-        r"TECHNICAL DISCUSSION",
-        r"CAUSE ANALYSIS",
-        r"ANALYSIS",
-    ],
-    "safety_issues": [
-        r"SAFETY ISSUES",
-        r"SAFETY MANAGEMENT",
-        r"CONTRIBUTING FACTORS",
-        r"CAUSAL FACTORS",
-        r"ROOT CAUSES",
-    ],
-    "recommendations": [
-        r"RECOMMENDATIONS",
-        r"SAFETY RECOMMENDATIONS",
-        r"CORRECTIVE ACTIONS",
-        r"PREVENTIVE ACTIONS",
-        r"PREVENTION MEASURES",
-    ],
-    "key_lessons": [
-        r"KEY LESSONS",
-        r"LESSONS LEARNED",
-        r"KEY LESSONS FOR THE INDUSTRY",
-        r"KEY LESSONS FOR INDUSTRY",
-        r"KEY LESSONS FOR THE PETROLEUM INDUSTRY",
-    ],
-}
+# MECC_LLM_STORE_MODE=record|replay reuses stored responses (see utils/llm_store.py)
+client = StoredClient(OpenAI)
 
 # How we describe each section to the LLM
 SECTION_STYLES = {
@@ -93,6 +79,49 @@ USER_PROMPT_TEMPLATE = (
     "--- END SECTION TEXT ---"
 )
 
+# Map step for sections too long for one call: rewrite one piece
+MAP_PROMPT_TEMPLATE = (
+    "Here is part {part} of {parts} of the {section_name} section from an incident "
+    "investigation report.\n\n"
+    "Task: Condense this part into dense plain-text notes that keep every fact, cause, "
+    "finding, and recommendation it contains. Do NOT add any information that is not "
+    "in the text.\n\n"
+    "--- BEGIN SECTION PART ---\n"
+    "{section_text}\n"
+    "--- END SECTION PART ---"
+)
+
+# Reduce step: merge notes from consecutive parts into the final section
+REDUCE_PROMPT_TEMPLATE = (
+    "Here are notes taken from consecutive parts of the {section_name} section of an "
+    "incident investigation report, in order.\n\n"
+    "Task: Combine them into {style}. Keep every distinct fact, cause, and "
+    "recommendation, merge duplicates, and keep the original order of events. "
+    "Do NOT add any information that is not in the notes.\n\n"
+    "--- BEGIN NOTES ---\n"
+    "{section_text}\n"
+    "--- END NOTES ---"
+)
+
+# How sections longer than one call are handled:
+#   "map-reduce": split into PIECE_MAX_TOKENS pieces, rewrite them in parallel, merge
+#   "truncate":   keep only the first SECTION_MAX_CHARS characters
+LONG_SECTION_MODES = ("map-reduce", "truncate")
+SECTION_MAX_CHARS = 3000
+PIECE_MAX_TOKENS = 1500
+REDUCE_MAX_TOKENS = 3000
+
+# Changes whenever the prompts or long-section handling change, invalidating old checkpoints
+PROMPT_VERSIONS = {
+    "truncate": prompt_version(
+        "sections-v1", SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, SECTION_STYLES, SECTION_MAX_CHARS
+    ),
+    "map-reduce": prompt_version(
+        "sections-mr-v1", SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, SECTION_STYLES,
+        MAP_PROMPT_TEMPLATE, REDUCE_PROMPT_TEMPLATE, PIECE_MAX_TOKENS, REDUCE_MAX_TOKENS,
+    ),
+}
+
 # ------------- TEXT UTILITIES -------------
 
 
@@ -107,145 +136,267 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
-def find_section_positions(text: str):
-    """
-    Find approximate positions of key headings in the full report text.
-
-    Returns a dict:
-      { section_key: (start_index_in_original_text, heading_string_found) }
-    """
-    upper = text.upper()
-    positions = {}
-
-    for key, patterns in SECTION_HEADINGS.items():
-        for pat in patterns:
-            m = re.search(pat, upper)
-            if m:
-                # keep the earliest match for this key
-                if key not in positions or m.start() < positions[key][0]:
-                    positions[key] = (m.start(), m.group(0))
-                break  # stop at first pattern that matches for this key
-
-    return positions
-
-
-def slice_sections(text: str, section_positions: dict):
-    """
-    Given full text and the heading positions, slice it into sections.
-
-    Returns a dict { section_key: section_text }.
-    Missing sections get "".
-    """
-    sections = {key: "" for key in SECTION_HEADINGS.keys()}
-
-    if not section_positions:
-        return sections
-
-    # Build sorted list: (start_index, section_key, heading_text)
-    items = sorted(
-        [(pos, key, heading) for key, (pos, heading) in section_positions.items()],
-        key=lambda x: x[0],
-    )
-
-    for i, (start, key, heading) in enumerate(items):
-        # Section ends at next heading or end of text
-        end = items[i + 1][0] if i + 1 < len(items) else len(text)
-
-        # Find the end of the heading line in original text
-        newline_idx = text.find("\n", start)
-        if newline_idx == -1:
-            heading_end = start + len(heading)
-        else:
-            heading_end = newline_idx + 1
+# ------------- LLM CALLER -------------
 
-        raw_section = text[heading_end:end]
-        sections[key] = clean_text(raw_section)
 
-    return sections
+def _complete_section(section_key: str, user_prompt: str, limiter: RateLimiter,
+                      caller: str = "section_rewrite") -> str:
+    """One chat completion with retries; raises after the last attempt."""
+    for attempt in range(MAX_ATTEMPTS):
+        waited = time.perf_counter()
+        limiter.acquire()
+        waited = (time.perf_counter() - waited) * 1000
+        try:
+            with llm_call(caller, attempt=attempt + 1, queue_wait_ms=round(waited, 2)):
+                completion = client.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    max_tokens=800,
+                )
+            content = completion.choices[0].message.content
+            return content.strip()
+        except Exception as e:
+            print(f"[LLM {section_key} attempt {attempt+1}] Error: {e}")
+            if attempt + 1 >= MAX_ATTEMPTS:
+                raise
+            # exponential backoff with jitter; only this worker waits
+            delay = RETRY_BASE_DELAY * (2 ** attempt) * (0.5 + random.random())
+            print(f"Retrying {section_key} in {delay:.1f} seconds…")
+            time.sleep(delay)
 
 
-# ------------- LLM CALLER -------------
+def _nice_name(section_key: str) -> str:
+    return section_key.replace("_", " ").title()
 
 
-def run_llm_section(section_key: str, section_text: str) -> str:
+def rewrite_section(section_key: str, section_text: str,
+                    limiter: Optional[RateLimiter] = None,
+                    truncate: bool = True) -> Tuple[str, Optional[str]]:
     """
-    Call the LLM for a single section and return cleaned text.
-    If the section_text is empty or very short, return it as-is.
+    Call the LLM for a single section.
+    Returns (text, error): on failure, text is the raw section (so we don't
+    lose data) and error describes what went wrong.
+    Safe to call from several threads at once.
     """
     section_text = section_text.strip()
     if not section_text:
-        return ""
+        return "", None
 
     # Truncate very long sections for stability (roughly 3000 chars)
-    MAX_CHARS = 3000
-    if len(section_text) > MAX_CHARS:
-        section_text = section_text[:MAX_CHARS]
+    if truncate and len(section_text) > SECTION_MAX_CHARS:
+        section_text = section_text[:SECTION_MAX_CHARS]
 
     style = SECTION_STYLES.get(section_key, "a clear, concise summary")
-    section_name_nice = section_key.replace("_", " ").title()
 
     user_prompt = USER_PROMPT_TEMPLATE.format(
-        section_name=section_name_nice,
+        section_name=_nice_name(section_key),
         style=style,
         section_text=section_text,
     )
 
-    # Simple retry logic for transient errors
-    for attempt in range(3):
-        try:
-            completion = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt},
-                ],
-                max_tokens=800,
-            )
-            content = completion.choices[0].message.content
-            return content.strip()
-        except Exception as e:
-            print(f"[LLM {section_key} attempt {attempt+1}] Error: {e}")
-            if attempt < 2:
-                print("Retrying in 2 seconds…")
-                time.sleep(2)
-            else:
-                print(f"Giving up on section {section_key}, returning raw text.")
-                # Fall back to the raw cleaned section text so we don't lose data
-                return section_text
+    try:
+        return _complete_section(section_key, user_prompt, limiter or RateLimiter(0)), None
+    except Exception as e:
+        print(f"Giving up on section {section_key}, returning raw text.")
+        return section_text, str(e)
+
+
+def run_llm_section(section_key: str, section_text: str,
+                    limiter: Optional[RateLimiter] = None,
+                    progress: Optional[Progress] = None) -> str:
+    """
+    Call the LLM for a single section and return cleaned text.
+    If the section_text is empty or very short, return it as-is.
+    """
+    content, error = rewrite_section(section_key, section_text, limiter)
+    if progress is not None and section_text.strip():
+        progress.call_done(error is None)
+    return content
 
 
 # ------------- MAIN PIPELINE -------------
 
 
-def process_case_file(txt_path: Path) -> dict:
-    """Process a single *_raw.txt file -> structured case dict."""
+def load_case_sections(txt_path: Path, mode: str = "map-reduce") -> Tuple[str, str, Dict[str, str]]:
+    """
+    Read a *_raw.txt file -> (case_id, run_key, { section_key: cleaned section text }).
+    The run key ties checkpoints to this exact input, prompt version and model.
+    """
     raw_text = txt_path.read_text(encoding="utf-8", errors="ignore")
+    key = run_key(text_hash(raw_text), PROMPT_VERSIONS[mode], MODEL_NAME)
     raw_text = clean_text(raw_text)
 
     case_id = txt_path.stem.replace("_raw", "")
-    title = case_id  # you can manually refine titles later if needed
+    seg = segment_report(raw_text)
+    sections_raw = {k: clean_text(v) for k, v in seg.section_texts().items()}
+    return case_id, key, sections_raw
+
+
+def _record(manifest: Optional[RunManifest], case_id: str, key: str, slot: str,
+            content: str, error: Optional[str]):
+    if manifest is not None:
+        status = STATUS_FAILED if error else STATUS_DONE
+        manifest.record_section(case_id, key, slot, status,
+                                output=None if error else content, error=error)
+
+
+def _section_job(case_id: str, key: str, section_key: str, text: str,
+                 limiter: RateLimiter, progress: Progress,
+                 manifest: Optional[RunManifest], truncate: bool = True) -> Tuple[str, bool]:
+    """Rewrite one section and checkpoint it. Returns (text, ok)."""
+    content, error = rewrite_section(section_key, text, limiter, truncate=truncate)
+    if text.strip():
+        progress.call_done(error is None)
+    _record(manifest, case_id, key, section_key, content, error)
+    return content, error is None
 
-    print(f"  - Finding sections in {case_id}...")
-    positions = find_section_positions(raw_text)
-    sections_raw = slice_sections(raw_text, positions)
 
-    # Call LLM per section
-    structured_sections = {}
-    for key, raw_section_text in sections_raw.items():
-        print(f"    > Cleaning section '{key}' with LLM...")
-        cleaned = run_llm_section(key, raw_section_text)
-        structured_sections[key] = cleaned
+def _is_long(text: str, mode: str) -> bool:
+    return mode == "map-reduce" and count_tokens(text) > PIECE_MAX_TOKENS
+
+
+def _submit_long_section(pool: ThreadPoolExecutor, case_id: str, key: str, section_key: str,
+                         text: str, limiter: RateLimiter, progress: Progress,
+                         manifest: Optional[RunManifest]) -> Future:
+    """
+    Map-reduce a section that does not fit one call. Pieces are rewritten in
+    parallel and each piece result is checkpointed, so a re-run only pays for
+    pieces that failed plus the merge. Resolves to (text, ok) like _section_job.
+    """
+    pieces = split_into_pieces(text, PIECE_MAX_TOKENS)
+    style = SECTION_STYLES.get(section_key, "a clear, concise summary")
+    name = _nice_name(section_key)
 
+    def counted(slot: str, prompt: str, caller: str) -> str:
+        try:
+            out = _complete_section(slot, prompt, limiter, caller)
+        except Exception:
+            progress.call_done(False)
+            raise
+        progress.call_done(True)
+        return out
+
+    def map_fn(i: int, piece: str) -> str:
+        slot = f"{section_key}#map{i}"
+        cached = manifest.section_output(case_id, key, slot) if manifest else None
+        if cached is not None:
+            return cached
+        out = counted(slot, MAP_PROMPT_TEMPLATE.format(
+            part=i + 1, parts=len(pieces), section_name=name, section_text=piece), "section_map")
+        _record(manifest, case_id, key, slot, out, None)
+        return out
+
+    def reduce_fn(level: int, i: int, notes: List[str]) -> str:
+        return counted(f"{section_key}#reduce{level}.{i}", REDUCE_PROMPT_TEMPLATE.format(
+            section_name=name, style=style, section_text="\n\n".join(notes)), "section_reduce")
+
+    result: Future = Future()
+
+    def finish(fut: Future):
+        error = fut.exception()
+        if error is None:
+            content = fut.result()
+        else:
+            print(f"Giving up on section {section_key}, returning raw text.")
+            content = text[:SECTION_MAX_CHARS]
+        _record(manifest, case_id, key, section_key, content, str(error) if error else None)
+        result.set_result((content, error is None))
+
+    submit_map_reduce(pool, pieces, map_fn, reduce_fn, REDUCE_MAX_TOKENS).add_done_callback(finish)
+    return result
+
+
+def planned_calls(case_id: str, key: str, sections_raw: Dict[str, str],
+                  manifest: Optional[RunManifest], mode: str) -> int:
+    """Approximate LLM calls needed to finish a case (for progress reporting)."""
+    total = 0
+    for sec_key, text in sections_to_run(case_id, key, sections_raw, manifest).items():
+        if _is_long(text, mode):
+            pieces = split_into_pieces(text, PIECE_MAX_TOKENS)
+            cached = sum(
+                1 for i in range(len(pieces))
+                if manifest and manifest.section_output(case_id, key, f"{sec_key}#map{i}") is not None
+            )
+            total += estimate_calls(len(pieces)) - cached
+        else:
+            total += 1
+    return total
+
+
+def sections_to_run(case_id: str, key: str, sections_raw: Dict[str, str],
+                    manifest: Optional[RunManifest]) -> Dict[str, str]:
+    """Non-empty sections without a finished checkpoint."""
+    return {
+        k: t for k, t in sections_raw.items()
+        if t.strip() and (manifest is None or manifest.section_output(case_id, key, k) is None)
+    }
+
+
+def submit_case(pool: ThreadPoolExecutor, case_id: str, key: str, sections_raw: Dict[str, str],
+                limiter: RateLimiter, progress: Progress,
+                manifest: Optional[RunManifest] = None, mode: str = "map-reduce") -> Dict[str, Future]:
+    """Queue the case's unfinished sections on the shared pool."""
+    todo = sections_to_run(case_id, key, sections_raw, manifest)
+    futures = {}
+    for sec_key, text in sections_raw.items():
+        if sec_key in todo and _is_long(text, mode):
+            futures[sec_key] = _submit_long_section(pool, case_id, key, sec_key, text,
+                                                    limiter, progress, manifest)
+        elif sec_key in todo:
+            futures[sec_key] = pool.submit(_section_job, case_id, key, sec_key, text,
+                                           limiter, progress, manifest, mode == "truncate")
+        elif not text.strip():
+            futures[sec_key] = done_future(("", True))
+        else:
+            futures[sec_key] = done_future((manifest.section_output(case_id, key, sec_key), True))
+    return futures
+
+
+def collect_case(case_id: str, futures: Dict[str, Future]) -> Tuple[dict, bool]:
+    """
+    Wait for a case's sections; keys stay in SECTION_HEADINGS order.
+    Returns (case_data, all_sections_ok).
+    """
     case_data = {
         "case_id": case_id,
-        "title": title,
-        **structured_sections,
+        "title": case_id,  # you can manually refine titles later if needed
     }
+    all_ok = True
+    for sec_key, fut in futures.items():
+        case_data[sec_key], ok = fut.result()
+        all_ok = all_ok and ok
+    return case_data, all_ok
 
-    return case_data
+
+def process_case_file(txt_path: Path) -> dict:
+    """Process a single *_raw.txt file -> structured case dict."""
+    case_id, key, sections_raw = load_case_sections(txt_path)
+    with ThreadPoolExecutor(max_workers=len(sections_raw) or 1) as pool:
+        futures = submit_case(pool, case_id, key, sections_raw, RateLimiter(0),
+                              Progress(sum(1 for t in sections_raw.values() if t), 1))
+        return collect_case(case_id, futures)[0]
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Rewrite case report sections with an LLM.")
+    ap.add_argument("--max-in-flight", type=int, default=8,
+                    help="maximum concurrent LLM requests across all cases")
+    ap.add_argument("--rpm", type=float, default=120,
+                    help="request rate limit per minute (0 = unlimited)")
+    ap.add_argument("--burst", type=int, default=4,
+                    help="requests allowed back-to-back before the rate limit applies")
+    ap.add_argument("--force", action="store_true",
+                    help="ignore checkpoints from earlier runs and redo every call")
+    ap.add_argument("--long-sections", choices=LONG_SECTION_MODES, default="map-reduce",
+                    help="how to handle sections longer than one call")
+    return ap.parse_args()
 
 
 def main():
+    args = parse_args()
     all_cases = []
 
     txt_files = sorted(RAW_DIR.glob("*.txt"))
@@ -255,38 +406,87 @@ def main():
 
     print(f"Found {len(txt_files)} raw case files in {RAW_DIR}.")
 
+    if args.force and MANIFEST_PATH.exists():
+        MANIFEST_PATH.unlink()
+    manifest = RunManifest(MANIFEST_PATH)
+
+    # Segment everything up front (cheap) so progress knows the total call count
+    loaded = []
+    skipped = 0
     for txt_path in txt_files:
-        print(f"\nProcessing {txt_path.name} ...")
+        case_id = txt_path.stem.replace("_raw", "")
         try:
-            case_data = process_case_file(txt_path)
+            case_id, key, secs = load_case_sections(txt_path, args.long_sections)
         except Exception as e:
-            print(f"[ERROR] Failed to process {txt_path.name}: {e}")
-            # still write a minimal placeholder so the pipeline doesn't break
-            case_id = txt_path.stem.replace("_raw", "")
-            case_data = {
-                "case_id": case_id,
-                "title": case_id,
-                "executive_summary": "",
-                "incident_description": "",
-                "technical_analysis": "",
-                "safety_issues": "",
-                "recommendations": "",
-                "key_lessons": "",
-            }
-
-        # Save per-case JSON
-        out_path = OUT_DIR / f"{case_data['case_id']}.json"
-        with out_path.open("w", encoding="utf-8") as f:
-            json.dump(case_data, f, ensure_ascii=False, indent=2)
-
-        all_cases.append(case_data)
+            print(f"[ERROR] Failed to read {txt_path.name}: {e}")
+            manifest.record_case(case_id, "", STATUS_FAILED, error=str(e))
+            continue
+
+        out_path = OUT_DIR / f"{case_id}.json"
+        if manifest.case_done(case_id, key) and out_path.exists():
+            skipped += 1
+            loaded.append((txt_path, case_id, key, None))
+        else:
+            loaded.append((txt_path, case_id, key, secs))
+
+    total_calls = sum(
+        planned_calls(case_id, key, secs, manifest, args.long_sections)
+        for _, case_id, key, secs in loaded if secs is not None
+    )
+    print(f"{skipped} cases already done; about {total_calls} LLM calls to make "
+          f"(long sections: {args.long_sections}, "
+          f"max {args.max_in_flight} in flight, {args.rpm:g} req/min).")
+
+    limiter = RateLimiter(args.rpm, burst=args.burst)
+    progress = Progress(total_calls, len(loaded), every=max(1, total_calls // 20))
+
+    with ThreadPoolExecutor(max_workers=max(1, args.max_in_flight)) as pool:
+        pending = [
+            (txt_path, case_id, key,
+             submit_case(pool, case_id, key, secs, limiter, progress, manifest, args.long_sections)
+             if secs is not None else None)
+            for txt_path, case_id, key, secs in loaded
+        ]
+
+        # Collect in input order so outputs are deterministic
+        for txt_path, case_id, key, futures in pending:
+            out_path = OUT_DIR / f"{case_id}.json"
+            if futures is None:
+                # finished in an earlier run
+                with out_path.open("r", encoding="utf-8") as f:
+                    all_cases.append(json.load(f))
+                progress.case_done()
+                continue
+
+            try:
+                case_data, all_ok = collect_case(case_id, futures)
+            except Exception as e:
+                # no placeholder: the manifest records the failure and the
+                # next run retries this case
+                print(f"[ERROR] Failed to process {txt_path.name}: {e}")
+                manifest.record_case(case_id, key, STATUS_FAILED, error=str(e))
+                continue
+
+            # Save per-case JSON
+            write_json_atomic(out_path, case_data, ensure_ascii=False, indent=2)
+            # partial: some sections kept raw text and will be retried next run
+            manifest.record_case(case_id, key, STATUS_DONE if all_ok else STATUS_PARTIAL)
+
+            all_cases.append(case_data)
+            progress.case_done()
+
+    manifest.compact()
+    manifest.close()
 
     # Save combined cases.json
     combined_path = OUT_DIR / "cases.json"
-    with combined_path.open("w", encoding="utf-8") as f:
-        json.dump(all_cases, f, ensure_ascii=False, indent=2)
+    write_json_atomic(combined_path, all_cases, ensure_ascii=False, indent=2)
 
     print(f"\nDone. Saved {len(all_cases)} cases to {combined_path}")
+    print(progress.summary())
+    print(f"Manifest: {manifest.summary()} → {MANIFEST_PATH}")
+    print()
+    print_report(TELEMETRY.snapshot())
 
 
 if __name__ == "__main__":
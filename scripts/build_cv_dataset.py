@@ -0,0 +1,286 @@
+"""
+Build the CV training dataset from the labeling sheet without copying images.
+
+    python scripts/build_cv_dataset.py --csv "MECC Data Labeling3(Sheet1).csv" \\
+        --images "Image for CV" --out data/cv_dataset
+    python scripts/build_cv_dataset.py ... --mode manifest          # no link tree
+    python scripts/build_cv_dataset.py ... --no-cache               # skip tensor cache
+
+Replaces the balancing/splitting cells of Computer_Vision.ipynb:
+
+  * the split is stratified per class and made on the unique images first;
+    oversampling happens afterwards and only in train, so copies of one
+    photo can no longer land in both train and test
+  * out/{train,val,test}/<class>/ is built from hardlinks (symlinks when
+    the source is on another filesystem); oversampled train entries are
+    extra links (<name>__dupN) to the same file, so balancing costs no disk
+  * out/manifest.csv lists every unique image with its split and sampling
+    weight (target count / class count in train), for training loops that
+    take a WeightedRandomSampler instead of duplicated entries
+    (manifest_sampler below)
+  * decoded images, resized so the short side is --cache-size, are stored
+    once per content hash in out/.cache and linked in as <name>.npy, which
+    is exactly where ultralytics looks with cache="disk", so repeat
+    training runs skip JPEG decoding:
+
+        YOLO("yolo11n-cls.pt").train(data="data/cv_dataset", imgsz=640, cache="disk")
+
+Re-running is incremental: links that still point at their source file
+and cached arrays of unchanged content are kept; a link whose source was
+replaced or edited, or whose name now belongs to another image, is made
+again, and entries no longer in the plan are removed.
+"""
+import argparse
+import csv
+import os
+import random
+import re
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add project root to Python path (for utils.pdf)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.pdf import file_hash
+
+SPLITS = ("train", "val", "test")
+IMG_SIZE = 640  # training size in Computer_Vision.ipynb
+
+
+def class_dir(label: str) -> str:
+    """Folder-safe class name (ultralytics uses the folder name as the label)."""
+    return re.sub(r"[^\w\- ]+", "_", label.strip()) or "unlabeled"
+
+
+def read_labels(csv_path: Path, image_dir: Path, path_col: str, label_col: str
+                ) -> Tuple[List[Tuple[Path, str]], List[str]]:
+    """([(image path, label)], missing) from the labeling sheet; duplicates dropped."""
+    rows, missing, seen = [], [], set()
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        for r in csv.DictReader(f):
+            name, label = (r.get(path_col) or "").strip(), (r.get(label_col) or "").strip()
+            if not name or name.lower() == "nan" or not label:
+                continue
+            path = (image_dir / name).resolve()
+            if path in seen:
+                continue
+            seen.add(path)
+            if path.is_file():
+                rows.append((path, label))
+            else:
+                missing.append(name)
+    return rows, missing
+
+
+def stratified_split(rows: List[Tuple[Path, str]], test: float, val: float, seed: int
+                     ) -> Dict[Path, str]:
+    """Per-class shuffle and cut; classes with 3+ images get at least one val and test image."""
+    by_class: Dict[str, List[Path]] = defaultdict(list)
+    for path, label in rows:
+        by_class[label].append(path)
+    rng = random.Random(seed)
+    split: Dict[Path, str] = {}
+    for label in sorted(by_class):
+        paths = sorted(by_class[label])
+        rng.shuffle(paths)
+        n = len(paths)
+        n_test = max(1, round(n * test)) if n >= 3 else 0
+        n_val = max(1, round((n - n_test) * val)) if n >= 3 else 0
+        for i, p in enumerate(paths):
+            split[p] = "test" if i < n_test else "val" if i < n_test + n_val else "train"
+    return split
+
+
+def plan_entries(rows, split: Dict[Path, str], target: int) -> List[Tuple[Path, str]]:
+    """(source, relative destination) for the link tree; train classes oversampled to target."""
+    labels = dict(rows)
+    names: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+    entries: List[Tuple[Path, str]] = []
+
+    def dest(src: Path, s: str, dup: int = 0) -> str:
+        cls = class_dir(labels[src])
+        stem = src.stem if not dup else f"{src.stem}__dup{dup}"
+        # same file name from two folders: keep both
+        names[(s, cls)][stem + src.suffix.lower()] += 1
+        n = names[(s, cls)][stem + src.suffix.lower()]
+        if n > 1:
+            stem = f"{stem}__{n}"
+        return f"{s}/{cls}/{stem}{src.suffix.lower()}"
+
+    train_by_class: Dict[str, List[Path]] = defaultdict(list)
+    for src in sorted(split):
+        entries.append((src, dest(src, split[src])))
+        if split[src] == "train":
+            train_by_class[labels[src]].append(src)
+
+    for label, paths in sorted(train_by_class.items()):
+        for i in range(max(0, target - len(paths))):
+            src = paths[i % len(paths)]
+            entries.append((src, dest(src, "train", dup=i // len(paths) + 1)))
+    return entries
+
+
+def links_to(dst: Path, src: Path) -> bool:
+    """dst is a symlink to src, or a hardlink to the file src is now."""
+    if dst.is_symlink():
+        return Path(os.readlink(dst)) == Path(src)
+    try:
+        return os.path.samefile(src, dst)
+    except OSError:
+        return False
+
+
+def link(src: Path, dst: Path, mode: str) -> str:
+    """Hardlink (or symlink) src at dst; returns the kind of link made, "" if it was current."""
+    if dst.exists() or dst.is_symlink():
+        if links_to(dst, src):
+            return ""
+        dst.unlink()  # source replaced, or the name now belongs to another image
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass  # other filesystem / no hardlink support
+    os.symlink(src, dst)
+    return "symlink"
+
+
+def cache_array(args: Tuple[str, str, int]) -> Optional[str]:
+    """Decode src, shrink the short side to size, save BGR uint8 .npy. Runs in a worker."""
+    src, out, size = args
+    if os.path.exists(out):
+        return out
+    import cv2
+    img = cv2.imdecode(np.fromfile(src, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    h, w = img.shape[:2]
+    scale = size / min(h, w)
+    if scale < 1.0:
+        img = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    tmp = out + ".tmp.npy"
+    np.save(tmp, img, allow_pickle=False)
+    os.replace(tmp, out)
+    return out
+
+
+def write_manifest(path: Path, rows, split: Dict[Path, str], target: int):
+    labels = dict(rows)
+    train_counts = Counter(labels[p] for p, s in split.items() if s == "train")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["path", "class", "split", "weight"])
+        for src in sorted(split):
+            s = split[src]
+            weight = target / train_counts[labels[src]] if s == "train" else 1.0
+            w.writerow([src.as_posix(), labels[src], s, round(weight, 4)])
+
+
+def manifest_sampler(manifest: Path, split: str = "train"):
+    """
+    (paths, labels, WeightedRandomSampler) for a custom training loop:
+    balanced classes without duplicated entries.
+    """
+    from torch.utils.data import WeightedRandomSampler
+    with open(manifest, "r", encoding="utf-8", newline="") as f:
+        rows = [r for r in csv.DictReader(f) if r["split"] == split]
+    weights = [float(r["weight"]) for r in rows]
+    sampler = WeightedRandomSampler(weights, num_samples=round(sum(weights)), replacement=True)
+    return [r["path"] for r in rows], [r["class"] for r in rows], sampler
+
+
+def prune(out: Path, keep: set) -> int:
+    """Remove links (and their .npy) under out/<split> that are not in the plan."""
+    removed = 0
+    for s in SPLITS:
+        for p in (out / s).rglob("*") if (out / s).exists() else []:
+            rel = p.relative_to(out).as_posix()
+            if p.is_dir() or rel in keep:
+                continue
+            p.unlink()
+            removed += 1
+    return removed
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Stratified, link-based CV dataset builder.")
+    ap.add_argument("--csv", required=True, help="labeling sheet (imagePath, Class Label)")
+    ap.add_argument("--images", required=True, help="folder the imagePath column is relative to")
+    ap.add_argument("--out", default="data/cv_dataset")
+    ap.add_argument("--path-col", default="imagePath")
+    ap.add_argument("--label-col", default="Class Label")
+    ap.add_argument("--test", type=float, default=0.1, help="test fraction per class")
+    ap.add_argument("--val", type=float, default=0.1, help="val fraction of the rest, per class")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--target", type=int, default=0,
+                    help="train images per class after oversampling (default: largest class)")
+    ap.add_argument("--mode", choices=["hardlink", "symlink", "manifest"], default="hardlink")
+    ap.add_argument("--cache-size", type=int, default=IMG_SIZE, help="short side of cached arrays")
+    ap.add_argument("--no-cache", action="store_true", help="don't build the .npy cache")
+    ap.add_argument("--workers", type=int, default=0, help="decode processes (0 = cpus - 1)")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+
+    rows, missing = read_labels(Path(args.csv), Path(args.images), args.path_col, args.label_col)
+    if missing:
+        print(f"{len(missing)} images in the sheet are missing, e.g. {missing[:3]}")
+    split = stratified_split(rows, args.test, args.val, args.seed)
+    labels = dict(rows)
+    train_counts = Counter(labels[p] for p, s in split.items() if s == "train")
+    target = args.target or max(train_counts.values(), default=0)
+
+    write_manifest(out / "manifest.csv", rows, split, target)
+    for s in SPLITS:
+        per_class = Counter(labels[p] for p, x in split.items() if x == s)
+        print(f"{s:5s} {sum(per_class.values()):5d} unique images, {len(per_class)} classes")
+    print(f"train oversampled to {target} per class; manifest -> {out / 'manifest.csv'}")
+    if args.mode == "manifest":
+        return
+
+    entries = plan_entries(rows, split, target)
+    made = Counter(link(src, out / rel, args.mode) for src, rel in entries)
+    made.pop("", None)
+
+    keep = {rel for _, rel in entries}
+    if not args.no_cache:
+        cache_dir = out / ".cache"
+        cache_dir.mkdir(exist_ok=True)
+        sources = sorted({src for src, _ in entries})
+        hashes = {src: file_hash(src) for src in sources}
+        jobs = [(str(src), str(cache_dir / f"{hashes[src]}_{args.cache_size}.npy"), args.cache_size)
+                for src in sources]
+        todo = [j for j in jobs if not os.path.exists(j[1])]
+        print(f"caching {len(todo)} decoded images ({len(jobs) - len(todo)} already cached)")
+        with ProcessPoolExecutor(max_workers=args.workers or max(1, (os.cpu_count() or 2) - 1)) as pool:
+            cached = dict(zip(sources, pool.map(cache_array, jobs, chunksize=4)))
+        unreadable = [src.name for src, npy in cached.items() if npy is None]
+        if unreadable:
+            print(f"{len(unreadable)} images could not be decoded, e.g. {unreadable[:3]}")
+        for src, rel in entries:
+            npy = str(Path(rel).with_suffix(".npy").as_posix())
+            if cached.get(src):
+                keep.add(npy)
+                # same filesystem: both live under out/; content hash changes move the target
+                link(Path(cached[src]), out / npy, "hardlink")
+
+    removed = prune(out, keep)
+    print(f"{len(entries)} entries ({dict(made) or 'nothing new'} linked, {removed} stale removed) "
+          f"-> {out}")
+
+
+if __name__ == "__main__":
+    main()
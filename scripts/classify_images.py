@@ -0,0 +1,233 @@
+"""
+Offline batch classification of an image directory tree.
+
+    python scripts/classify_images.py "/data/photo archive" --out data/archive_labels.csv
+    python scripts/classify_images.py photos/ --out labels.jsonl --k 3 --batch 32 --workers 6
+
+Unlike model(folder, save=True) in the notebook, nothing is written next to
+the images: results (path, top-k labels and probabilities, model version)
+are appended to a CSV or JSONL file (picked by extension) one batch at a
+time. Annotated copies are only written with --save-annotated DIR.
+
+Decoding and resizing run in a process pool; each image is shrunk to the
+classifier's input (short side to IMG_SIZE, centre crop) before it is sent
+back, so the main process only does batched inference. At most
+--prefetch images are decoded ahead of inference, which keeps memory flat
+on large archives.
+
+Runs are resumable: paths already in the output file for the same model
+version are skipped (undecodable images too, unless --retry-errors), and a
+half-written last line from an interrupted run is dropped.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from cv_classifier import CV_MODEL, DEFAULT_TOP_K, IMG_SIZE, open_model, predict_probs, rank_labels
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+CSV_FIELDS = ["path", "label", "prob", "topk_labels", "topk_probs", "model_version", "error"]
+
+
+def find_images(root: Path) -> List[Path]:
+    return sorted(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in IMAGE_EXTS)
+
+
+def load_for_model(path: str, size: int = IMG_SIZE) -> Tuple[str, Optional[np.ndarray], str]:
+    """(path, image, error): decode, short side to size, centre crop. Runs in a worker."""
+    import cv2
+    try:
+        data = np.fromfile(path, dtype=np.uint8)
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if img is None:
+            return path, None, "could not decode image"
+        h, w = img.shape[:2]
+        scale = size / min(h, w)
+        if scale != 1.0:
+            interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            img = cv2.resize(img, (max(size, round(w * scale)), max(size, round(h * scale))),
+                             interpolation=interp)
+        h, w = img.shape[:2]
+        top, left = (h - size) // 2, (w - size) // 2
+        return path, np.ascontiguousarray(img[top:top + size, left:left + size]), ""
+    except Exception as e:
+        return path, None, str(e)
+
+
+# ---- output ----
+class ResultWriter:
+    """Append-only CSV/JSONL sink; flushed after every batch."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.jsonl = path.suffix.lower() == ".jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        new = not path.exists() or path.stat().st_size == 0
+        self.f = open(path, "a", encoding="utf-8", newline="")
+        self.csv = None
+        if not self.jsonl:
+            self.csv = csv.DictWriter(self.f, fieldnames=CSV_FIELDS)
+            if new:
+                self.csv.writeheader()
+
+    def write(self, rows: List[dict]):
+        for row in rows:
+            if self.jsonl:
+                self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                self.csv.writerow({
+                    **row,
+                    "topk_labels": "|".join(row["topk_labels"]),
+                    "topk_probs": "|".join(f"{p:.4f}" for p in row["topk_probs"]),
+                })
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def _drop_partial_line(path: Path):
+    """An interrupted run can leave a line without its newline; cut it off."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def done_paths(path: Path, model_version: str, retry_errors: bool) -> Set[str]:
+    if not path.exists():
+        return set()
+    _drop_partial_line(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".jsonl":
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        return {r["path"] for r in rows
+                if r.get("model_version") == model_version and not (retry_errors and r.get("error"))}
+
+
+def _row(rel: str, probs, names, k: int, version: str) -> dict:
+    top = rank_labels(probs, names, k)
+    return {
+        "path": rel,
+        "label": top[0]["label"],
+        "prob": top[0]["prob"],
+        "topk_labels": [t["label"] for t in top],
+        "topk_probs": [t["prob"] for t in top],
+        "model_version": version,
+        "error": "",
+    }
+
+
+def _error_row(rel: str, error: str, version: str) -> dict:
+    return {"path": rel, "label": "", "prob": "", "topk_labels": [], "topk_probs": [],
+            "model_version": version, "error": error}
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Classify every image under a directory.")
+    ap.add_argument("root", help="directory to walk (recursively)")
+    ap.add_argument("--out", required=True, help="results file: .csv or .jsonl (appended to)")
+    ap.add_argument("--k", type=int, default=DEFAULT_TOP_K, help="labels per image")
+    ap.add_argument("--batch", type=int, default=16, help="images per forward pass")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                    help="decode/resize processes")
+    ap.add_argument("--prefetch", type=int, default=0,
+                    help="max images decoded ahead of inference (default 4 x batch)")
+    ap.add_argument("--weights", default="",
+                    help="model file/dir (default: active cv_classifier in data/models.json)")
+    ap.add_argument("--retry-errors", action="store_true", help="re-run images that failed before")
+    ap.add_argument("--save-annotated", default="", help="also write annotated copies to this dir")
+    ap.add_argument("--limit", type=int, default=0, help="stop after N new images")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    root = Path(args.root).resolve()
+    out = Path(args.out)
+
+    if args.weights:
+        model, version = open_model(Path(args.weights)), args.weights
+    else:
+        model, version = CV_MODEL.current(), CV_MODEL.version
+
+    skip = done_paths(out, version, args.retry_errors)
+    todo = [p for p in find_images(root) if p.relative_to(root).as_posix() not in skip]
+    if args.limit:
+        todo = todo[:args.limit]
+    print(f"{len(todo)} images to classify ({len(skip)} already in {out}), model {version}")
+    if not todo:
+        return
+
+    annotated = Path(args.save_annotated) if args.save_annotated else None
+    if annotated:
+        annotated.mkdir(parents=True, exist_ok=True)
+
+    writer = ResultWriter(out)
+    prefetch = args.prefetch or 4 * args.batch
+    counts: Dict[str, int] = {"ok": 0, "error": 0}
+    t0 = time.perf_counter()
+
+    def flush(batch: List[Tuple[str, np.ndarray]], rows: List[dict]):
+        if batch:
+            if annotated:
+                results = model.predict([img for _, img in batch], imgsz=IMG_SIZE, verbose=False)
+                for (rel, _), r in zip(batch, results):
+                    r.save(filename=str(annotated / rel.replace("/", "__")))
+                preds = [(r.probs.data.cpu().numpy(), r.names) for r in results]
+            else:
+                preds = predict_probs([img for _, img in batch], model=model)
+            rows += [_row(rel, probs, names, args.k, version)
+                     for (rel, _), (probs, names) in zip(batch, preds)]
+        writer.write(rows)
+        counts["ok"] += len(batch)
+        done = counts["ok"] + counts["error"]
+        rate = done / (time.perf_counter() - t0)
+        print(f"  {done}/{len(todo)}  {rate:.1f} img/s", end="\r", flush=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            pending = deque()
+            paths = iter(todo)
+            batch: List[Tuple[str, np.ndarray]] = []
+            errors: List[dict] = []
+            while True:
+                # keep up to `prefetch` decodes in flight, consume in order
+                while len(pending) < prefetch:
+                    p = next(paths, None)
+                    if p is None:
+                        break
+                    pending.append(pool.submit(load_for_model, str(p)))
+                if not pending:
+                    break
+                path, img, error = pending.popleft().result()
+                rel = Path(path).relative_to(root).as_posix()
+                if img is None:
+                    errors.append(_error_row(rel, error, version))
+                    counts["error"] += 1
+                else:
+                    batch.append((rel, img))
+                if len(batch) >= args.batch:
+                    flush(batch, errors)
+                    batch, errors = [], []
+            flush(batch, errors)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - t0
+    print(f"\n{counts['ok']} classified, {counts['error']} unreadable in {elapsed:.1f}s "
+          f"({(counts['ok'] + counts['error']) / max(elapsed, 1e-9):.1f} img/s) -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Compare agent modes (two-call, fused, speculative) on the same incidents.
+
+Evidence is retrieved once per incident, then every mode runs on identical
+inputs. Reports wall-clock latency, LLM tokens per run (from telemetry),
+the speculation hit rate, and how closely each mode's output agrees with
+the two-call output: top-1 mechanism match, mechanism-set overlap and word
+overlap per recommendation group.
+
+    python scripts/compare_agent_modes.py --repeat 3
+    python scripts/compare_agent_modes.py --incidents incidents.json --out compare.json
+
+incidents.json: [{"description": ..., "material": ..., "environment": ...,
+                  "time_in_service": ..., "mechanism_id": "3.2"}, ...]
+Point OPENAI_BASE_URL at scripts/mock_llm_server.py to run offline.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add project root to Python path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from rag_faiss_client import get_rag_evidence
+from api571_loader import get_mechanism_name
+from test_agents_pipeline import (
+    add_api571_snip, build_test_incident, docs_to_handbook_snips, docs_to_similar_cases,
+)
+
+from agents import Incident
+from agents.pipeline import AGENT_MODES, SPECULATION, run_agents
+from utils.llm_telemetry import TELEMETRY, llm_call
+from utils.metrics import percentile
+
+REC_GROUPS = ("immediate", "medium_term", "long_term", "monitoring")
+
+
+def load_incidents(path: Optional[str]) -> List[dict]:
+    if not path:
+        inc = build_test_incident()
+        return [{**inc.model_dump(), "description": inc.observed_damage, "mechanism_id": "3.2"}]
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def prepare_inputs(item: dict):
+    """Incident + evidence exactly as /api/analyze builds them."""
+    description = item.get("description") or item.get("observed_damage") or ""
+    incident = Incident(
+        material=item.get("material") or "",
+        environment=item.get("environment") or "",
+        observed_damage=description,
+        time_in_service=item.get("time_in_service") or "",
+    )
+    mech_id = str(item.get("mechanism_id") or "3.2")
+    query = (
+        f"Failure mechanism: {get_mechanism_name(mech_id)} (API571 {mech_id}). "
+        f"Observed damage: {incident.observed_damage}. "
+        f"Environment: {incident.environment}."
+    )
+    hb_docs, case_docs = get_rag_evidence(query, k=8)
+    handbook_snips = add_api571_snip(docs_to_handbook_snips(hb_docs) or [], mech_id)
+    return incident, docs_to_similar_cases(case_docs), handbook_snips
+
+
+def _words(items: List[str]) -> set:
+    return set(re.findall(r"[a-z0-9]+", " ".join(items).lower()))
+
+
+def _jaccard(a: set, b: set) -> Optional[float]:
+    if not a and not b:
+        return None
+    return len(a & b) / len(a | b)
+
+
+def agreement(base: dict, other: dict) -> dict:
+    """How closely `other` (mechanisms + recs) matches `base`."""
+    names_a = [m["name"].strip().lower() for m in base["mechanisms"]]
+    names_b = [m["name"].strip().lower() for m in other["mechanisms"]]
+    out = {
+        "top1_match": bool(names_a and names_b and names_a[0] == names_b[0]),
+        "mechanism_jaccard": _jaccard(set(names_a), set(names_b)),
+    }
+    for g in REC_GROUPS:
+        out[f"{g}_word_jaccard"] = _jaccard(_words(base["recommendations"][g]),
+                                            _words(other["recommendations"][g]))
+    return out
+
+
+def run_once(mode: str, request_id: str, incident, similar_cases, handbook_snips) -> dict:
+    t0 = time.perf_counter()
+    with llm_call(request_id=request_id):
+        mechs, recs, used = run_agents(incident, similar_cases, handbook_snips, mode=mode)
+    latency = (time.perf_counter() - t0) * 1000
+    calls = [r for r in TELEMETRY.snapshot() if r.get("request_id") == request_id]
+    return {
+        "mode": mode,
+        "used_mode": used,
+        "latency_ms": round(latency, 1),
+        "llm_calls": len(calls),
+        "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in calls),
+        "completion_tokens": sum(r.get("completion_tokens") or 0 for r in calls),
+        "mechanisms": [m.model_dump() for m in mechs.mechanisms],
+        "recommendations": recs.model_dump(),
+    }
+
+
+def _mean(vals: List[float]) -> Optional[float]:
+    vals = [v for v in vals if v is not None]
+    return round(sum(vals) / len(vals), 3) if vals else None
+
+
+def report(runs: List[dict], agreements: Dict[str, List[dict]]):
+    print(f"\n{'mode':12s} {'runs':>5s} {'fallbk':>6s} {'calls':>6s} {'p50 ms':>8s} {'p95 ms':>8s} "
+          f"{'in tok':>8s} {'out tok':>8s}")
+    for mode in AGENT_MODES:
+        rs = [r for r in runs if r["mode"] == mode]
+        if not rs:
+            continue
+        lat = [r["latency_ms"] for r in rs]
+        print(f"{mode:12s} {len(rs):5d} {sum(r['used_mode'] != mode for r in rs):6d} "
+              f"{_mean([r['llm_calls'] for r in rs]):6.1f} "
+              f"{percentile(lat, 50):8.0f} {percentile(lat, 95):8.0f} "
+              f"{_mean([r['prompt_tokens'] for r in rs]):8.0f} "
+              f"{_mean([r['completion_tokens'] for r in rs]):8.0f}")
+
+    for mode, agg in agreements.items():
+        if not agg:
+            continue
+        print(f"\n{mode} vs two-call agreement:")
+        print(f"  top-1 mechanism match: {_mean([float(a['top1_match']) for a in agg]):.0%}")
+        for k in ["mechanism_jaccard"] + [f"{g}_word_jaccard" for g in REC_GROUPS]:
+            v = _mean([a[k] for a in agg])
+            print(f"  {k:28s} {'-' if v is None else f'{v:.2f}'}")
+
+    if any(r["mode"] == "speculative" for r in runs):
+        print(f"\nspeculation: {SPECULATION.summary()}")
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Compare agent modes against the two-call path.")
+    ap.add_argument("--incidents", help="JSON list of incidents (default: built-in test incident)")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per incident and mode")
+    ap.add_argument("--modes", nargs="+", choices=AGENT_MODES, default=list(AGENT_MODES))
+    ap.add_argument("--out", help="write all runs and agreement scores to this JSON file")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    incidents = load_incidents(args.incidents)
+
+    runs: List[dict] = []
+    agreements: Dict[str, List[dict]] = {m: [] for m in args.modes if m != "two-call"}
+    for n, item in enumerate(incidents):
+        incident, similar_cases, handbook_snips = prepare_inputs(item)
+        for rep in range(args.repeat):
+            by_mode: Dict[str, dict] = {}
+            # alternate the order so neither mode always runs on a warm connection
+            modes = args.modes if rep % 2 == 0 else list(reversed(args.modes))
+            for mode in modes:
+                r = run_once(mode, f"cmp-{n}-{rep}-{mode}", incident, similar_cases, handbook_snips)
+                r["incident"] = n
+                runs.append(r)
+                by_mode[mode] = r
+                print(f"[incident {n} run {rep}] {mode}: {r['latency_ms']:.0f} ms, "
+                      f"{r['llm_calls']} calls, {r['prompt_tokens']}+{r['completion_tokens']} tokens")
+            for mode in agreements:
+                if "two-call" in by_mode and mode in by_mode:
+                    agreements[mode].append(agreement(by_mode["two-call"], by_mode[mode]))
+
+    report(runs, agreements)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs, "agreement": agreements,
+                       "speculation": SPECULATION.summary()}, f, indent=2)
+        print(f"\nSaved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
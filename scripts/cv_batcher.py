@@ -0,0 +1,135 @@
+"""
+Dynamic micro-batching for model inference.
+
+Concurrent requests submit single items; a worker thread gathers them into
+batches of up to max_batch items, waiting at most max_wait_ms after the
+first item arrives, runs one batched call and routes each result back to
+its request's Future. Under light load a request waits at most max_wait_ms
+extra; under heavy load forward passes are shared.
+"""
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence
+
+# Add project root to Python path (for utils.metrics)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.metrics import percentile
+
+_STOP = object()
+
+
+def _ms(values: List[float], q: float) -> Optional[float]:
+    p = percentile(values, q)
+    return round(p, 2) if p is not None else None
+
+
+class BatchStats:
+    """Batch-size histogram plus queue-wait and batch-latency samples."""
+
+    def __init__(self, keep: int = 5000):
+        self.lock = threading.Lock()
+        self.keep = keep
+        self.sizes: Counter = Counter()
+        self.items = 0
+        self.batches = 0
+        self.waits_ms: List[float] = []
+        self.batch_ms: List[float] = []
+
+    def record(self, size: int, waits_ms: Sequence[float], batch_ms: float):
+        with self.lock:
+            self.sizes[size] += 1
+            self.items += size
+            self.batches += 1
+            self.waits_ms.extend(waits_ms)
+            self.batch_ms.append(batch_ms)
+            # keep the latest samples only
+            del self.waits_ms[:-self.keep]
+            del self.batch_ms[:-self.keep]
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self.sizes.items())},
+                "queue_wait_p50_ms": _ms(self.waits_ms, 50),
+                "queue_wait_p95_ms": _ms(self.waits_ms, 95),
+                "batch_p50_ms": _ms(self.batch_ms, 50),
+                "batch_p95_ms": _ms(self.batch_ms, 95),
+            }
+
+
+class MicroBatcher:
+    """
+    batch_fn(list_of_items) -> list_of_results (same length and order).
+    submit(item) returns a Future for that item's result.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch: int = 8, max_wait_ms: float = 10.0, name: str = "batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.stats = BatchStats()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        fut: Future = Future()
+        self._queue.put((item, fut, time.perf_counter()))
+        return fut
+
+    def __call__(self, item, timeout: float = None):
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is _STOP:
+                self._queue.put(_STOP)  # finish this batch, stop on the next loop
+                break
+            batch.append(nxt)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            started = time.perf_counter()
+            waits = [(started - queued) * 1000 for _, _, queued in batch]
+            live = [(item, fut) for item, fut, _ in batch if fut.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            try:
+                results = self.batch_fn([item for item, _ in live])
+                if len(results) != len(live):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(live)} items")
+            except BaseException as e:
+                for _, fut in live:
+                    fut.set_exception(e)
+            else:
+                for (_, fut), res in zip(live, results):
+                    fut.set_result(res)
+            self.stats.record(len(live), waits, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,243 @@
+"""
+Perceptual-hash result cache for the image classifier.
+
+The same inspection photo comes back many times: re-sent, attached to
+another report, resized or re-compressed. Byte hashes miss those, so
+entries are keyed on a 64-bit difference hash (dHash) of the decoded image
+and a lookup matches any entry within max_distance bits (Hamming).
+
+Near-duplicate lookups don't scan the cache: the hash is split into
+max_distance + 1 bands, and two hashes within max_distance bits must agree
+exactly on at least one band (pigeonhole), so only entries sharing a band
+are compared.
+
+Entries are LRU-evicted past max_entries. With a path, entries are also
+written through to SQLite and the most recent ones are loaded at startup,
+so the cache survives restarts. The SQLite tier is pruned to the
+max_entries most recently used rows every PRUNE_EVERY puts. Hits only
+update last_used in memory; they are written in batches (TOUCH_BATCH hits
+or TOUCH_FLUSH_S seconds, whichever comes first), not on every lookup.
+Entries belong to one model (namespace); opening a cache for a new model
+deletes the rows of every other one.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+HASH_BITS = 64
+
+# SQLite tier: prune to max_entries rows every PRUNE_EVERY puts; write hit
+# timestamps once TOUCH_BATCH are pending or the oldest is TOUCH_FLUSH_S old
+PRUNE_EVERY = 64
+TOUCH_BATCH = 64
+TOUCH_FLUSH_S = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cv_cache (
+    namespace  TEXT NOT NULL,
+    hash       TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    created    REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, hash)
+);
+CREATE INDEX IF NOT EXISTS cv_cache_last_used ON cv_cache (namespace, last_used);
+"""
+
+
+def dhash(image: np.ndarray, size: int = 8) -> int:
+    """Difference hash of a BGR or grayscale image: 64 bits for size=8."""
+    import cv2
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(max_distance: int):
+    """(shift, mask) per band; max_distance + 1 bands covering all 64 bits."""
+    n = max_distance + 1
+    bounds = [round(i * HASH_BITS / n) for i in range(n + 1)]
+    return [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+
+
+class PHashCache:
+    """hash -> JSON-able value, with near-duplicate lookup and LRU eviction."""
+
+    def __init__(self, max_entries: int = 2048, max_distance: int = 4,
+                 path: Optional[Path] = None, namespace: str = ""):
+        if not 0 <= max_distance < HASH_BITS // 2:
+            raise ValueError("max_distance must be between 0 and 31")
+        self.max_entries = max(1, max_entries)
+        self.max_distance = max_distance
+        self.namespace = namespace
+        self.lock = threading.Lock()      # entries, index and counts
+        self._db_lock = threading.Lock()  # the SQLite connection; never taken under self.lock
+        self._entries: "OrderedDict[int, object]" = OrderedDict()
+        self._bands = _bands(max_distance)
+        self._index: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self.counts = {"lookups": 0, "exact_hits": 0, "near_hits": 0, "misses": 0,
+                       "evictions": 0, "loaded": 0, "pruned": 0}
+        # hash -> (last hit time, hits) not yet written; guarded by self.lock
+        self._touched: Dict[int, Tuple[float, int]] = {}
+        self._touched_since = 0.0
+        self._puts = 0
+
+        self.conn = None
+        if path:
+            self.path = Path(path)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self.conn.executescript(_SCHEMA)
+            with self.conn:
+                # rows of retired models can never be hit again
+                self.conn.execute("DELETE FROM cv_cache WHERE namespace != ?", (self.namespace,))
+            self._prune()
+            self._load()
+
+    def reopen(self):
+        """
+        Fresh lock and SQLite connection, for a forked child: SQLite handles
+        must not be used across processes. The parent's handle is left
+        unclosed on purpose (closing it here could drop the parent's locks).
+        """
+        self.lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._touched = {}  # the parent writes its own
+        if self.conn is not None:
+            self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+
+    # ---- index ----
+    def _keys(self, h: int):
+        return [(i, (h >> shift) & mask) for i, (shift, mask) in enumerate(self._bands)]
+
+    def _insert(self, h: int, value):
+        self._entries[h] = value
+        self._entries.move_to_end(h)
+        for key in self._keys(h):
+            self._index[key].add(h)
+        while len(self._entries) > self.max_entries:
+            old, _ = self._entries.popitem(last=False)
+            for key in self._keys(old):
+                bucket = self._index[key]
+                bucket.discard(old)
+                if not bucket:
+                    del self._index[key]
+            self.counts["evictions"] += 1
+
+    def _nearest(self, h: int) -> Tuple[Optional[int], int]:
+        if h in self._entries:
+            return h, 0
+        best, best_d = None, self.max_distance + 1
+        seen = set()
+        for key in self._keys(h):
+            for other in self._index.get(key, ()):
+                if other in seen:
+                    continue
+                seen.add(other)
+                d = hamming(h, other)
+                if d < best_d:
+                    best, best_d = other, d
+        return best, best_d
+
+    # ---- API ----
+    def get(self, h: int) -> Tuple[Optional[object], Optional[int]]:
+        """(value, hamming distance) of the closest entry, or (None, None)."""
+        due = False
+        with self.lock:
+            self.counts["lookups"] += 1
+            match, d = self._nearest(h)
+            if match is None:
+                self.counts["misses"] += 1
+                return None, None
+            self._entries.move_to_end(match)
+            self.counts["exact_hits" if d == 0 else "near_hits"] += 1
+            value = self._entries[match]
+            if self.conn is not None:
+                now = time.time()
+                if not self._touched:
+                    self._touched_since = now
+                self._touched[match] = (now, self._touched.get(match, (0.0, 0))[1] + 1)
+                due = (len(self._touched) >= TOUCH_BATCH
+                       or now - self._touched_since >= TOUCH_FLUSH_S)
+        if due:
+            self.flush()
+        return value, d
+
+    def put(self, h: int, value):
+        with self.lock:
+            self._insert(h, value)
+            self._puts += 1
+            prune = self._puts % PRUNE_EVERY == 0
+        if self.conn is None:
+            return
+        now = time.time()
+        # own lock, so lookups never wait on a commit
+        with self._db_lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO cv_cache (namespace, hash, value, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(namespace, hash) DO UPDATE SET "
+                "value = excluded.value, last_used = excluded.last_used",
+                (self.namespace, f"{h:016x}", json.dumps(value), now, now),
+            )
+        if prune:
+            self._prune()
+
+    def flush(self):
+        """Write pending hit timestamps and counts to SQLite in one transaction."""
+        if self.conn is None:
+            return
+        with self.lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
+        with self._db_lock, self.conn:
+            self.conn.executemany(
+                "UPDATE cv_cache SET last_used = ?, hits = hits + ? WHERE namespace = ? AND hash = ?",
+                [(ts, n, self.namespace, f"{h:016x}") for h, (ts, n) in touched.items()],
+            )
+
+    def _prune(self):
+        """Keep the max_entries most recently used rows of this namespace."""
+        self.flush()  # pending hits count as use
+        with self._db_lock, self.conn:
+            cur = self.conn.execute(
+                "DELETE FROM cv_cache WHERE namespace = ? AND hash NOT IN ("
+                "SELECT hash FROM cv_cache WHERE namespace = ? ORDER BY last_used DESC LIMIT ?)",
+                (self.namespace, self.namespace, self.max_entries),
+            )
+        with self.lock:
+            self.counts["pruned"] += max(cur.rowcount, 0)
+
+    def _load(self):
+        rows = self.conn.execute(
+            "SELECT hash, value FROM cv_cache WHERE namespace = ? ORDER BY last_used DESC LIMIT ?",
+            (self.namespace, self.max_entries),
+        ).fetchall()
+        for h, value in reversed(rows):  # oldest first, so LRU order is preserved
+            self._insert(int(h, 16), json.loads(value))
+        self.counts["loaded"] = len(rows)
+
+    def stats(self) -> dict:
+        with self.lock:
+            c = dict(self.counts)
+            hits = c["exact_hits"] + c["near_hits"]
+            c.update(
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                max_distance=self.max_distance,
+                hit_rate=round(hits / c["lookups"], 4) if c["lookups"] else None,
+                persistent=str(self.path) if self.conn is not None else None,
+            )
+        return c
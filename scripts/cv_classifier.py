@@ -0,0 +1,313 @@
+"""
+In-memory inference for the failure-image classifier (YOLO11n-cls).
+
+Uploads are decoded straight from bytes into an array and classified
+without touching disk: no saved upload, no annotated copy, no show().
+Weights default to runs/classify/train7/weights/best.pt (override with
+MECC_CV_WEIGHTS). Storing uploads is optional and happens on a background
+thread under a content-hash filename.
+
+MECC_CV_RUNTIME picks the inference backend: "torch" (best.pt, eager),
+"onnx" (best.onnx) or "openvino" (best_int8_openvino_model, else the fp32
+best_openvino_model). Produce the exported files with
+scripts/export_cv_model.py and compare them with scripts/bench_cv_runtimes.py.
+
+Single-image requests go through a MicroBatcher, so concurrent uploads
+share one forward pass (MECC_CV_MAX_BATCH, MECC_CV_MAX_WAIT_MS; a max
+batch of 1 disables batching).
+
+Before that, a perceptual-hash cache (cv_cache.PHashCache) answers repeats
+and near-duplicates (resized / re-compressed copies) without inference:
+MECC_CV_CACHE_SIZE entries (0 disables), MECC_CV_CACHE_HAMMING max bit
+distance, and MECC_CV_CACHE_PATH for an optional SQLite tier.
+
+The model itself is the "cv_classifier" slot of model_registry: a retrained
+model listed in data/models.json ({"version", "path", "runtime"}) is
+loaded and warmed in the background and swapped in without a restart.
+The env vars above only give the default spec. Cached results are keyed
+on the active version.
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from cv_batcher import MicroBatcher
+from cv_cache import PHashCache, dhash
+from model_registry import REGISTRY, ModelSlot, resolve_path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+# Add project root to Python path (for utils.metrics)
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from utils.metrics import span
+from utils.pools import ForkSafePool
+
+PT_WEIGHTS = BASE_DIR / "runs" / "classify" / "train7" / "weights" / "best.pt"
+RUNTIMES = ("torch", "onnx", "openvino")
+RUNTIME = os.environ.get("MECC_CV_RUNTIME", "torch").strip().lower()
+UPLOAD_DIR = BASE_DIR / "uploads"
+
+IMG_SIZE = 640  # training size in Computer_Vision.ipynb
+DEFAULT_TOP_K = 5
+
+MAX_BATCH = int(os.environ.get("MECC_CV_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.environ.get("MECC_CV_MAX_WAIT_MS", "10"))
+
+CACHE_SIZE = int(os.environ.get("MECC_CV_CACHE_SIZE", "2048"))
+CACHE_HAMMING = int(os.environ.get("MECC_CV_CACHE_HAMMING", "4"))
+CACHE_PATH = os.environ.get("MECC_CV_CACHE_PATH", "")  # e.g. data/cv_cache.sqlite
+
+
+def weights_for(runtime: str, pt: Path = PT_WEIGHTS) -> Path:
+    """Where scripts/export_cv_model.py puts each runtime's model (ultralytics naming)."""
+    if runtime == "torch":
+        return pt
+    if runtime == "onnx":
+        return pt.with_suffix(".onnx")
+    if runtime == "openvino":
+        int8 = pt.parent / f"{pt.stem}_int8_openvino_model"
+        return int8 if int8.exists() else pt.parent / f"{pt.stem}_openvino_model"
+    raise ValueError(f"unknown CV runtime {runtime!r} (expected one of {RUNTIMES})")
+
+
+WEIGHTS_PATH = Path(os.environ.get("MECC_CV_WEIGHTS") or weights_for(RUNTIME))
+
+_model_lock = threading.Lock()
+# Predictor state in ultralytics isn't thread-safe; one forward pass at a time
+_infer_lock = threading.Lock()
+_persist_pool = ForkSafePool(1, thread_name_prefix="upload-writer")
+_batcher: Optional[MicroBatcher] = None
+_cache: Optional[PHashCache] = None
+
+
+def _after_fork():
+    """
+    In a forked server worker: new locks, no batcher (its thread stayed in
+    the parent; the next request starts one), and the result cache keeps its
+    entries but reopens its SQLite file.
+    """
+    global _model_lock, _infer_lock, _batcher
+    _model_lock, _infer_lock = threading.Lock(), threading.Lock()
+    _batcher = None
+    if _cache is not None:
+        _cache.reopen()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def open_model(path: Path):
+    """
+    Any ultralytics classify model: .pt, .onnx or an OpenVINO directory.
+    Exported models carry the class names in their metadata.
+    """
+    if not Path(path).exists():
+        raise FileNotFoundError(f"CV model not found: {path} (run scripts/export_cv_model.py?)")
+    from ultralytics import YOLO
+    return YOLO(str(path), task="classify")
+
+
+def _default_spec() -> dict:
+    if os.environ.get("MECC_CV_WEIGHTS"):
+        # an explicit file is used as-is, whatever its format
+        return {"version": f"{WEIGHTS_PATH.parent.parent.name}/{WEIGHTS_PATH.name}",
+                "path": str(WEIGHTS_PATH), "runtime": "torch"}
+    return {"version": PT_WEIGHTS.parent.parent.name, "path": str(PT_WEIGHTS), "runtime": RUNTIME}
+
+
+def spec_weights(spec: dict) -> Path:
+    """Weights file for a registry spec: path is the .pt, runtime picks the export."""
+    return weights_for(spec.get("runtime") or "torch", resolve_path(spec["path"]))
+
+
+def _warm(model):
+    predict_probs([np.zeros((IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)], model=model)
+
+
+CV_MODEL = REGISTRY.register(ModelSlot(
+    "cv_classifier",
+    loader=lambda spec: open_model(spec_weights(spec)),
+    default_spec=_default_spec,
+    warm_up=_warm,
+))
+
+
+def load_model():
+    """The active classifier (loaded on first use; ultralytics is imported lazily)."""
+    return CV_MODEL.current()
+
+
+def model_info() -> dict:
+    info = CV_MODEL.info()
+    spec = info["spec"] or {}
+    return {**info, "runtime": spec.get("runtime"),
+            "weights": str(spec_weights(spec)) if spec else None}
+
+
+def class_names() -> List[str]:
+    names = load_model().names
+    return [names[i] for i in sorted(names)]
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """Encoded image bytes -> BGR uint8 array (what ultralytics expects for arrays)."""
+    if not data:
+        raise ValueError("empty image")
+    import cv2
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("could not decode image")
+    return img
+
+
+def rank_labels(probs: np.ndarray, names: dict, k: int) -> List[dict]:
+    k = max(1, min(k, len(probs)))
+    top = np.argpartition(-probs, k - 1)[:k]
+    top = top[np.argsort(-probs[top])]
+    return [{"class_id": int(i), "label": names[int(i)], "prob": round(float(probs[i]), 4)}
+            for i in top]
+
+
+def predict_probs(images: List[np.ndarray], model=None) -> List[tuple]:
+    """One forward pass over a batch -> [(class probabilities, names)]."""
+    if model is None:
+        with CV_MODEL.acquire() as active:
+            return predict_probs(images, model=active)
+    with _infer_lock:
+        results = model.predict(images, imgsz=IMG_SIZE, verbose=False)
+    return [(r.probs.data.cpu().numpy(), r.names) for r in results]
+
+
+def embed_images(images: List[np.ndarray], model=None) -> np.ndarray:
+    """
+    Backbone features (pooled, before the classification head) for a batch,
+    L2-normalized, shape (n, dim). Needs a PyTorch (.pt) model.
+    """
+    if model is None:
+        with CV_MODEL.acquire() as active:
+            return embed_images(images, model=active)
+    with _infer_lock:
+        feats = model.embed(images, imgsz=IMG_SIZE, verbose=False)
+    m = np.stack([f.detach().cpu().numpy().reshape(-1) for f in feats]).astype(np.float32)
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+def classify_images(images: List[np.ndarray], k: int = DEFAULT_TOP_K) -> List[List[dict]]:
+    """Top-k predictions for each decoded image, in one forward pass."""
+    return [rank_labels(probs, names, k) for probs, names in predict_probs(images)]
+
+
+def get_batcher(max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS) -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        with _model_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(predict_probs, max_batch=max_batch,
+                                        max_wait_ms=max_wait_ms, name="cv-batcher")
+    return _batcher
+
+
+def batch_stats() -> dict:
+    return get_batcher().stats.summary() if _batcher is not None else {}
+
+
+def model_key() -> str:
+    """Identifies the active model; cached results from other versions don't apply."""
+    CV_MODEL.current()
+    spec = CV_MODEL.spec
+    return f"{spec.get('version')}:{spec.get('runtime') or 'torch'}"
+
+
+def get_cache() -> Optional[PHashCache]:
+    """Result cache for the active model version (a swap starts a new one)."""
+    global _cache
+    if CACHE_SIZE <= 0:
+        return None
+    key = model_key()
+    if _cache is None or _cache.namespace != key:
+        with _model_lock:
+            if _cache is None or _cache.namespace != key:
+                path = CACHE_PATH and (BASE_DIR / CACHE_PATH if not os.path.isabs(CACHE_PATH)
+                                       else Path(CACHE_PATH))
+                _cache = PHashCache(max_entries=CACHE_SIZE, max_distance=CACHE_HAMMING,
+                                    path=path or None, namespace=key)
+    return _cache
+
+
+def cache_stats() -> dict:
+    return _cache.stats() if _cache is not None else {"enabled": CACHE_SIZE > 0}
+
+
+def _predict_one(image: np.ndarray) -> tuple:
+    if MAX_BATCH > 1:
+        return get_batcher()(image)
+    return predict_probs([image])[0]
+
+
+def classify_image(image: np.ndarray, k: int = DEFAULT_TOP_K) -> dict:
+    """
+    Top-k for one image. "cache" is "exact"/"near" when a stored result was
+    reused (then "hamming" is the hash distance) and "miss" otherwise.
+    """
+    t0 = time.perf_counter()
+    cache = get_cache()
+    status, distance, probs = "off", None, None
+    if cache is not None:
+        with span("cv_cache"):
+            h = dhash(image)
+            cached, distance = cache.get(h)
+        if cached is None:
+            status = "miss"
+        else:
+            status = "exact" if distance == 0 else "near"
+            probs, names = np.asarray(cached, dtype=np.float32), load_model().names
+    if probs is None:
+        with span("cv_inference"):
+            probs, names = _predict_one(image)
+        # skip the put if the model was swapped meanwhile (probs may be from either version)
+        if cache is not None and cache is _cache:
+            cache.put(h, [round(float(p), 6) for p in probs])
+    topk = rank_labels(probs, names, k)
+    return {
+        "top1": topk[0],
+        "topk": topk,
+        "inference_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "cache": status,
+        "hamming": distance,
+    }
+
+
+def upload_name(data: bytes, filename: Optional[str]) -> str:
+    """Content-hash name; the client's filename only contributes its extension."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not ext or len(ext) > 6 or not ext[1:].isalnum():
+        ext = ".img"
+    return hashlib.sha256(data).hexdigest()[:32] + ext
+
+
+def persist_upload(data: bytes, filename: Optional[str]) -> Future:
+    """Write the raw upload to uploads/ in the background; resolves to the path."""
+    path = UPLOAD_DIR / upload_name(data, filename)
+
+    def write() -> Path:
+        if not path.exists():
+            UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return path
+
+    return _persist_pool.submit(write)
+
+
+def warm_up():
+    """Load weights and run one dummy pass so the first request isn't slow."""
+    load_model()  # the registry warms a model up before serving it
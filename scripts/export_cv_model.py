@@ -0,0 +1,85 @@
+"""
+Export the failure-image classifier for CPU serving.
+
+    python scripts/export_cv_model.py                         # ONNX
+    python scripts/export_cv_model.py --formats onnx openvino
+    python scripts/export_cv_model.py --formats openvino --int8 --data /path/to/my_dataset
+
+Files land next to best.pt with ultralytics' names (best.onnx,
+best_openvino_model/, best_int8_openvino_model/), which is where
+cv_classifier looks for them when MECC_CV_RUNTIME is onnx/openvino.
+Exports use a dynamic batch axis so the micro-batcher can send batches.
+int8 calibration needs --data: the dataset root from Computer_Vision.ipynb
+(train/val/test folders, one subfolder per class).
+
+Afterwards every export is checked against best.pt on a few images
+(max |Δprob| and top-1 agreement); run bench_cv_runtimes.py for full
+accuracy and latency numbers.
+"""
+import os
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from cv_classifier import IMG_SIZE, PT_WEIGHTS, open_model, predict_probs
+from bench_cv_runtimes import load_split
+
+
+def export(pt: Path, fmt: str, int8: bool, data: str, imgsz: int) -> Path:
+    model = open_model(pt)
+    kwargs = {"format": fmt, "imgsz": imgsz, "dynamic": True}
+    if fmt == "onnx":
+        kwargs["simplify"] = True
+    if fmt == "openvino" and int8:
+        if not data:
+            raise SystemExit("--int8 needs --data (calibration images)")
+        kwargs.update(int8=True, data=data)
+    out = Path(model.export(**kwargs))
+    print(f"[{fmt}{' int8' if kwargs.get('int8') else ''}] -> {out}")
+    return out
+
+
+def parity_check(pt: Path, exported: Path, images) -> None:
+    ref = predict_probs(images, model=open_model(pt))
+    got = predict_probs(images, model=open_model(exported))
+    diff = max(float(np.abs(a - b).max()) for (a, _), (b, _) in zip(ref, got))
+    agree = np.mean([int(a.argmax() == b.argmax()) for (a, _), (b, _) in zip(ref, got)])
+    print(f"  parity vs best.pt on {len(images)} images: max |dprob|={diff:.4f}, top-1 agreement={agree:.1%}")
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Export the CV classifier to ONNX / OpenVINO.")
+    ap.add_argument("--weights", default=str(PT_WEIGHTS), help="source .pt (default: train7 best.pt)")
+    ap.add_argument("--formats", nargs="+", default=["onnx"], choices=["onnx", "openvino"])
+    ap.add_argument("--int8", action="store_true", help="int8-quantize the OpenVINO export")
+    ap.add_argument("--data", default="", help="dataset root (int8 calibration, parity images)")
+    ap.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    ap.add_argument("--check", type=int, default=16, help="images for the parity check (0 = skip)")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    pt = Path(args.weights)
+    outputs = [export(pt, fmt, args.int8, args.data, args.imgsz) for fmt in args.formats]
+
+    if not args.check:
+        return
+    if args.data:
+        split = Path(args.data) / "test" if (Path(args.data) / "test").is_dir() else Path(args.data)
+        images = [img for img, _ in load_split(split, limit=args.check)]
+    else:
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 255, (args.imgsz, args.imgsz, 3), dtype=np.uint8)
+                  for _ in range(args.check)]
+    for out in outputs:
+        print(out.name)
+        parity_check(pt, out, images)
+
+
+if __name__ == "__main__":
+    main()
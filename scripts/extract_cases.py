@@ -1,18 +1,20 @@
-import pdfplumber
+import sys
 from pathlib import Path
 
+# Add project root to Python path (for utils.pdf)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.pdf import extract_text
+
 CASES_DIR = Path(r"C:\Users\Noran\Desktop\MECC_21\data\cases")
 OUT_DIR = Path(r"C:\Users\Noran\Desktop\MECC_21\data\extracted_cases")
 
 OUT_DIR.mkdir(exist_ok=True)
 
 for pdf_path in CASES_DIR.glob("*.pdf"):
-    text_parts = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            txt = page.extract_text() or ""
-            text_parts.append(txt)
-    full_text = "\n\n".join(text_parts)
+    full_text = extract_text(pdf_path, sep="\n\n")
 
     out_txt = OUT_DIR / (pdf_path.stem + "_raw.txt")
     out_txt.write_text(full_text, encoding="utf-8")
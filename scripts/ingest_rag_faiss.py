@@ -1,13 +1,22 @@
 from pathlib import Path
 import re
-from typing import Dict, List
+import sys
+from typing import List
 
-import pdfplumber
 from langchain_experimental.text_splitter import SemanticChunker
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
 
+from report_sections import SECTION_HEADINGS, Segmentation, segment_report
+
+# Add project root to Python path (for utils.pdf)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.pdf import extract_text
+
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -31,48 +40,6 @@ chunker = SemanticChunker(
 
 
 
-SECTION_HEADINGS = {
-    "executive_summary": [
-        r"EXECUTIVE SUMMARY",
-        r"SUMMARY",
-        r"ABSTRACT",
-    ],
-    "incident_description": [
-        r"INCIDENT DESCRIPTION",
-        r"DESCRIPTION OF INCIDENT",
-        r"DESCRIPTION OF THE INCIDENT",
-        r"ACCIDENT DESCRIPTION",
-        r"BACKGROUND OF THE INCIDENT",
-    ],
-    "technical_analysis": [
-        r"TECHNICAL ANALYSIS",
-        r"TECHNICAL DISCUSSION",
-        r"CAUSE ANALYSIS",
-        r"ANALYSIS",
-    ],
-    "safety_issues": [
-        r"SAFETY ISSUES",
-        r"SAFETY MANAGEMENT",
-        r"CONTRIBUTING FACTORS",
-        r"CAUSAL FACTORS",
-        r"ROOT CAUSES",
-    ],
-    "recommendations": [
-        r"RECOMMENDATIONS",
-        r"SAFETY RECOMMENDATIONS",
-        r"CORRECTIVE ACTIONS",
-        r"PREVENTIVE ACTIONS",
-        r"PREVENTION MEASURES",
-    ],
-    "key_lessons": [
-        r"KEY LESSONS",
-        r"LESSONS LEARNED",
-        r"KEY LESSONS FOR THE INDUSTRY",
-        r"KEY LESSONS FOR INDUSTRY",
-    ],
-}
-
-
 def clean_text(text: str) -> str:
     text = text.replace("\r\n", "\n")
     text = re.sub(r"\n\s*\n+", "\n\n", text)
@@ -81,58 +48,14 @@ def clean_text(text: str) -> str:
 
 # ---------------- CASES INGEST ----------------
 
-def find_section_positions(text: str) -> Dict[str, int]:
-    """
-    Find approximate starting index of each section heading.
-    Returns { section_key: start_index } in original text.
-    """
-    upper = text.upper()
-    positions: Dict[str, int] = {}
-
-    for key, patterns in SECTION_HEADINGS.items():
-        for pat in patterns:
-            m = re.search(pat, upper)
-            if m:
-                if key not in positions or m.start() < positions[key]:
-                    positions[key] = m.start()
-                break
-
-    return positions
-
-
-def slice_sections(text: str, positions: Dict[str, int]) -> Dict[str, str]:
-    """
-    Slice full text into sections using heading positions.
-    Returns { section_key: section_text } (raw, unchunked).
-    """
-    sections = {k: "" for k in SECTION_HEADINGS.keys()}
-    if not positions:
-        return sections
-
-    ordered = sorted(positions.items(), key=lambda x: x[1])
-
-    for i, (key, start) in enumerate(ordered):
-        end = ordered[i + 1][1] if i + 1 < len(ordered) else len(text)
-
-        # end of heading line
-        newline_idx = text.find("\n", start)
-        if newline_idx == -1:
-            heading_end = start
-        else:
-            heading_end = newline_idx + 1
-
-        raw_section = text[heading_end:end]
-        sections[key] = clean_text(raw_section)
-
-    return sections
-
-
-def chunk_case_section(case_id: str, file_name: str, section_key: str, section_text: str) -> List[Document]:
+def chunk_case_section(case_id: str, file_name: str, seg: Segmentation, section_key: str) -> List[Document]:
     """
     Use SemanticChunker on a single case section.
-    Returns list[Document] with metadata.
+    Returns list[Document] with metadata, including the report pages
+    each chunk came from.
     """
-    section_text = section_text.strip()
+    section = seg.sections.get(section_key)
+    section_text = clean_text(section.text) if section else ""
     if not section_text:
         return []
 
@@ -140,11 +63,14 @@ def chunk_case_section(case_id: str, file_name: str, section_key: str, section_t
     docs = chunker.create_documents([section_text])
 
     for i, d in enumerate(docs):
+        page_start, page_end = seg.locate(d.page_content, section)
         d.metadata["source"] = "case"
         d.metadata["case_id"] = case_id
         d.metadata["file_name"] = file_name
         d.metadata["section"] = section_key
         d.metadata["chunk_index"] = i
+        d.metadata["page_start"] = page_start
+        d.metadata["page_end"] = page_end
 
     return docs
 
@@ -166,12 +92,11 @@ def ingest_cases() -> List[Document]:
         case_id = txt_path.stem.replace("_raw", "")
         file_name = txt_path.name
 
-        positions = find_section_positions(raw_text)
-        sections = slice_sections(raw_text, positions)
+        seg = segment_report(raw_text)
 
-        for section_key, section_text in sections.items():
+        for section_key in SECTION_HEADINGS:
             print(f"  - Chunking section '{section_key}' for case {case_id}...")
-            docs = chunk_case_section(case_id, file_name, section_key, section_text)
+            docs = chunk_case_section(case_id, file_name, seg, section_key)
             all_docs.extend(docs)
 
     print(f"\n[CASES] Total case chunks created: {len(all_docs)}")
@@ -181,12 +106,8 @@ def ingest_cases() -> List[Document]:
 # ---------------- HANDBOOK INGEST ----------------
 
 def extract_pdf_text(pdf_path: Path) -> str:
-    parts = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            txt = page.extract_text() or ""
-            parts.append(txt)
-    return "\n\n".join(parts)
+    # cached per page; unchanged PDFs are not re-parsed
+    return extract_text(pdf_path, sep="\n\n")
 
 
 def ingest_handbooks() -> List[Document]:
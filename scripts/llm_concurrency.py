@@ -0,0 +1,75 @@
+"""
+Small helpers for running many LLM calls from a thread pool:
+a shared request rate limiter and a thread-safe progress/throughput reporter.
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all worker threads.
+
+    rate_per_min requests are allowed per minute, with bursts of up to
+    `burst` back-to-back requests. rate_per_min <= 0 disables limiting.
+    """
+
+    def __init__(self, rate_per_min: float, burst: int = 1):
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Progress:
+    """Counts finished calls/cases and prints throughput as they complete."""
+
+    def __init__(self, total_calls: int, total_cases: int, every: int = 1):
+        self.total_calls = total_calls
+        self.total_cases = total_cases
+        self.every = max(1, every)
+        self.calls = 0
+        self.failed = 0
+        self.cases = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def call_done(self, ok: bool = True):
+        with self.lock:
+            self.calls += 1
+            if not ok:
+                self.failed += 1
+            if self.calls % self.every == 0 or self.calls == self.total_calls:
+                self._print()
+
+    def case_done(self):
+        with self.lock:
+            self.cases += 1
+
+    def _print(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.calls / elapsed if elapsed > 0 else 0.0
+        print(f"[progress] calls {self.calls}/{self.total_calls} "
+              f"(failed {self.failed}), cases {self.cases}/{self.total_cases}, "
+              f"{rate:.2f} calls/s, {elapsed:.1f}s elapsed")
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.calls / elapsed if elapsed > 0 else 0.0
+        return (f"{self.calls} LLM calls ({self.failed} failed) for {self.cases} cases "
+                f"in {elapsed:.1f}s, {rate:.2f} calls/s")
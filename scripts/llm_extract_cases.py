@@ -1,17 +1,50 @@
+import argparse
 import os 
 import json
 from pathlib import Path
 import re
+import sys
 import time
-from openai import OpenAI 
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
-client = OpenAI()
+from openai import OpenAI
+
+# Add project root to Python path (for utils.llm_store)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.llm_store import StoredClient
+from utils.llm_telemetry import TELEMETRY, llm_call, print_report
+
+from map_reduce import count_tokens, split_into_pieces, submit_map_reduce
+
+from run_manifest import (
+    STATUS_DONE, STATUS_FAILED, RunManifest,
+    prompt_version, run_key, text_hash, write_json_atomic,
+)
+
+# MECC_LLM_STORE_MODE=record|replay reuses stored responses (see utils/llm_store.py)
+client = StoredClient(OpenAI)
+
+MODEL_NAME = "gpt-4.1-mini"
+MAX_CHARS = 4000
+
+# How reports longer than one call are handled:
+#   "map-reduce": extract from every PIECE_MAX_TOKENS piece in parallel, then merge
+#   "truncate":   only the first MAX_CHARS characters are read
+LONG_REPORT_MODES = ("map-reduce", "truncate")
+PIECE_MAX_TOKENS = 6000
+REDUCE_MAX_TOKENS = 6000
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 RAW_DIR = BASE_DIR / "data" / "extracted_cases"
 OUT_DIR = BASE_DIR / "data" / "cases_structured"
 
 OUT_DIR.mkdir(exist_ok=True)
+# Per-case checkpoints so an interrupted run can resume
+MANIFEST_PATH = OUT_DIR / "_manifest.jsonl"
 
 SYSTEM_PROMPT = """You are helping extract structured information from an industrial incident investigation report.
 
@@ -48,6 +81,32 @@ USER_PROMPT_TEMPLATE = """Extract the fields from the following incident report
 --- END REPORT TEXT ---
 """
 
+MAP_PROMPT_TEMPLATE = """Extract the fields from part {part} of {parts} of an incident report.
+Only fill what this part states; leave other fields as "".
+
+--- BEGIN REPORT PART ---
+{report_text}
+--- END REPORT PART ---
+"""
+
+REDUCE_PROMPT_TEMPLATE = """Below are JSON extractions from consecutive parts of ONE incident report, in order.
+Merge them into a single JSON object with the same schema: combine the text of each
+field across parts, remove duplicates, and keep the order of events. Do not add facts.
+
+--- BEGIN PARTIAL EXTRACTIONS ---
+{partials}
+--- END PARTIAL EXTRACTIONS ---
+"""
+
+# Changes whenever the prompts or truncation change, invalidating old checkpoints
+PROMPT_VERSIONS = {
+    "truncate": prompt_version("extract-v1", SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, MAX_CHARS),
+    "map-reduce": prompt_version(
+        "extract-mr-v1", SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, MAP_PROMPT_TEMPLATE,
+        REDUCE_PROMPT_TEMPLATE, PIECE_MAX_TOKENS, REDUCE_MAX_TOKENS,
+    ),
+}
+
 
 def clean_text(text: str) -> str:
     # remove non-printable characters
@@ -57,81 +116,135 @@ def clean_text(text: str) -> str:
     return text
 
 
-def call_llm_for_case(text: str, case_id: str):
-    """Call the LLM and return the parsed JSON dict"""
-
-    text = clean_text(text)
-
-    MAX_CHARS = 4000
-    if len(text) > MAX_CHARS:
-        text = text[:MAX_CHARS]
-
-    user_prompt = USER_PROMPT_TEMPLATE.format(report_text=text)
-
+def _extract_json(user_prompt: str, label: str, caller: str = "case_extract") -> dict:
+    """One extraction call with retries; returns the parsed JSON object."""
     for attempt in range(3):
         try:
-            response = client.responses.create(
-                model="gpt-4.1-mini",
-                input=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt},
-                ],
-                max_output_tokens=1200,
-            )
+            with llm_call(caller, attempt=attempt + 1):
+                response = client.responses.create(
+                    model=MODEL_NAME,
+                    input=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    max_output_tokens=1200,
+                )
             raw_output = response.output[0].content[0].text
-            data = json.loads(raw_output)
-            data["case_id"] = case_id
-            return data
+            return json.loads(raw_output)
 
         except Exception as e:
-            print(f"[Attempt {attempt+1}] Error: {e}")
+            print(f"[{label} attempt {attempt+1}] Error: {e}")
             if attempt < 2:
                 print("Retrying in 2 seconds…")
                 time.sleep(2)
             else:
-                raise RuntimeError(f"Failed after 3 attempts for case {case_id}") from e
+                raise RuntimeError(f"Failed after 3 attempts for {label}") from e
+
+
+def call_llm_for_case(text: str, case_id: str, mode: str = "truncate",
+                      pool: Optional[ThreadPoolExecutor] = None,
+                      manifest: Optional[RunManifest] = None, key: str = ""):
+    """
+    Call the LLM and return the parsed JSON dict.
+    In map-reduce mode a report longer than one call is split into pieces
+    that are extracted in parallel on `pool` and merged; finished pieces are
+    checkpointed in `manifest` so a retry only redoes the failed ones.
+    """
+
+    text = clean_text(text)
+
+    if mode == "truncate" or count_tokens(text) <= PIECE_MAX_TOKENS:
+        if len(text) > MAX_CHARS and mode == "truncate":
+            text = text[:MAX_CHARS]
+        data = _extract_json(USER_PROMPT_TEMPLATE.format(report_text=text), case_id)
+        data["case_id"] = case_id
+        return data
+
+    pieces = split_into_pieces(text, PIECE_MAX_TOKENS)
+
+    def map_fn(i: int, piece: str) -> str:
+        slot = f"map{i}"
+        cached = manifest.section_output(case_id, key, slot) if manifest else None
+        if cached is not None:
+            return cached
+        prompt = MAP_PROMPT_TEMPLATE.format(part=i + 1, parts=len(pieces), report_text=piece)
+        out = json.dumps(_extract_json(prompt, f"{case_id} part {i + 1}", "case_extract_map"), ensure_ascii=False)
+        if manifest is not None:
+            manifest.record_section(case_id, key, slot, STATUS_DONE, output=out)
+        return out
+
+    def reduce_fn(level: int, i: int, partials: List[str]) -> str:
+        prompt = REDUCE_PROMPT_TEMPLATE.format(partials="\n".join(partials))
+        return json.dumps(_extract_json(prompt, f"{case_id} merge {level}.{i}", "case_extract_reduce"), ensure_ascii=False)
+
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=8)
+    try:
+        merged = submit_map_reduce(pool, pieces, map_fn, reduce_fn, REDUCE_MAX_TOKENS).result()
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    data = json.loads(merged)
+    data["case_id"] = case_id
+    return data
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Extract structured cases with an LLM.")
+    ap.add_argument("--long-reports", choices=LONG_REPORT_MODES, default="map-reduce",
+                    help="how to handle reports longer than one call")
+    ap.add_argument("--max-in-flight", type=int, default=8,
+                    help="maximum concurrent LLM requests for one report's pieces")
+    return ap.parse_args()
 
 def main():
+    args = parse_args()
     all_cases = []
+    manifest = RunManifest(MANIFEST_PATH)
+    pool = ThreadPoolExecutor(max_workers=max(1, args.max_in_flight))
 
-    for txt_path in RAW_DIR.glob("*.txt"):
-        print(f"Processing {txt_path.name}...")
+    for txt_path in sorted(RAW_DIR.glob("*.txt")):
         text = txt_path.read_text(encoding="utf-8", errors="ignore")
 
         case_id = txt_path.stem.replace("_raw", "")
+        key = run_key(text_hash(text), PROMPT_VERSIONS[args.long_reports], MODEL_NAME)
+        out_path = OUT_DIR / f"{case_id}.json"
 
+        # finished in an earlier run with the same input, prompt and model
+        if manifest.case_done(case_id, key) and out_path.exists():
+            print(f"Skipping {txt_path.name} (already done)")
+            with out_path.open("r", encoding="utf-8") as f:
+                all_cases.append(json.load(f))
+            continue
+
+        print(f"Processing {txt_path.name}...")
         try:
-            case_data = call_llm_for_case(text, case_id)
+            case_data = call_llm_for_case(text, case_id, args.long_reports, pool, manifest, key)
         except Exception as e:
+            # no placeholder file: the manifest marks the case as failed
+            # and the next run retries it
             print(f"[ERROR] Skipping {case_id} due to repeated failures: {e} ")
-            # creating a placeholder 
-            case_data = {
-            "case_id": case_id,
-            "title": case_id,
-            "executive_summary": "",
-            "incident_description": "",
-            "technical_analysis": "",
-            "safety_issues": "",
-            "recommendations": "",
-            "key_lessons": ""
-        }
-        
-        out_path = OUT_DIR / f"{case_id}.json"
-        with out_path.open("w", encoding="utf-8") as f:
-            json.dump(case_data, f, ensure_ascii=False, indent=2)
+            manifest.record_case(case_id, key, STATUS_FAILED, error=str(e))
+            continue
+
+        write_json_atomic(out_path, case_data, ensure_ascii=False, indent=2)
+        manifest.record_case(case_id, key, STATUS_DONE)
 
         all_cases.append(case_data)
 
+    pool.shutdown()
+    manifest.compact()
+    manifest.close()
 
     # save combine cases in one JSON
     compined_path = OUT_DIR / "cases.json"
-    with compined_path.open("w", encoding="utf-8") as f:
-        json.dump(all_cases, f, ensure_ascii=False, indent=2)
+    write_json_atomic(compined_path, all_cases, ensure_ascii=False, indent=2)
 
-        print(f"Saved {len(all_cases)} cases to {compined_path}")
+    print(f"Saved {len(all_cases)} cases to {compined_path}")
+    print(f"Manifest: {manifest.summary()} → {MANIFEST_PATH}")
+    print()
+    print_report(TELEMETRY.snapshot())
 
 if __name__ == "__main__":
     main()
-
-        
-
@@ -0,0 +1,464 @@
+"""
+HTTP load test for the analysis API: throughput, error rate and tail latency.
+
+Replays a corpus of incident payloads against /api/analyze and photos
+against /api/_imgcv, mixed by weight, and reports per-endpoint throughput,
+error rate and p50/p95/p99 (plus the mean of each Server-Timing stage).
+
+    # closed loop: 8 clients, each sends its next request when the last returns
+    python scripts/load_test.py --url http://127.0.0.1:5000 --concurrency 8 --duration 60
+
+    # open loop: 2 requests/s (Poisson arrivals), regardless of how fast the server answers
+    python scripts/load_test.py --rate 2 --duration 120 --mix analyze=3,imgcv=1
+
+    # fully offline: start the mock LLM server and the app, then load them
+    python scripts/load_test.py --spawn --mock-latency-ms 800 --concurrency 4 \\
+        --save-baseline data/loadtest/baseline.json
+    python scripts/load_test.py --spawn --mock-latency-ms 800 --concurrency 4 \\
+        --baseline data/loadtest/baseline.json            # exit 1 on regression
+
+In open-loop mode latency is measured from each request's scheduled send
+time, so time spent waiting for a free connection counts (no coordinated
+omission): if the server falls behind, the percentiles show it.
+
+--spawn runs scripts/mock_llm_server.py and the Flask app as child
+processes with OPENAI_BASE_URL pointed at the mock, so no API key or
+network is needed and LLM latency is whatever --mock-latency-ms says.
+With --spawn-workers N the app runs under gunicorn (gunicorn.conf.py,
+N preloaded workers) instead of the single-process development server.
+
+Incidents come from data/loadtest/incidents.jsonl (one /api/analyze JSON
+body per line); photos from --images (default: the labeled archive in
+runs/classify/predict).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add project root to Python path (for utils.metrics)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.metrics import percentile
+
+CORPUS_PATH = ROOT / "data" / "loadtest" / "incidents.jsonl"
+IMAGE_DIR = ROOT / "runs" / "classify" / "predict"
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+ENDPOINTS = {"analyze": "/api/analyze", "imgcv": "/api/_imgcv"}
+
+# report fields compared against a baseline: (key, higher_is_worse)
+COMPARED = [("throughput_rps", False), ("error_rate", True),
+            ("p50_ms", True), ("p95_ms", True), ("p99_ms", True)]
+
+
+# ---- workload ----
+def load_corpus(path: Path) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_images(folder: Path, limit: int = 64) -> List[Tuple[str, bytes]]:
+    if not folder.exists():
+        return []
+    paths = sorted(p for p in folder.rglob("*") if p.suffix.lower() in IMAGE_EXTS)[:limit]
+    return [(p.name, p.read_bytes()) for p in paths]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """"analyze=3,imgcv=1" -> {"analyze": 3.0, "imgcv": 1.0}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; use {list(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def multipart(fields: Dict[str, str], file_field: str, filename: str, data: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for k, v in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode())
+    parts.append(data)
+    parts.append(f"\r\n--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Workload:
+    """Thread-safe request generator: weighted endpoint choice, payloads round-robin."""
+
+    def __init__(self, base_url: str, corpus: List[dict], images: List[Tuple[str, bytes]],
+                 mix: Dict[str, float], agent_mode: str = "", seed: int = 0):
+        if "imgcv" in mix and not images:
+            raise SystemExit("no images for /api/_imgcv; pass --images or drop imgcv from --mix")
+        if "analyze" in mix and not corpus:
+            raise SystemExit("empty incident corpus")
+        self.base_url = base_url.rstrip("/")
+        self.corpus, self.images = corpus, images
+        self.names = list(mix)
+        self.weights = [mix[n] for n in self.names]
+        self.agent_mode = agent_mode
+        self.rng = random.Random(seed)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def next(self) -> Tuple[str, urllib.request.Request]:
+        with self.lock:
+            name = self.rng.choices(self.names, self.weights)[0]
+            i = self.counts[name]
+            self.counts[name] += 1
+        url = self.base_url + ENDPOINTS[name]
+        if name == "analyze":
+            payload = dict(self.corpus[i % len(self.corpus)])
+            if self.agent_mode:
+                payload["agent_mode"] = self.agent_mode
+            req = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        else:
+            filename, data = self.images[i % len(self.images)]
+            body, ctype = multipart({"k": "5"}, "file", filename, data)
+            req = urllib.request.Request(url, data=body, headers={"Content-Type": ctype})
+        return name, req
+
+
+# ---- measurement ----
+def parse_server_timing(value: Optional[str]) -> Dict[str, float]:
+    """'embed_query;dur=11.8, faiss_search;dur=0.7' -> {"embed_query": 11.8, ...}"""
+    out = {}
+    for entry in (value or "").split(","):
+        name, *params = [p.strip() for p in entry.split(";")]
+        for p in params:
+            if name and p.startswith("dur="):
+                try:
+                    out[name] = float(p[4:])
+                except ValueError:
+                    pass
+    return out
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: List[dict] = []
+
+    def add(self, endpoint: str, status: int, latency_ms: float, stages: Dict[str, float], error: str):
+        with self.lock:
+            self.samples.append({"endpoint": endpoint, "status": status, "latency_ms": latency_ms,
+                                 "stages": stages, "error": error})
+
+
+def send(name: str, req: urllib.request.Request, results: Results, timeout: float,
+         scheduled: Optional[float] = None):
+    t0 = scheduled if scheduled is not None else time.perf_counter()
+    status, stages, error = 0, {}, ""
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+            stages = parse_server_timing(resp.headers.get("Server-Timing"))
+    except urllib.error.HTTPError as e:
+        status, error = e.code, e.read()[:200].decode("utf-8", "replace")
+    except Exception as e:  # connection refused, timeout, reset
+        error = f"{type(e).__name__}: {e}"
+    results.add(name, status, (time.perf_counter() - t0) * 1000, stages, error)
+
+
+def run_closed(workload: Workload, results: Results, concurrency: int, duration: float,
+               requests: int, timeout: float) -> float:
+    deadline = time.perf_counter() + duration
+    sent = [0]
+    lock = threading.Lock()
+
+    def client():
+        while time.perf_counter() < deadline:
+            with lock:
+                if requests and sent[0] >= requests:
+                    return
+                sent[0] += 1
+            send(*workload.next(), results, timeout)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def run_open(workload: Workload, results: Results, rate: float, duration: float, requests: int,
+             timeout: float, max_in_flight: int, poisson: bool, seed: int) -> float:
+    rng = random.Random(seed)
+    n = requests or int(rate * duration)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as pool:
+        at = t0
+        for _ in range(n):
+            at += rng.expovariate(rate) if poisson else 1.0 / rate
+            delay = at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, *workload.next(), results, timeout, at)
+    return time.perf_counter() - t0
+
+
+def summarize(samples: List[dict], elapsed: float) -> dict:
+    lat = [s["latency_ms"] for s in samples]
+    ok = [s for s in samples if 200 <= s["status"] < 300]
+    errors = defaultdict(int)
+    for s in samples:
+        if not 200 <= s["status"] < 300:
+            errors[str(s["status"] or s["error"].split(":")[0])] += 1
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for s in ok:
+        for name, ms in s["stages"].items():
+            stages[name].append(ms)
+    r = lambda v: round(v, 1) if v is not None else None
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_rate": round((len(samples) - len(ok)) / max(len(samples), 1), 4),
+        "error_kinds": dict(errors),
+        "throughput_rps": round(len(ok) / max(elapsed, 1e-9), 3),
+        "p50_ms": r(percentile(lat, 50)),
+        "p95_ms": r(percentile(lat, 95)),
+        "p99_ms": r(percentile(lat, 99)),
+        "max_ms": r(max(lat, default=None)),
+        "stages_mean_ms": {k: round(sum(v) / len(v), 1) for k, v in stages.items()},
+    }
+
+
+def build_report(results: Results, elapsed: float, config: dict) -> dict:
+    by_endpoint: Dict[str, List[dict]] = defaultdict(list)
+    for s in results.samples:
+        by_endpoint[s["endpoint"]].append(s)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": config,
+        "elapsed_s": round(elapsed, 2),
+        "overall": summarize(results.samples, elapsed),
+        "endpoints": {name: summarize(s, elapsed) for name, s in sorted(by_endpoint.items())},
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{'endpoint':10s} {'reqs':>6s} {'err %':>6s} {'req/s':>7s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}")
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    fmt = lambda v: f"{v:8.1f}" if v is not None else f"{'-':>8s}"
+    for name, s in rows:
+        print(f"{name:10s} {s['requests']:6d} {100 * s['error_rate']:6.2f} {s['throughput_rps']:7.2f} "
+              f"{fmt(s['p50_ms'])} {fmt(s['p95_ms'])} {fmt(s['p99_ms'])} {fmt(s['max_ms'])}")
+    for name, s in report["endpoints"].items():
+        if s["stages_mean_ms"]:
+            stages = ", ".join(f"{k} {v:.0f}" for k, v in s["stages_mean_ms"].items())
+            print(f"  {name} stages (mean ms): {stages}")
+        if s["error_kinds"]:
+            print(f"  {name} errors: {s['error_kinds']}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float, error_tolerance: float) -> List[str]:
+    """Regressions beyond tolerance (relative; error rate is absolute), printed as a table."""
+    if baseline.get("config") != report["config"]:
+        print("\nnote: baseline was recorded with a different configuration:")
+        print(f"  baseline {baseline.get('config')}\n  current  {report['config']}")
+    print(f"\n{'endpoint':10s} {'metric':15s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    regressions = []
+    sections = [("overall", report["overall"], baseline.get("overall") or {})]
+    sections += [(name, s, (baseline.get("endpoints") or {}).get(name) or {})
+                 for name, s in report["endpoints"].items()]
+    for name, cur, base in sections:
+        for key, higher_is_worse in COMPARED:
+            old, new = base.get(key), cur.get(key)
+            if old is None or new is None:
+                continue
+            if key == "error_rate":
+                worse = new - old > error_tolerance
+                change = f"{100 * (new - old):+.2f}pp"
+            else:
+                delta = (new - old) / old if old else 0.0
+                worse = (delta > tolerance) if higher_is_worse else (delta < -tolerance)
+                change = f"{100 * delta:+.1f}%"
+            flag = "  REGRESSION" if worse else ""
+            print(f"{name:10s} {key:15s} {old:10.3f} {new:10.3f} {change:>8s}{flag}")
+            if worse:
+                regressions.append(f"{name} {key}: {old} -> {new} ({change})")
+    return regressions
+
+
+# ---- offline stack ----
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float, log: Path):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{url} exited with code {proc.returncode}; see {log}")
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s; see {log}")
+
+
+def spawn_stack(args) -> Tuple[str, List[subprocess.Popen]]:
+    """Start the mock LLM server and the app (pointed at it); returns (app URL, processes)."""
+    logs = Path(tempfile.mkdtemp(prefix="mecc-loadtest-"))
+    mock_port, app_port = free_port(), free_port()
+    procs = []
+
+    mock_log = logs / "mock_llm.log"
+    procs.append(subprocess.Popen(
+        [sys.executable, str(ROOT / "scripts" / "mock_llm_server.py"), "--port", str(mock_port),
+         "--latency-ms", str(args.mock_latency_ms), "--jitter", str(args.mock_jitter),
+         "--error-rate", str(args.mock_error_rate), "--seed", str(args.seed)],
+        cwd=str(ROOT), stdout=open(mock_log, "w"), stderr=subprocess.STDOUT,
+    ))
+    wait_ready(f"http://127.0.0.1:{mock_port}/v1/models", procs[-1], 60, mock_log)
+
+    env = dict(os.environ,
+               OPENAI_BASE_URL=f"http://127.0.0.1:{mock_port}/v1", OPENAI_API_KEY="mock",
+               # every request must reach the (mock) model, not the response store
+               MECC_LLM_STORE_MODE="passthrough", MECC_LLM_TELEMETRY="off")
+    app_log = logs / "app.log"
+    if args.spawn_workers:
+        env.update(MECC_BIND=f"127.0.0.1:{app_port}", MECC_WORKERS=str(args.spawn_workers),
+                   MECC_PIDFILE=str(logs / "gunicorn.pid"))
+        cmd = [sys.executable, "-m", "gunicorn", "-c", str(ROOT / "gunicorn.conf.py")]
+    else:
+        cmd = [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(app_port),
+               "--no-reload", "--no-debugger", "--with-threads"]
+    procs.append(subprocess.Popen(cmd, cwd=str(ROOT), env=env, stdout=open(app_log, "w"),
+                                  stderr=subprocess.STDOUT))
+    url = f"http://127.0.0.1:{app_port}"
+    wait_ready(url + "/metrics", procs[-1], args.startup_timeout, app_log)
+    print(f"spawned mock LLM on :{mock_port} and app on :{app_port} (logs in {logs})")
+    return url, procs
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Load-test /api/analyze and /api/_imgcv.")
+    ap.add_argument("--url", default="http://127.0.0.1:5000", help="app base URL")
+    ap.add_argument("--mix", type=parse_mix, default=parse_mix("analyze=1"),
+                    help='endpoint weights, e.g. "analyze=3,imgcv=1"')
+    ap.add_argument("--corpus", default=str(CORPUS_PATH), help="JSONL of /api/analyze bodies")
+    ap.add_argument("--images", default=str(IMAGE_DIR), help="photos for /api/_imgcv")
+    ap.add_argument("--agent-mode", default="", help="force agent_mode on every analyze request")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=4, help="closed loop: concurrent clients")
+    mode.add_argument("--rate", type=float, default=0.0, help="open loop: requests per second")
+    ap.add_argument("--arrivals", choices=["poisson", "fixed"], default="poisson",
+                    help="open loop: inter-arrival distribution")
+    ap.add_argument("--max-in-flight", type=int, default=256, help="open loop: connection cap")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    ap.add_argument("--requests", type=int, default=0, help="stop after N requests instead")
+    ap.add_argument("--warmup", type=int, default=2, help="unrecorded requests per endpoint first")
+    ap.add_argument("--timeout", type=float, default=120.0, help="per-request timeout (s)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="write the JSON report here")
+    ap.add_argument("--save-baseline", default="", help="store this run as the baseline")
+    ap.add_argument("--baseline", default="", help="compare against this baseline report")
+    ap.add_argument("--tolerance", type=float, default=0.15,
+                    help="allowed relative change in throughput/latency before it counts as a regression")
+    ap.add_argument("--error-tolerance", type=float, default=0.01,
+                    help="allowed absolute increase in error rate")
+    ap.add_argument("--spawn", action="store_true",
+                    help="start the mock LLM server and the app locally (offline run)")
+    ap.add_argument("--mock-latency-ms", type=float, default=800.0)
+    ap.add_argument("--mock-jitter", type=float, default=0.3)
+    ap.add_argument("--mock-error-rate", type=float, default=0.0)
+    ap.add_argument("--spawn-workers", type=int, default=0,
+                    help="serve the spawned app with gunicorn and N workers (0 = dev server)")
+    ap.add_argument("--startup-timeout", type=float, default=120.0)
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    procs: List[subprocess.Popen] = []
+    url = args.url
+    try:
+        if args.spawn:
+            url, procs = spawn_stack(args)
+        corpus = load_corpus(Path(args.corpus)) if "analyze" in args.mix else []
+        images = load_images(Path(args.images)) if "imgcv" in args.mix else []
+        workload = Workload(url, corpus, images, args.mix, args.agent_mode, args.seed)
+
+        # model loading and first-call costs are not what we are measuring
+        warm = Results()
+        for name in args.mix:
+            for _ in range(args.warmup):
+                sub = Workload(url, corpus, images, {name: 1.0}, args.agent_mode, args.seed)
+                send(*sub.next(), warm, args.timeout)
+        failed = [s for s in warm.samples if not 200 <= s["status"] < 300]
+        if failed:
+            print(f"warning: {len(failed)}/{len(warm.samples)} warm-up requests failed, "
+                  f"e.g. {failed[0]['status']} {failed[0]['error'][:120]}")
+
+        config = {"mix": args.mix, "agent_mode": args.agent_mode or None,
+                  "spawn": args.spawn, "duration": args.duration, "requests": args.requests}
+        if args.spawn:
+            config.update(mock_latency_ms=args.mock_latency_ms, workers=args.spawn_workers)
+        results = Results()
+        if args.rate:
+            config.update(mode="open", rate=args.rate, arrivals=args.arrivals)
+            print(f"open loop: {args.rate:g} req/s ({args.arrivals}) against {url}")
+            elapsed = run_open(workload, results, args.rate, args.duration, args.requests,
+                               args.timeout, args.max_in_flight, args.arrivals == "poisson", args.seed)
+        else:
+            config.update(mode="closed", concurrency=args.concurrency)
+            print(f"closed loop: {args.concurrency} clients against {url}")
+            elapsed = run_closed(workload, results, args.concurrency, args.duration, args.requests,
+                                 args.timeout)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    report = build_report(results, elapsed, config)
+    print_report(report)
+    for path in filter(None, [args.out, args.save_baseline]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"report -> {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance, args.error_tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) vs {args.baseline}")
+            sys.exit(1)
+        print(f"\nno regressions vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
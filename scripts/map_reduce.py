@@ -0,0 +1,168 @@
+"""
+Map-reduce helpers for texts longer than one LLM call should carry.
+
+split_into_pieces() cuts text into token-bounded pieces at paragraph or
+sentence boundaries. submit_map_reduce() runs map_fn over every piece on a
+thread pool, then folds the partial results with reduce_fn (in a tree when
+they don't fit into one call). Stages are chained with future callbacks
+rather than blocking waits, so a small pool shared by many documents never
+deadlocks on its own reduce steps.
+"""
+import re
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable, List, Sequence
+
+try:
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional: fall back to a ~4 chars/token estimate
+    _ENC = None
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text: str) -> int:
+    if _ENC is not None:
+        return len(_ENC.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Break a single paragraph that is too long: by sentence, then by size."""
+    out: List[str] = []
+    for sentence in _SENTENCE_RE.split(text):
+        if count_tokens(sentence) <= max_tokens:
+            out.append(sentence)
+            continue
+        step = max_tokens * 4
+        out.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+    return out
+
+
+def split_into_pieces(text: str, max_tokens: int) -> List[str]:
+    """Greedily pack paragraphs (then sentences) into pieces of <= max_tokens."""
+    units: List[str] = []
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        if count_tokens(para) <= max_tokens:
+            units.append(para)
+        else:
+            units.extend(_split_oversized(para, max_tokens))
+
+    pieces: List[str] = []
+    cur: List[str] = []
+    cur_tokens = 0
+    for u in units:
+        n = count_tokens(u)
+        if cur and cur_tokens + n > max_tokens:
+            pieces.append("\n\n".join(cur))
+            cur, cur_tokens = [], 0
+        cur.append(u)
+        cur_tokens += n
+    if cur:
+        pieces.append("\n\n".join(cur))
+    return pieces
+
+
+def done_future(value) -> Future:
+    fut: Future = Future()
+    fut.set_result(value)
+    return fut
+
+
+def _forward(src: Future, dst: Future):
+    exc = src.exception()
+    if exc is not None:
+        dst.set_exception(exc)
+    else:
+        dst.set_result(src.result())
+
+
+def when_all(futures: Sequence[Future], then: Callable[[list], object]) -> Future:
+    """
+    Future resolved with then([results...]) once every future has finished.
+    `then` runs in the thread that completed the last future and may return
+    another Future to chain on.
+    """
+    out: Future = Future()
+    futures = list(futures)
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def fire():
+        try:
+            res = then([f.result() for f in futures])
+        except BaseException as e:
+            out.set_exception(e)
+            return
+        if isinstance(res, Future):
+            res.add_done_callback(lambda f: _forward(f, out))
+        else:
+            out.set_result(res)
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            fire()
+
+    if not futures:
+        fire()
+    for f in futures:
+        f.add_done_callback(on_done)
+    return out
+
+
+def _group_by_tokens(texts: List[str], max_tokens: int) -> List[List[str]]:
+    groups: List[List[str]] = []
+    cur: List[str] = []
+    cur_tokens = 0
+    for t in texts:
+        n = count_tokens(t)
+        if cur and cur_tokens + n > max_tokens:
+            groups.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(t)
+        cur_tokens += n
+    if cur:
+        groups.append(cur)
+    if len(groups) == len(texts) and len(texts) > 1:
+        # nothing fits together: pair up anyway so every level halves the count
+        groups = [texts[i:i + 2] for i in range(0, len(texts), 2)]
+    return groups
+
+
+def submit_reduce(pool: Executor, texts: List[str],
+                  reduce_fn: Callable[[int, int, List[str]], str],
+                  max_tokens: int, level: int = 0) -> Future:
+    """Fold texts with reduce_fn(level, index, group) until one result is left."""
+    groups = _group_by_tokens(texts, max_tokens)
+    if len(groups) == 1:
+        return pool.submit(reduce_fn, level, 0, groups[0])
+    futs = [pool.submit(reduce_fn, level, i, g) for i, g in enumerate(groups)]
+    return when_all(futs, lambda outs: submit_reduce(pool, outs, reduce_fn, max_tokens, level + 1))
+
+
+def submit_map_reduce(pool: Executor, pieces: List[str],
+                      map_fn: Callable[[int, str], str],
+                      reduce_fn: Callable[[int, int, List[str]], str],
+                      max_reduce_tokens: int) -> Future:
+    """
+    Run map_fn(index, piece) over all pieces in parallel, then reduce.
+    Returns a Future for the final text; any stage error propagates to it.
+    """
+    map_futs = [pool.submit(map_fn, i, p) for i, p in enumerate(pieces)]
+    return when_all(map_futs, lambda outs: submit_reduce(pool, outs, reduce_fn, max_reduce_tokens))
+
+
+def estimate_calls(num_pieces: int, fan_in: int = 4) -> int:
+    """Rough number of LLM calls a map-reduce over num_pieces will make."""
+    calls, n = num_pieces, num_pieces
+    while n > 1:
+        n = (n + fan_in - 1) // fan_in
+        calls += n
+    return calls + (1 if num_pieces == 1 else 0)
@@ -0,0 +1,129 @@
+"""
+Local API 571 mechanism suggestions from incident text (no LLM call).
+
+Every mechanism in api571_mechanisms_clean.json is embedded once
+(name + description + appearance) into a row-normalized matrix; ranking an
+incident description is one query embedding plus one matrix-vector product.
+The matrix is cached in data/api571_embeddings.npz, keyed on the catalogue
+digest and embedding model name. When the registry swaps the embedder, the
+new model's matrix is built before the swap.
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from api571_loader import catalogue_digest, iter_mechanisms
+from rag_faiss_client import EMBEDDER
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+EMB_CACHE_PATH = BASE_DIR / "data" / "api571_embeddings.npz"
+
+# Per-field cap so long descriptions don't crowd out the appearance text
+FIELD_MAX_CHARS = 600
+
+
+def _as_text(val) -> str:
+    if isinstance(val, list):
+        return " ".join(val)
+    return val or ""
+
+
+def mechanism_text(entry: dict) -> str:
+    """Text embedded for one mechanism: name + description + appearance."""
+    parts = [
+        entry.get("name", ""),
+        _as_text(entry.get("description"))[:FIELD_MAX_CHARS],
+        _as_text(entry.get("appearance"))[:FIELD_MAX_CHARS],
+    ]
+    return "\n".join(p for p in parts if p)
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    return m / np.maximum(norms, 1e-12)
+
+
+_matrices: Dict[str, Tuple[List[str], List[str], np.ndarray]] = {}
+_matrix_lock = threading.Lock()
+
+
+def _load_matrix(bundle=None) -> Tuple[List[str], List[str], np.ndarray]:
+    """(ids, names, matrix[n_mechanisms, dim]) with L2-normalized rows, per embedder."""
+    bundle = bundle or EMBEDDER.current()
+    if bundle.model_name not in _matrices:
+        with _matrix_lock:
+            if bundle.model_name not in _matrices:
+                _matrices[bundle.model_name] = _build_matrix(bundle.embedding, bundle.model_name)
+    return _matrices[bundle.model_name]
+
+
+def _build_matrix(embedding, model_name: str) -> Tuple[List[str], List[str], np.ndarray]:
+    mechs = iter_mechanisms()
+    ids = [mid for mid, _ in mechs]
+    names = [e.get("name", mid) for mid, e in mechs]
+    digest = catalogue_digest()
+
+    if EMB_CACHE_PATH.exists():
+        cached = np.load(EMB_CACHE_PATH, allow_pickle=False)
+        if (str(cached["digest"]) == digest and str(cached["model"]) == model_name
+                and list(cached["ids"]) == ids):
+            return ids, names, cached["matrix"]
+
+    vecs = embedding.embed_documents([mechanism_text(e) for _, e in mechs])
+    matrix = _normalize(np.asarray(vecs, dtype=np.float32))
+
+    np.savez(EMB_CACHE_PATH, digest=digest, model=model_name,
+             ids=np.array(ids), matrix=matrix)
+    return ids, names, matrix
+
+
+def _drop_stale(spec: dict):
+    """After an embedder swap only the new model's matrix is needed."""
+    with _matrix_lock:
+        for name in [n for n in _matrices if n != spec["model"]]:
+            del _matrices[name]
+
+
+EMBEDDER.add_prepare(lambda bundle, spec: _load_matrix(bundle))
+EMBEDDER.on_swap(_drop_stale)
+
+
+def warm_up():
+    """Build or load the mechanism matrix ahead of the first request."""
+    _load_matrix()
+
+
+def suggest_mechanisms(text: str, k: int = 5) -> List[dict]:
+    """
+    Rank API 571 mechanisms for an incident description.
+    Returns [{id, name, score}] with cosine similarity scores, best first.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+
+    with EMBEDDER.acquire() as bundle:
+        ids, names, matrix = _load_matrix(bundle)
+        q = _normalize(np.asarray(bundle.embedding.embed_query(text), dtype=np.float32))
+    scores = matrix @ q
+
+    k = min(k, len(ids))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [{"id": ids[i], "name": names[i], "score": round(float(scores[i]), 4)} for i in top]
+
+
+if __name__ == "__main__":
+    warm_up()
+    sample = ("Internal pitting and general wall loss at the bottom of a horizontal "
+              "carbon steel line in wet CO2 amine service.")
+    n = 50
+    t0 = time.perf_counter()
+    for _ in range(n):
+        out = suggest_mechanisms(sample)
+    print(f"{(time.perf_counter() - t0) / n * 1000:.2f} ms/request")
+    for s in out:
+        print(f"  {s['id']:6s} {s['score']:.3f}  {s['name']}")
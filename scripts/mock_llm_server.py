@@ -0,0 +1,352 @@
+"""
+Local stand-in for the OpenAI API, for offline end-to-end benchmarks.
+
+Implements the endpoints our code calls:
+  POST /v1/chat/completions   (client.chat.completions.create, incl. stream=True)
+  POST /v1/responses          (client.responses.create)
+  GET  /v1/models
+
+Replies are shaped after the prompt: MechanismsOut JSON for the reasoner,
+RecsOut JSON for the recommender, the case schema for llm_extract_cases.py
+and plain text for section rewrites. Latency, error rate and token counts
+are configurable, so /api/analyze and the case builders can be load-tested
+without network access or API quota.
+
+Run it and point the OpenAI client at it with the standard base-URL env:
+
+    python scripts/mock_llm_server.py --port 8001 --latency-ms 800 --jitter 0.4
+    export OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=mock
+
+Settings can be changed while running via POST /_mock/config (same keys as
+the CLI flags, e.g. {"error_rate": 0.1}); GET /_mock/stats returns counters.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from flask import Flask, Response, jsonify, request
+
+from map_reduce import count_tokens
+
+LATENCY_DISTS = ("fixed", "uniform", "normal", "lognormal")
+
+DEFAULT_MECHANISMS = ["CO2 corrosion", "Pitting corrosion", "Erosion-corrosion"]
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 500.0     # median time before the first token
+    jitter: float = 0.3           # spread; meaning depends on latency_dist
+    latency_dist: str = "lognormal"
+    ms_per_token: float = 0.0     # extra decode time per completion token
+    error_rate: float = 0.0       # share of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0  # share of requests answered with HTTP 429
+    completion_tokens: int = 0    # reported completion tokens; 0 = count the reply
+    seed: Optional[int] = None
+
+
+def _latency_dist(value: str) -> str:
+    if value not in LATENCY_DISTS:
+        raise ValueError(f"latency_dist must be one of {LATENCY_DISTS}")
+    return value
+
+
+# POST /_mock/config: key -> converter
+_CASTS = {
+    "latency_ms": float, "jitter": float, "latency_dist": _latency_dist,
+    "ms_per_token": float, "error_rate": float, "rate_limit_rate": float,
+    "completion_tokens": int, "seed": lambda v: None if v is None else int(v),
+}
+
+
+class MockState:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "streams": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+
+    def count(self, key: str, n: int = 1):
+        with self.lock:
+            self.stats[key] += n
+
+    def random(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    def sample_latency(self) -> float:
+        """Seconds until the first token, drawn from the configured distribution."""
+        c = self.config
+        base = c.latency_ms / 1000.0
+        with self.lock:
+            if c.latency_dist == "fixed":
+                value = base
+            elif c.latency_dist == "uniform":
+                value = self.rng.uniform(base * (1 - c.jitter), base * (1 + c.jitter))
+            elif c.latency_dist == "normal":
+                value = self.rng.gauss(base, base * c.jitter)
+            else:  # lognormal: latency_ms is the median, jitter is sigma
+                value = self.rng.lognormvariate(0.0, c.jitter) * base
+        return max(0.0, value)
+
+
+# ---- canned content ----
+
+def _prompt_text(messages) -> str:
+    parts = []
+    for m in messages or []:
+        content = m.get("content") if isinstance(m, dict) else m
+        if isinstance(content, list):  # content parts
+            content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+        parts.append(str(content or ""))
+    return "\n".join(parts)
+
+
+def _candidates(prompt: str) -> List[str]:
+    m = re.search(r"Candidate mechanisms:\s*\[(.*?)\]", prompt)
+    names = re.findall(r"'([^']+)'|\"([^\"]+)\"", m.group(1)) if m else []
+    names = [a or b for a, b in names]
+    return names or DEFAULT_MECHANISMS
+
+
+def _evidence_ids(prompt: str) -> List[str]:
+    return re.findall(r"'id': '([^']+)'", prompt)[:4]
+
+
+def _mechanisms_json(prompt: str, rnd: float) -> dict:
+    names = _candidates(prompt)[:3]
+    ids = _evidence_ids(prompt)
+    out = []
+    for i, name in enumerate(names):
+        out.append({
+            "name": name,
+            "confidence": round(max(0.05, 0.85 - 0.2 * i - 0.1 * rnd), 2),
+            "reasoning": f"Service conditions and observed damage are consistent with {name}.",
+            "evidence": ids[i:i + 2],
+        })
+    return {"mechanisms": out}
+
+
+def _recs_json(prompt: str) -> dict:
+    names = _candidates(prompt)
+    m = re.search(r"Mechanisms \(selected\):\s*(\[.*?\])\n", prompt, re.S)
+    if m:
+        names = re.findall(r"'name': '([^']+)'", m.group(1)) or names
+    first = names[0] if names else "the suspected mechanism"
+    return {
+        "immediate": [f"Isolate and depressurize the affected section; inspect for {first}."],
+        "medium_term": ["Perform UT thickness mapping around the damaged area.",
+                        "Review operating envelope against design limits."],
+        "long_term": [f"Select materials and mitigation resistant to {first}."],
+        "monitoring": ["Install corrosion coupons and trend wall-thickness readings quarterly."],
+        "gaps": [],
+    }
+
+
+def _case_json(prompt: str) -> dict:
+    text = prompt.split("--- BEGIN", 1)[-1]
+    sentences = re.split(r"(?<=[.!?])\s+", re.sub(r"\s+", " ", text))[1:]
+    first = " ".join(sentences[:2])
+    return {
+        "case_id": "", "title": first[:80], "executive_summary": first,
+        "incident_description": " ".join(sentences[2:5]), "technical_analysis": "",
+        "safety_issues": "", "recommendations": "", "key_lessons": "",
+    }
+
+
+def render_reply(prompt: str, rnd: float) -> str:
+    """Content the fake model returns for a prompt."""
+    if '"recommendations"' in prompt and '"mechanisms"' in prompt:  # fused agent
+        return json.dumps({**_mechanisms_json(prompt, rnd), "recommendations": _recs_json(prompt)})
+    if "medium_term" in prompt:
+        return json.dumps(_recs_json(prompt))
+    if '"mechanisms"' in prompt:
+        return json.dumps(_mechanisms_json(prompt, rnd))
+    if '"executive_summary"' in prompt and '"case_id"' in prompt:
+        return json.dumps(_case_json(prompt))
+    # free-text rewrite: echo back a compressed version of the input
+    body = prompt.rsplit("\n\n", 1)[-1]
+    return re.sub(r"\s+", " ", body).strip()[:1200]
+
+
+# ---- app ----
+
+def create_app(config: MockConfig) -> Flask:
+    app = Flask(__name__)
+    state = MockState(config)
+    app.config["MOCK_STATE"] = state
+
+    def _fail_or_none():
+        r = state.random()
+        c = state.config
+        if r < c.rate_limit_rate:
+            state.count("rate_limited")
+            return jsonify({"error": {"message": "Rate limit reached (mock)",
+                                      "type": "rate_limit_error", "code": "rate_limit_exceeded"}}), 429
+        if r < c.rate_limit_rate + c.error_rate:
+            state.count("errors")
+            return jsonify({"error": {"message": "Internal server error (mock)",
+                                      "type": "server_error", "code": None}}), 500
+        return None
+
+    def _prepare(prompt: str):
+        state.count("requests")
+        content = render_reply(prompt, state.random())
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = state.config.completion_tokens or count_tokens(content)
+        state.count("prompt_tokens", prompt_tokens)
+        state.count("completion_tokens", completion_tokens)
+        return content, prompt_tokens, completion_tokens
+
+    def _decode_time(completion_tokens: int) -> float:
+        return state.config.ms_per_token * completion_tokens / 1000.0
+
+    @app.get("/v1/models")
+    def models():
+        return jsonify({"object": "list", "data": [
+            {"id": m, "object": "model", "created": 0, "owned_by": "mock"}
+            for m in ("gpt-4.1-mini", "gpt-4o-mini", "gpt-4-turbo-mini")
+        ]})
+
+    @app.post("/v1/chat/completions")
+    def chat_completions():
+        body = request.get_json(force=True, silent=True) or {}
+        failed = _fail_or_none()
+        if failed is not None:
+            state.count("requests")
+            return failed
+        content, p_tok, c_tok = _prepare(_prompt_text(body.get("messages")))
+        model = body.get("model", "gpt-4.1-mini")
+        cid = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        usage = {"prompt_tokens": p_tok, "completion_tokens": c_tok, "total_tokens": p_tok + c_tok}
+
+        if body.get("stream"):
+            state.count("streams")
+            return Response(_stream_chat(cid, created, model, content, c_tok, usage,
+                                         body.get("stream_options") or {}),
+                            mimetype="text/event-stream")
+
+        time.sleep(state.sample_latency() + _decode_time(c_tok))
+        return jsonify({
+            "id": cid, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": usage,
+        })
+
+    def _stream_chat(cid, created, model, content, c_tok, usage, stream_options):
+        def chunk(delta, finish=None, with_usage=None):
+            payload = {"id": cid, "object": "chat.completion.chunk", "created": created,
+                       "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            if with_usage is not None:
+                payload["choices"] = []
+                payload["usage"] = with_usage
+            return f"data: {json.dumps(payload)}\n\n"
+
+        time.sleep(state.sample_latency())
+        yield chunk({"role": "assistant", "content": ""})
+        # emit ~4 characters per "token", paced by ms_per_token
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)] or [""]
+        pause = _decode_time(c_tok) / len(pieces)
+        for piece in pieces:
+            if pause:
+                time.sleep(pause)
+            yield chunk({"content": piece})
+        yield chunk({}, finish="stop")
+        if stream_options.get("include_usage"):
+            yield chunk({}, with_usage=usage)
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/responses")
+    def responses():
+        body = request.get_json(force=True, silent=True) or {}
+        failed = _fail_or_none()
+        if failed is not None:
+            state.count("requests")
+            return failed
+        inp = body.get("input")
+        prompt = inp if isinstance(inp, str) else _prompt_text(inp)
+        if body.get("instructions"):
+            prompt = body["instructions"] + "\n" + prompt
+        content, p_tok, c_tok = _prepare(prompt)
+        time.sleep(state.sample_latency() + _decode_time(c_tok))
+        return jsonify({
+            "id": f"resp_{uuid.uuid4().hex[:24]}", "object": "response",
+            "created_at": int(time.time()), "model": body.get("model", "gpt-4.1-mini"),
+            "status": "completed", "parallel_tool_calls": True, "tool_choice": "auto",
+            "tools": [], "output": [{
+                "type": "message", "id": f"msg_{uuid.uuid4().hex[:24]}", "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": content, "annotations": []}],
+            }],
+            "usage": {"input_tokens": p_tok, "output_tokens": c_tok,
+                      "total_tokens": p_tok + c_tok,
+                      "input_tokens_details": {"cached_tokens": 0},
+                      "output_tokens_details": {"reasoning_tokens": 0}},
+        })
+
+    @app.route("/_mock/config", methods=["GET", "POST"])
+    def mock_config():
+        if request.method == "POST":
+            updates = request.get_json(force=True, silent=True) or {}
+            try:
+                for k, v in updates.items():
+                    if k in _CASTS:
+                        setattr(state.config, k, _CASTS[k](v))
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": str(e)}), 400
+        return jsonify(asdict(state.config))
+
+    @app.get("/_mock/stats")
+    def mock_stats():
+        with state.lock:
+            return jsonify(dict(state.stats))
+
+    return app
+
+
+def parse_args():
+    d = MockConfig()
+    ap = argparse.ArgumentParser(description="Mock OpenAI-compatible server for offline benchmarks.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--latency-ms", type=float, default=d.latency_ms,
+                    help="median time to first token in ms")
+    ap.add_argument("--jitter", type=float, default=d.jitter,
+                    help="spread: sigma for lognormal, relative stddev/half-range otherwise")
+    ap.add_argument("--latency-dist", choices=LATENCY_DISTS, default=d.latency_dist)
+    ap.add_argument("--ms-per-token", type=float, default=d.ms_per_token,
+                    help="extra decode latency per completion token")
+    ap.add_argument("--error-rate", type=float, default=d.error_rate,
+                    help="fraction of requests answered with HTTP 500")
+    ap.add_argument("--rate-limit-rate", type=float, default=d.rate_limit_rate,
+                    help="fraction of requests answered with HTTP 429")
+    ap.add_argument("--completion-tokens", type=int, default=d.completion_tokens,
+                    help="completion tokens to report (0 = count the reply)")
+    ap.add_argument("--seed", type=int, default=None)
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = MockConfig(
+        latency_ms=args.latency_ms, jitter=args.jitter, latency_dist=args.latency_dist,
+        ms_per_token=args.ms_per_token, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, completion_tokens=args.completion_tokens,
+        seed=args.seed,
+    )
+    print(f"Mock LLM server on http://{args.host}:{args.port}/v1  {asdict(config)}")
+    create_app(config).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
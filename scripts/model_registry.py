@@ -0,0 +1,306 @@
+"""
+Versioned model registry with background loading and atomic hot-swap.
+
+data/models.json (MECC_MODEL_MANIFEST) maps a model name to a spec with at
+least a "version" plus whatever its loader needs, e.g.
+
+    {
+      "cv_classifier": {"version": "train7",
+                        "path": "runs/classify/train7/weights/best.pt",
+                        "runtime": "torch"},
+      "embedder":      {"version": "minilm-l6-v2",
+                        "model": "sentence-transformers/all-MiniLM-L6-v2",
+                        "index": "data/rag_faiss_index"}
+    }
+
+Each model lives in a ModelSlot. Requests use the model through
+slot.acquire(), which pins the active version for the duration of the
+request. reload() loads changed specs on a background thread, runs the
+slot's warm-up (and any prepare hooks, e.g. rebuilding caches that depend
+on the model) on the new model, then swaps it in atomically. The old model
+is released once the last request holding it finishes. A failed load
+leaves the active model untouched.
+
+Names missing from the manifest fall back to the slot's default spec
+(built from the existing env vars), so the manifest is optional.
+"""
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+# Add project root to Python path (for utils.pools)
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from utils.pools import ForkSafePool
+
+MANIFEST_PATH = Path(os.environ.get("MECC_MODEL_MANIFEST") or BASE_DIR / "data" / "models.json")
+
+
+def resolve_path(p: str) -> Path:
+    """Manifest paths are relative to the project root."""
+    path = Path(p)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+class _Loaded:
+    def __init__(self, spec: dict, model: Any):
+        self.spec = spec
+        self.model = model
+        self.refs = 0
+        self.loaded_at = time.time()
+        self.retired = False
+
+    @property
+    def version(self) -> str:
+        return str(self.spec.get("version"))
+
+
+class ModelSlot:
+    """
+    One named model: the active version, a pending load and retired
+    versions still serving in-flight requests.
+
+    loader(spec) -> model; warm_up(model) runs one inference before the
+    model is swapped in; prepare hooks (model, spec) run after warm-up and
+    on_swap hooks (spec) right after the swap.
+    """
+
+    def __init__(self, name: str, loader: Callable[[dict], Any],
+                 default_spec: Callable[[], dict],
+                 warm_up: Optional[Callable[[Any], None]] = None,
+                 release: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.loader = loader
+        self.default_spec = default_spec
+        self.warm_up = warm_up
+        self.release = release
+        self.lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._active: Optional[_Loaded] = None
+        self._retired: List[_Loaded] = []
+        self._prepare: List[Callable[[Any, dict], None]] = []
+        self._on_swap: List[Callable[[dict], None]] = []
+        self.pending: Optional[dict] = None
+        self.swaps = 0
+        self.spec_source: Callable[[str], Optional[dict]] = lambda name: None
+
+    def _after_fork(self):
+        # the loader thread didn't survive the fork; a load it was running never finishes here
+        self.lock, self._load_lock = threading.Lock(), threading.Lock()
+        if self.pending and self.pending.get("state") == "loading":
+            self.pending = None
+
+    def add_prepare(self, fn: Callable[[Any, dict], None]):
+        self._prepare.append(fn)
+
+    def on_swap(self, fn: Callable[[dict], None]):
+        self._on_swap.append(fn)
+
+    # ---- loading ----
+    def _build(self, spec: dict) -> _Loaded:
+        model = self.loader(spec)
+        if self.warm_up is not None:
+            self.warm_up(model)
+        for fn in self._prepare:
+            fn(model, spec)
+        return _Loaded(spec, model)
+
+    def _swap(self, new: _Loaded):
+        with self.lock:
+            old, self._active = self._active, new
+            self.swaps += 1
+            if old is not None:
+                old.retired = True
+                if old.refs == 0:
+                    self._free(old)
+                else:
+                    self._retired.append(old)
+        for fn in self._on_swap:
+            fn(new.spec)
+        print(f"[models] {self.name}: now serving {new.version}"
+              + (f" (was {old.version})" if old is not None else ""))
+
+    def _free(self, loaded: _Loaded):
+        # called with self.lock held
+        if self.release is not None:
+            try:
+                self.release(loaded.model)
+            except Exception as e:
+                print(f"[models] {self.name}: releasing {loaded.version} failed:", e)
+        loaded.model = None
+        gc.collect()
+
+    def load(self, spec: dict, executor: ForkSafePool) -> Future:
+        """Load spec in the background and swap it in once warm."""
+        with self.lock:
+            self.pending = {"version": spec.get("version"), "state": "loading",
+                            "started": time.time()}
+
+        def run():
+            with self._load_lock:
+                try:
+                    new = self._build(spec)
+                except Exception as e:
+                    with self.lock:
+                        self.pending = {**self.pending, "state": "failed", "error": str(e)}
+                    print(f"[models] {self.name}: loading {spec.get('version')} failed:", e)
+                    raise
+                self._swap(new)
+                with self.lock:
+                    self.pending = None
+                return new.version
+
+        return executor.submit(run)
+
+    def _ensure_loaded(self):
+        """First use: load synchronously (no model to serve in the meantime)."""
+        with self._load_lock:
+            if self._active is None:
+                self._swap(self._build(self.spec_source(self.name) or self.default_spec()))
+
+    # ---- use ----
+    @contextmanager
+    def acquire(self):
+        """Pin the active model for one request."""
+        if self._active is None:
+            self._ensure_loaded()
+        with self.lock:
+            loaded = self._active
+            loaded.refs += 1
+        try:
+            yield loaded.model
+        finally:
+            with self.lock:
+                loaded.refs -= 1
+                if loaded.retired and loaded.refs == 0 and loaded in self._retired:
+                    self._retired.remove(loaded)
+                    self._free(loaded)
+
+    def current(self) -> Any:
+        """Active model without pinning it (metadata such as class names)."""
+        if self._active is None:
+            self._ensure_loaded()
+        return self._active.model
+
+    @property
+    def spec(self) -> Optional[dict]:
+        active = self._active
+        return active.spec if active is not None else None
+
+    @property
+    def version(self) -> Optional[str]:
+        active = self._active
+        return active.version if active is not None else None
+
+    def info(self) -> dict:
+        with self.lock:
+            active = self._active
+            return {
+                "version": active.version if active else None,
+                "spec": active.spec if active else None,
+                "loaded_at": active.loaded_at if active else None,
+                "in_flight": active.refs if active else 0,
+                "pending": dict(self.pending) if self.pending else None,
+                "draining": [{"version": r.version, "in_flight": r.refs} for r in self._retired],
+                "swaps": self.swaps,
+            }
+
+
+class ModelRegistry:
+    def __init__(self, manifest_path: Path = MANIFEST_PATH):
+        self.manifest_path = Path(manifest_path)
+        self.slots: Dict[str, ModelSlot] = {}
+        self._executor = ForkSafePool(1, thread_name_prefix="model-loader")
+        self._watcher: Optional[threading.Thread] = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """
+        A forked worker keeps the loaded models (shared copy-on-write) but
+        gets its own loader thread (ForkSafePool); watch() has to be called
+        again in it.
+        """
+        self._watcher = None
+        for slot in self.slots.values():
+            slot._after_fork()
+
+    def register(self, slot: ModelSlot) -> ModelSlot:
+        slot.spec_source = self.spec_for
+        self.slots[slot.name] = slot
+        return slot
+
+    def manifest(self) -> dict:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def spec_for(self, name: str) -> Optional[dict]:
+        return self.manifest().get(name)
+
+    def load(self, name: str, spec: dict) -> Future:
+        if name not in self.slots:
+            raise KeyError(f"unknown model {name!r} (registered: {sorted(self.slots)})")
+        if not spec.get("version"):
+            raise ValueError("spec needs a version")
+        return self.slots[name].load(spec, self._executor)
+
+    def reload(self) -> Dict[str, str]:
+        """Re-read the manifest; start background loads for changed specs."""
+        manifest = self.manifest()
+        out = {}
+        for name, slot in self.slots.items():
+            spec = manifest.get(name)
+            if spec is None or slot._active is None or spec == slot.spec:
+                # not in the manifest, never used yet (loads lazily) or unchanged
+                out[name] = "unchanged"
+                continue
+            if slot.pending and slot.pending.get("state") == "loading" \
+                    and slot.pending.get("version") == spec.get("version"):
+                out[name] = "loading"
+                continue
+            self.load(name, spec)
+            out[name] = "loading"
+        return out
+
+    def versions(self) -> Dict[str, Optional[str]]:
+        return {name: slot.version for name, slot in self.slots.items()}
+
+    def info(self) -> dict:
+        return {"manifest": str(self.manifest_path),
+                "models": {name: slot.info() for name, slot in self.slots.items()}}
+
+    def watch(self, interval_s: float):
+        """Poll the manifest and reload() when it changes."""
+        if self._watcher is not None or interval_s <= 0:
+            return
+
+        def loop():
+            last = None
+            while True:
+                try:
+                    mtime = self.manifest_path.stat().st_mtime
+                except OSError:
+                    mtime = None
+                if last is not None and mtime != last:
+                    try:
+                        print("[models] manifest changed:", self.reload())
+                    except Exception as e:
+                        print("[models] reload failed:", e)
+                last = mtime
+                time.sleep(interval_s)
+
+        self._watcher = threading.Thread(target=loop, name="model-manifest-watch", daemon=True)
+        self._watcher.start()
+
+
+REGISTRY = ModelRegistry()
@@ -1,6 +1,12 @@
 from pathlib import Path
-import pdfplumber
-import re, json
+import re, json, sys
+
+# Add project root to Python path (for utils.pdf)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.pdf import extract_text
 
 
 # 1-based page number where Section 3 starts in your PDF
@@ -9,12 +15,7 @@ START_PAGE = 16
 
 def read_api_text(pdf_path: Path) -> str:
     """Read API-571 text starting from page 16 (skip TOC, preface, etc.)."""
-    pages = []
-    with pdfplumber.open(str(pdf_path)) as pdf:
-        # pdfplumber is 0-based, so START_PAGE-1
-        for p in pdf.pages[START_PAGE - 1 :]:
-            pages.append(p.extract_text() or "")
-    return "\n".join(pages)
+    return extract_text(pdf_path, sep="\n", start_page=START_PAGE)
 
 
 # Match any heading 3.x or 3.x.y at the start of a line
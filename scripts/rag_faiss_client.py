@@ -1,24 +1,66 @@
+import sys
 from pathlib import Path
-from typing import List, Tuple
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
 
 from langchain_huggingface import HuggingFaceEmbeddings 
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 
-
+from model_registry import REGISTRY, ModelSlot, resolve_path
 
 BASE_DIR = Path(__file__).resolve().parents[1]
+# Add project root to Python path (for utils.metrics)
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from utils.metrics import span
+
 INDEX_DIR = BASE_DIR / "data" / "rag_faiss_index"
 
+# default; the "embedder" entry of data/models.json can swap in another
+# model together with the index built from it
 EMB_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-_embedding = HuggingFaceEmbeddings(model_name = EMB_MODEL_NAME)
-_vectorstore = FAISS.load_local(
-    str(INDEX_DIR),
-    embeddings=_embedding,
-    allow_dangerous_deserialization=True,
 
-)
+def _default_spec() -> dict:
+    return {"version": "minilm-l6-v2", "model": EMB_MODEL_NAME, "index": str(INDEX_DIR)}
+
+
+def _load_embedder(spec: dict) -> SimpleNamespace:
+    """Embedding model + the FAISS index built with it; they only swap together."""
+    embedding = HuggingFaceEmbeddings(model_name=spec["model"])
+    vectorstore = FAISS.load_local(
+        str(resolve_path(spec.get("index") or INDEX_DIR)),
+        embeddings=embedding,
+        allow_dangerous_deserialization=True,
+    )
+    return SimpleNamespace(embedding=embedding, vectorstore=vectorstore,
+                           model_name=spec["model"], version=str(spec["version"]))
+
+
+def _warm(bundle: SimpleNamespace):
+    bundle.vectorstore.similarity_search_with_score("warm up", k=1)
+
+
+EMBEDDER = REGISTRY.register(ModelSlot(
+    "embedder", loader=_load_embedder, default_spec=_default_spec, warm_up=_warm,
+))
+
+
+def get_embedding() -> HuggingFaceEmbeddings:
+    """The embedding model the active index was built with (shared, loaded once)."""
+    return EMBEDDER.current().embedding
+
+
+def embed_query(text: str, bundle: Optional[SimpleNamespace] = None) -> List[float]:
+    """Embed with the given embedder (pinned by the caller) or the active one."""
+    if bundle is None:
+        with EMBEDDER.acquire() as bundle:
+            return embed_query(text, bundle)
+    with span("embed_query"):
+        return bundle.embedding.embed_query(text)
+
 
 def get_rag_evidence(query: str, k: int = 8) -> Tuple[List[Document], List[Document]]:
     """
@@ -26,8 +68,28 @@ def get_rag_evidence(query: str, k: int = 8) -> Tuple[List[Document], List[Docum
     Returns (hb_docs, case_docs).
     """
 
-    docs_scores = _vectorstore.similarity_search_with_score(query, k=k)
+    with EMBEDDER.acquire() as bundle:
+        # embed and search separately so each shows up as its own stage
+        vector = embed_query(query, bundle)
+        return get_rag_evidence_by_vector(vector, k, bundle)
+
+
+def get_rag_evidence_by_vector(vector: List[float], k: int = 8,
+                               bundle: Optional[SimpleNamespace] = None
+                               ) -> Tuple[List[Document], List[Document]]:
+    """
+    Same as get_rag_evidence for an already-embedded query (no embedding
+    call). Pass the bundle that embedded the query so both use one version.
+    """
+    if bundle is None:
+        with EMBEDDER.acquire() as bundle:
+            return get_rag_evidence_by_vector(vector, k, bundle)
+    with span("faiss_search"):
+        docs_scores = bundle.vectorstore.similarity_search_with_score_by_vector(list(vector), k=k)
+    return _split_by_source(docs_scores)
+
 
+def _split_by_source(docs_scores) -> Tuple[List[Document], List[Document]]:
     hb_docs: List[Document] = []
     case_docs: List[Document] = []
 
@@ -0,0 +1,255 @@
+import bisect
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+
+# Canonical section keys and the headings that open them (in UPPERCASE)
+SECTION_HEADINGS = {
+    "executive_summary": [
+        r"EXECUTIVE SUMMARY",
+        r"SUMMARY",
+        r"ABSTRACT",
+    ],
+    "incident_description": [
+        r"INCIDENT DESCRIPTION",
+        r"DESCRIPTION OF INCIDENT",
+        r"DESCRIPTION OF THE INCIDENT",
+        r"ACCIDENT DESCRIPTION",
+        r"BACKGROUND OF THE INCIDENT",
+    ],
+    "technical_analysis": [
+        r"TECHNICAL ANALYSIS",
+        r"TECHNICAL DISCUSSION",
+        r"CAUSE ANALYSIS",
+        r"ANALYSIS",
+    ],
+    "safety_issues": [
+        r"SAFETY ISSUES",
+        r"SAFETY MANAGEMENT",
+        r"CONTRIBUTING FACTORS",
+        r"CAUSAL FACTORS",
+        r"ROOT CAUSES",
+    ],
+    "recommendations": [
+        r"RECOMMENDATIONS",
+        r"SAFETY RECOMMENDATIONS",
+        r"CORRECTIVE ACTIONS",
+        r"PREVENTIVE ACTIONS",
+        r"PREVENTION MEASURES",
+    ],
+    "key_lessons": [
+        r"KEY LESSONS",
+        r"LESSONS LEARNED",
+        r"KEY LESSONS FOR THE INDUSTRY",
+        r"KEY LESSONS FOR INDUSTRY",
+        r"KEY LESSONS FOR THE PETROLEUM INDUSTRY",
+    ],
+}
+
+# heading text (single-spaced, uppercase) -> section key
+_HEADING_TO_KEY = {
+    pat: key for key, pats in SECTION_HEADINGS.items() for pat in pats
+}
+
+
+def _heading_alternation() -> str:
+    # longest first so "KEY LESSONS FOR THE INDUSTRY" wins over "KEY LESSONS"
+    pats = sorted(_HEADING_TO_KEY, key=len, reverse=True)
+    return "|".join(r"[ \t]+".join(map(re.escape, p.split())) for p in pats)
+
+
+# One matcher for every heading, anchored to a whole line:
+#   "EXECUTIVE SUMMARY", "3 Technical Analysis", "6.2 RECOMMENDATIONS"
+# TOC entries ("EXECUTIVE SUMMARY ...... 8") and prose mentions never match
+# because nothing but whitespace may follow the heading on its line. The
+# pattern ignores case; _is_heading_case() then rejects lowercase matches,
+# which are wrapped prose or table cells ("safety management").
+# The leading literal newline lets the regex engine jump between line starts
+# instead of trying the pattern at every character; the text is searched
+# with a "\n" prepended so the first line is covered too.
+_HEADING_RE = re.compile(
+    r"\n[ \t]*(?:(?P<number>\d+(?:\.\d+)*)\.?[ \t]+)?(?P<heading>" + _heading_alternation() + r")[ \t]*(?=\n|\Z)",
+    re.IGNORECASE,
+)
+
+# Pages are joined with a blank line by the PDF extractors
+_PAGE_BREAK_RE = re.compile(r"\n[ \t]*\n")
+
+# small words left lowercase in title-case headings ("Key Lessons for the Industry")
+_MINOR_WORDS = {"a", "and", "for", "in", "of", "on", "the", "to"}
+
+# Chapter headings in "N.0 Title" numbering ("2.0 Introduction") and appendix
+# headings ("APPENDIX A—CALCULATIONS"); they end the section before them even
+# when they open no canonical section
+_CHAPTER_RE = re.compile(
+    r"\n[ \t]*(?:\d+\.0[ \t]+|(?=(?:Appendix|APPENDIX)[ \t]+[A-Z]\b))"
+    r"(?P<heading>[A-Z][^\n]{2,80}?)[ \t]*(?=\n|\Z)"
+)
+
+
+def _is_heading_case(heading: str) -> bool:
+    """UPPERCASE or Title Case; anything else is a line of running text."""
+    if heading.isupper():
+        return True
+    words = heading.split()
+    return words[0][0].isupper() and all(
+        not w[0].islower() or w in _MINOR_WORDS for w in words[1:])
+
+
+def _heading_depth(number: Optional[str]) -> int:
+    """1 for chapter headings ("8", "8.0", unnumbered), 2 for "1.6", and so on."""
+    if not number:
+        return 1
+    parts = number.split(".")
+    while len(parts) > 1 and parts[-1].strip("0") == "":
+        parts.pop()
+    return len(parts)
+
+
+_TOC_TITLE_RE = re.compile(r"^[ \t]*(?:TABLE OF )?CONTENTS[ \t]*$", re.IGNORECASE | re.MULTILINE)
+_TOC_ENTRY_RE = re.compile(r"(?:\.[ \t]*){4,}\d+[ \t]*$", re.MULTILINE)
+TOC_MIN_ENTRIES = 3
+
+
+@dataclass
+class Section:
+    key: str
+    heading: str
+    start: int          # offset of the heading line
+    body_start: int     # offset just after the heading line
+    end: int            # offset of the next section heading (or end of text)
+    page_start: int     # 1-based
+    page_end: int
+    text: str = ""
+
+
+@dataclass
+class Segmentation:
+    text: str
+    page_starts: List[int]
+    toc_pages: Set[int] = field(default_factory=set)
+    sections: Dict[str, Section] = field(default_factory=dict)
+
+    @property
+    def num_pages(self) -> int:
+        return len(self.page_starts)
+
+    def page_at(self, offset: int) -> int:
+        """1-based page number containing a character offset."""
+        return bisect.bisect_right(self.page_starts, offset)
+
+    def section_texts(self) -> Dict[str, str]:
+        """{ section_key: section_text } for every key; missing sections get ""."""
+        return {
+            key: (self.sections[key].text if key in self.sections else "")
+            for key in SECTION_HEADINGS
+        }
+
+    def locate(self, snippet: str, section: Optional[Section] = None) -> Tuple[int, int]:
+        """
+        Return (page_start, page_end) for a chunk of text taken from the report.
+
+        Chunkers re-join sentences with single spaces, so the chunk's first and
+        last few words are matched whitespace-insensitively. Falls back to the
+        section's page range (or page 1) when the chunk can't be found.
+        """
+        lo = section.body_start if section else 0
+        hi = section.end if section else len(self.text)
+        fallback = (section.page_start, section.page_end) if section else (1, 1)
+
+        words = snippet.split()
+        if not words:
+            return fallback
+
+        head = self._find_words(words[:8], lo, hi)
+        if head is None:
+            return fallback
+        tail = self._find_words(words[-8:], head.start(), hi)
+        end = tail.end() if tail else head.end()
+        return self.page_at(head.start()), self.page_at(max(end - 1, head.start()))
+
+    def _find_words(self, words: List[str], lo: int, hi: int):
+        pat = re.compile(r"\s+".join(map(re.escape, words)))
+        return pat.search(self.text, lo, hi)
+
+
+def page_starts_for(text: str) -> List[int]:
+    """Offsets at which each page begins in text joined with blank lines."""
+    return [0] + [m.end() for m in _PAGE_BREAK_RE.finditer(text)]
+
+
+def _is_toc_page(page_text: str) -> bool:
+    if _TOC_TITLE_RE.search(page_text):
+        return True
+    return len(_TOC_ENTRY_RE.findall(page_text)) >= TOC_MIN_ENTRIES
+
+
+def find_toc_pages(text: str, page_starts: List[int]) -> Set[int]:
+    toc = set()
+    bounds = page_starts + [len(text)]
+    for i in range(len(page_starts)):
+        if _is_toc_page(text[bounds[i]:bounds[i + 1]]):
+            toc.add(i + 1)
+    return toc
+
+
+def segment_report(text: str) -> Segmentation:
+    """
+    Split a full report into canonical sections in a single scan.
+
+    For each section key the shallowest heading wins (a chapter heading
+    such as "8.0 Recommendations" over the "1.6 Recommendations" summary
+    subsection), the earliest among equals; headings on table-of-contents
+    pages are ignored. Each section runs until the next section found or
+    the next "N.0" chapter heading, whichever comes first.
+    """
+    seg = Segmentation(text=text, page_starts=page_starts_for(text))
+    bounds = seg.page_starts + [len(text)]
+    checked: Dict[int, bool] = {}
+
+    def on_toc_page(page: int) -> bool:
+        # only pages that actually carry a heading candidate get inspected
+        if page not in checked:
+            checked[page] = _is_toc_page(text[bounds[page - 1]:bounds[page]])
+            if checked[page]:
+                seg.toc_pages.add(page)
+        return checked[page]
+
+    found: Dict[str, Tuple[int, int, str]] = {}
+    depths: Dict[str, int] = {}
+    for m in _HEADING_RE.finditer("\n" + text):
+        # offsets in the prefixed string are one ahead of the original text
+        start, heading_end = m.start(), m.end() - 1
+        heading = m.group("heading")
+        key = _HEADING_TO_KEY[" ".join(heading.upper().split())]
+        depth = _heading_depth(m.group("number"))
+        if depths.get(key, depth + 1) <= depth or not _is_heading_case(heading):
+            continue
+        if on_toc_page(seg.page_at(start)):
+            continue
+        found[key], depths[key] = (start, heading_end, heading), depth
+        if len(found) == len(SECTION_HEADINGS) and max(depths.values()) == 1:
+            break
+
+    chapters = [m.start() for m in _CHAPTER_RE.finditer("\n" + text)
+                if _is_heading_case(m.group("heading")) and not on_toc_page(seg.page_at(m.start()))]
+    ordered = sorted(found.items(), key=lambda kv: kv[1][0])
+    for i, (key, (start, heading_end, heading)) in enumerate(ordered):
+        end = ordered[i + 1][1][0] if i + 1 < len(ordered) else len(text)
+        nxt = bisect.bisect_right(chapters, start)
+        if nxt < len(chapters):
+            end = min(end, chapters[nxt])
+        body_start = min(heading_end + 1, end)
+        seg.sections[key] = Section(
+            key=key,
+            heading=heading,
+            start=start,
+            body_start=body_start,
+            end=end,
+            page_start=seg.page_at(start),
+            page_end=seg.page_at(max(end - 1, start)),
+            text=text[body_start:end].strip(),
+        )
+
+    return seg
@@ -0,0 +1,152 @@
+"""
+Checkpointing for LLM extraction runs.
+
+A run manifest is an append-only JSONL journal (one record per finished
+case or section) kept next to the outputs. Every record carries a run key
+built from (input text hash, prompt version, model name); on the next run,
+work whose key still matches and whose status is "done" is skipped, and
+only failed or missing pieces are sent to the LLM again. Appends are
+flushed and fsync'd, so a crash loses at most the call in flight.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_PARTIAL = "partial"  # case finished, but some sections fell back to raw text
+
+CASE = "__case__"  # section slot used for case-level records
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_version(label: str, *prompt_parts) -> str:
+    """
+    Version tag for a prompt set: a readable label plus a digest of the prompt
+    text, so editing a prompt invalidates earlier results automatically.
+    """
+    h = hashlib.sha256()
+    for part in prompt_parts:
+        h.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return f"{label}-{h.hexdigest()[:8]}"
+
+
+def run_key(input_hash: str, prompt_ver: str, model: str) -> str:
+    return hashlib.sha256(f"{input_hash}|{prompt_ver}|{model}".encode("utf-8")).hexdigest()[:24]
+
+
+def write_json_atomic(path: Path, data, **dump_kwargs):
+    """Write JSON to a temp file in the same directory, then rename over path."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class RunManifest:
+    """Status per case and per section, persisted as a JSONL journal."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        # (case_id, section) -> latest record
+        self.records: Dict[tuple, dict] = {}
+        self._load()
+        self._fh = self.path.open("a", encoding="utf-8")
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash
+                self.records[(rec["case_id"], rec.get("section", CASE))] = rec
+
+    def compact(self):
+        """Rewrite the journal keeping only the latest record per slot."""
+        with self.lock:
+            self._fh.close()
+            fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=f".{self.path.name}.")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for rec in self.records.values():
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._fh = self.path.open("a", encoding="utf-8")
+
+    def close(self):
+        with self.lock:
+            self._fh.close()
+
+    def _append(self, rec: dict):
+        with self.lock:
+            self.records[(rec["case_id"], rec.get("section", CASE))] = rec
+            self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    # ---- queries ----
+
+    def get(self, case_id: str, key: str, section: str = CASE) -> Optional[dict]:
+        """Latest record for a slot, or None if missing or from another run key."""
+        rec = self.records.get((case_id, section))
+        if rec is None or rec.get("key") != key:
+            return None
+        return rec
+
+    def case_done(self, case_id: str, key: str) -> bool:
+        rec = self.get(case_id, key)
+        return rec is not None and rec["status"] == STATUS_DONE
+
+    def section_output(self, case_id: str, key: str, section: str) -> Optional[str]:
+        """Output of a section that already finished under this run key."""
+        rec = self.get(case_id, key, section)
+        if rec is not None and rec["status"] == STATUS_DONE:
+            return rec.get("output", "")
+        return None
+
+    # ---- updates ----
+
+    def record_section(self, case_id: str, key: str, section: str, status: str,
+                       output: Optional[str] = None, error: Optional[str] = None):
+        rec = {"case_id": case_id, "section": section, "key": key, "status": status}
+        if output is not None:
+            rec["output"] = output
+        if error:
+            rec["error"] = error
+        self._append(rec)
+
+    def record_case(self, case_id: str, key: str, status: str, error: Optional[str] = None):
+        rec = {"case_id": case_id, "section": CASE, "key": key, "status": status}
+        if error:
+            rec["error"] = error
+        self._append(rec)
+
+    def summary(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for (_, section), rec in self.records.items():
+            if section == CASE:
+                counts[rec["status"]] = counts.get(rec["status"], 0) + 1
+        return counts
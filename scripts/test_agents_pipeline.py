@@ -10,11 +10,12 @@ if str(ROOT) not in sys.path:
 
 
 from rag_faiss_client import get_rag_evidence
-from api571_loader import get_mechanism_entry, get_mechanism_name
+from api571_loader import get_mechanism_name, get_mechanism_snippet
 
 from agents.reasoner import reasoner
 from agents.recommender import recommender
 from agents import Incident, SimilarCase
+from utils.llm_telemetry import TELEMETRY, print_report
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 
@@ -54,7 +55,7 @@ def docs_to_similar_cases(case_docs) -> List[SimilarCase]:
             id=md.get("case_id", f"case-{i}"),
             title=md.get("file_name", "unknown_case"),
             snippet=snippet,
-            mechanism=md.get("section", ""),      # if you have section per chunk
+            mechanism=md.get("mechanism"),        # section keys are not mechanisms
             similarity=1.0 / (1.0 + md.get("score", 0.0)),  # simple transform
         )
         sims.append(sim)
@@ -65,35 +66,10 @@ def add_api571_snip(handbook_snips: List[Dict], mech_id: str) -> List[Dict]:
     Wrap API571 mechanism entry as an extra 'handbook snippet',
     so we don't need to change the agents' signatures.
     """
-    entry = get_mechanism_entry(mech_id)
-    if not entry:
+    text = get_mechanism_snippet(mech_id)
+    if not text:
         return handbook_snips
 
-    # Build a compact text block from API571 fields
-    lines = []
-    name = entry.get("name", mech_id)
-    lines.append(f"API 571 mechanism {mech_id}: {name}")
-    desc = entry.get("description_of_damage") or entry.get("description") or ""
-    if desc:
-        lines.append(f"Description of damage: {desc}")
-    mat = entry.get("affected_materials") or ""
-    if mat:
-        lines.append(f"Affected materials: {mat}")
-    crit = entry.get("critical_factors") or ""
-    if crit:
-        lines.append(f"Critical factors: {crit}")
-    morph = entry.get("appearance_or_morphology_of_damage") or entry.get("appearance") or ""
-    if morph:
-        lines.append(f"Appearance / morphology: {morph}")
-    prev = entry.get("prevention_mitigation") or ""
-    if prev:
-        lines.append(f"Prevention / mitigation: {prev}")
-    insp = entry.get("inspection_monitoring") or ""
-    if insp:
-        lines.append(f"Inspection / monitoring: {insp}")
-
-    text = "\n".join(lines)
-
     api_snip = {
         "id": f"api571-{mech_id}",
         "source": "api571",
@@ -168,7 +144,10 @@ def main():
     )
 
     print("=== RecsOut ===")
-    print(recs_out)
+    print(recs_out, "\n")
+
+    print("=== LLM calls ===")
+    print_report(TELEMETRY.snapshot())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""
+Turn image-classifier output into evidence for the text pipeline.
+
+The classifier predicts a visible damage class (fatigue, erosion, rupture,
+wear, ...). Each class maps to a phrase that is blended into the RAG query
+vector and to mechanism names that lead the reasoner's candidate list.
+The hint phrases are embedded once per embedder version and cached, so
+steering retrieval by the photo costs a vector add, not another embedding
+call.
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag_faiss_client import EMBEDDER, embed_query, get_rag_evidence
+
+# (keyword in the class label, retrieval phrase, candidate mechanisms);
+# first match wins, so specific keywords go before generic ones
+DAMAGE_HINTS = [
+    ("thermal fatigue", "thermal fatigue cracking from cyclic temperature changes",
+     ["Thermal fatigue"]),
+    ("fretting", "fretting fatigue and fretting wear at contact surfaces",
+     ["Fretting fatigue", "Fatigue"]),
+    ("fatigue", "fatigue cracking under cyclic loading, beach marks, crack initiation at stress raisers",
+     ["Fatigue", "Vibration-induced fatigue"]),
+    ("hot crack", "hot cracking / solidification cracking in welds",
+     ["Hot cracking"]),
+    ("cavitation", "cavitation damage, pitting from collapsing vapour bubbles",
+     ["Cavitation", "Erosion-corrosion"]),
+    ("erosion", "erosion and erosion-corrosion, metal loss along the flow direction",
+     ["Erosion-corrosion", "Erosion"]),
+    ("wear", "abrasive and adhesive wear, wear debris, surface material loss",
+     ["Abrasive wear", "Adhesive wear"]),
+    ("brittle", "brittle fracture, flat fracture surface, low temperature or embrittlement",
+     ["Brittle fracture", "Embrittlement"]),
+    ("ductile", "ductile overload fracture with necking and shear lips",
+     ["Ductile overload"]),
+    ("rupture", "rupture from overpressure, overheating or creep (stress rupture)",
+     ["Stress rupture", "Creep", "Short-term overheating"]),
+    ("leak", "through-wall leak from pitting, cracking or wall thinning",
+     ["Pitting", "SCC"]),
+    ("corrosion", "corrosion, general wall loss and pitting",
+     ["CO2 corrosion", "Pitting", "MIC"]),
+    ("crack", "cracking: fatigue, stress corrosion or weld cracking",
+     ["Fatigue", "SCC"]),
+    ("fractur", "fracture of the component, overload or fatigue",
+     ["Fatigue", "Brittle fracture", "Ductile overload"]),
+]
+
+
+def damage_hint(label: str) -> Optional[dict]:
+    """{label, phrase, mechanisms} for a classifier label, or None if unmapped."""
+    low = (label or "").lower()
+    for keyword, phrase, mechanisms in DAMAGE_HINTS:
+        if keyword in low:
+            return {"label": label, "phrase": phrase, "mechanisms": list(mechanisms)}
+    return None
+
+
+def aggregate_predictions(preds: List[dict]) -> Optional[dict]:
+    """
+    Combine per-photo classify_image() results: mean probability per label
+    across photos (a label missing from a photo's top-k counts as 0).
+    """
+    if not preds:
+        return None
+    totals: Dict[str, float] = {}
+    for p in preds:
+        for item in p["topk"]:
+            totals[item["label"]] = totals.get(item["label"], 0.0) + item["prob"]
+    label, total = max(totals.items(), key=lambda kv: kv[1])
+    return {
+        "label": label,
+        "prob": round(total / len(preds), 4),
+        "photos": len(preds),
+        "per_photo": [p["top1"] for p in preds],
+    }
+
+
+_hint_vectors: Dict[Tuple[str, str], np.ndarray] = {}
+_hint_lock = threading.Lock()
+
+
+def _hint_vector(phrase: str, bundle) -> np.ndarray:
+    key = (bundle.version, phrase)
+    vec = _hint_vectors.get(key)
+    if vec is None:
+        vec = _unit(np.asarray(embed_query(phrase, bundle), dtype=np.float32))
+        with _hint_lock:
+            _hint_vectors[key] = vec
+    return vec
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / max(float(np.linalg.norm(v)), 1e-12)
+
+
+def steer_query_vector(query_vec, hint: Optional[dict], weight: float, bundle) -> np.ndarray:
+    """
+    Text query vector nudged toward the photo's damage class (unit length).
+    bundle is the embedder that produced query_vec.
+    """
+    q = _unit(np.asarray(query_vec, dtype=np.float32))
+    if hint is None or weight <= 0:
+        return q
+    return _unit(q + weight * _hint_vector(hint["phrase"], bundle))
+
+
+def _embed_hints(bundle, spec=None):
+    for _, phrase, _ in DAMAGE_HINTS:
+        _hint_vector(phrase, bundle)
+
+
+def _drop_stale(spec: dict):
+    with _hint_lock:
+        for key in [k for k in _hint_vectors if k[0] != str(spec["version"])]:
+            del _hint_vectors[key]
+
+
+_label_cases: Dict[Tuple[str, str], List[dict]] = {}
+
+
+def cases_for_label(label: str, n: int = 3) -> List[dict]:
+    """Past cases retrieved for a damage class (cached per embedder version)."""
+    key = (EMBEDDER.version or "", label)
+    if key not in _label_cases:
+        hint = damage_hint(label)
+        _, case_docs = get_rag_evidence(hint["phrase"] if hint else label, k=2 * n + 2)
+        _label_cases[key] = [
+            {"id": (d.metadata or {}).get("case_id", ""),
+             "title": (d.metadata or {}).get("file_name", "unknown_case"),
+             "snippet": d.page_content[:300],
+             "similarity": round(1.0 / (1.0 + (d.metadata or {}).get("score", 0.0)), 4)}
+            for d in case_docs[:n]
+        ]
+    return _label_cases[key]
+
+
+def _drop_stale_cases(spec: dict):
+    for key in [k for k in _label_cases if k[0] != str(spec["version"])]:
+        _label_cases.pop(key, None)
+
+
+EMBEDDER.add_prepare(_embed_hints)
+EMBEDDER.on_swap(_drop_stale)
+EMBEDDER.on_swap(_drop_stale_cases)
+
+
+def warm_up():
+    """Embed every hint phrase ahead of the first joint request."""
+    with EMBEDDER.acquire() as bundle:
+        _embed_hints(bundle)
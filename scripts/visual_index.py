@@ -0,0 +1,266 @@
+"""
+Visual nearest-neighbour index over the labeled failure-image archive.
+
+Every archive image is embedded with the classifier's backbone (pooled
+features before the head, see cv_classifier.embed_images) into one
+L2-normalized float32 matrix, so a query is one forward pass plus one
+matrix-vector product.
+
+    python scripts/visual_index.py                      # index MECC_CV_ARCHIVE
+    python scripts/visual_index.py --root /path/to/my_dataset --batch 32
+    python scripts/visual_index.py --query photo.jpg --k 5
+
+The index lives in data/visual_index.npz (MECC_VISUAL_INDEX) together with
+each image's path, label and content hash. Rebuilding is incremental:
+images whose content hash is already indexed keep their vectors, only new
+or changed files are embedded, and deleted files are dropped. The index is
+keyed on cv_classifier.model_key() (version and runtime); a different key
+forces a full rebuild (features are not comparable). Embedding needs the
+PyTorch runtime: with an ONNX/OpenVINO model active, build and lookup are
+refused, since those exports only return class probabilities.
+
+Labels come from the class folder (train/<class>/img.jpg, the layout the
+notebook trains from) or, for flat folders such as runs/classify/predict,
+from the file name after the "ImageNNN_" prefix.
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+# Add project root to Python path (for utils.pdf)
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from classify_images import find_images, load_for_model
+from cv_classifier import CV_MODEL, decode_image, embed_images, model_key
+from utils.pdf import file_hash
+
+ARCHIVE_DIR = Path(os.environ.get("MECC_CV_ARCHIVE") or BASE_DIR / "runs" / "classify" / "predict")
+INDEX_PATH = Path(os.environ.get("MECC_VISUAL_INDEX") or BASE_DIR / "data" / "visual_index.npz")
+
+_PREFIX = re.compile(r"^image\s*\d+[_\s-]*", re.IGNORECASE)
+
+
+def label_for(path: Path, root: Path) -> str:
+    if path.parent != root:
+        return path.parent.name
+    return _PREFIX.sub("", path.stem).replace("_", " ").strip() or path.stem
+
+
+class VisualIndex:
+    """Normalized feature matrix + per-row path/label/hash."""
+
+    def __init__(self, matrix: Optional[np.ndarray] = None, paths=(), labels=(), hashes=(),
+                 root: str = "", model_version: str = ""):
+        self.matrix = matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32)
+        self.paths: List[str] = list(paths)
+        self.labels: List[str] = list(labels)
+        self.hashes: List[str] = list(hashes)
+        self.root = root
+        self.model_version = model_version
+
+    def __len__(self):
+        return len(self.paths)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH) -> "VisualIndex":
+        if not Path(path).exists():
+            return cls()
+        z = np.load(path, allow_pickle=False)
+        return cls(z["matrix"], z["paths"].tolist(), z["labels"].tolist(), z["hashes"].tolist(),
+                   str(z["root"]), str(z["model_version"]))
+
+    def save(self, path: Path = INDEX_PATH):
+        """Write to a temp file, then rename, so a serving process never reads half a file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        buf = io.BytesIO()
+        np.savez(buf, matrix=self.matrix, paths=np.array(self.paths), labels=np.array(self.labels),
+                 hashes=np.array(self.hashes), root=self.root, model_version=self.model_version)
+        tmp = path.with_suffix(".tmp.npz")
+        tmp.write_bytes(buf.getvalue())
+        os.replace(tmp, path)
+
+    def search(self, query: np.ndarray, k: int = 5) -> List[dict]:
+        if not len(self):
+            return []
+        scores = self.matrix @ query.astype(np.float32).reshape(-1)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{"path": self.paths[i], "label": self.labels[i], "score": round(float(scores[i]), 4)}
+                for i in top]
+
+
+def build_index(root: Path, embed_fn: Callable[[List[np.ndarray]], np.ndarray], model_version: str,
+                previous: Optional[VisualIndex] = None, batch: int = 16, workers: int = 0) -> tuple:
+    """(index, {"reused", "embedded", "removed", "unreadable"}), embedding only new content."""
+    root = root.resolve()
+    files = find_images(root)
+    hashes = [file_hash(p) for p in files]
+
+    old: Dict[str, np.ndarray] = {}
+    if previous is not None and len(previous) and previous.model_version == model_version:
+        old = {h: previous.matrix[i] for i, h in enumerate(previous.hashes)}
+    removed = len(set(old) - set(hashes))
+
+    # one embedding per distinct new content (copies share a vector)
+    first: Dict[str, int] = {}
+    for i, h in enumerate(hashes):
+        if h not in old:
+            first.setdefault(h, i)
+    todo = list(first.values())
+    new: Dict[str, np.ndarray] = {}
+    unreadable = set()
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers or max(1, (os.cpu_count() or 2) - 1)) as pool:
+            loaded = pool.map(load_for_model, [str(files[i]) for i in todo], chunksize=4)
+            chunk: List[tuple] = []
+            for i, (_, img, err) in zip(todo, loaded):
+                if img is None:
+                    print(f"  skip {files[i].name}: {err}")
+                    unreadable.add(i)
+                    continue
+                chunk.append((hashes[i], img))
+                if len(chunk) >= batch:
+                    for (h, _), v in zip(chunk, embed_fn([img for _, img in chunk])):
+                        new[h] = v
+                    chunk = []
+                    print(f"  embedded {len(new)}/{len(todo)}", end="\r", flush=True)
+            if chunk:
+                for (h, _), v in zip(chunk, embed_fn([img for _, img in chunk])):
+                    new[h] = v
+
+    bad = {hashes[i] for i in unreadable}
+    unreadable = {i for i, h in enumerate(hashes) if h in bad}
+    keep = [i for i in range(len(files)) if i not in unreadable]
+    vectors = [old.get(hashes[i], new.get(hashes[i])) for i in keep]
+    matrix = np.stack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+    index = VisualIndex(
+        matrix,
+        [files[i].relative_to(root).as_posix() for i in keep],
+        [label_for(files[i], root) for i in keep],
+        [hashes[i] for i in keep],
+        str(root), model_version,
+    )
+    stats = {"reused": sum(1 for i in keep if hashes[i] in old), "embedded": len(new),
+             "unreadable": len(unreadable), "removed": removed}
+    return index, stats
+
+
+# ---- serving ----
+_index: Optional[VisualIndex] = None
+_index_mtime: Optional[float] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> VisualIndex:
+    """The saved index, re-read when a rebuild replaced the file."""
+    global _index, _index_mtime
+    try:
+        mtime = INDEX_PATH.stat().st_mtime
+    except OSError:
+        mtime = None
+    if _index is None or mtime != _index_mtime:
+        with _index_lock:
+            if _index is None or mtime != _index_mtime:
+                _index, _index_mtime = VisualIndex.load(INDEX_PATH), mtime
+    return _index
+
+
+class IndexUnavailable(RuntimeError):
+    """No index yet, built with a different classifier, or no PyTorch model to embed with."""
+
+
+def embedding_key() -> str:
+    """model_key() of the active classifier, if it can produce embeddings."""
+    key = model_key()
+    if not key.endswith(":torch"):
+        raise IndexUnavailable(f"active CV model {key} is not a PyTorch model; "
+                               "image embeddings need the .pt runtime")
+    return key
+
+
+def similar_images(image: np.ndarray, k: int = 5) -> dict:
+    index = get_index()
+    if not len(index):
+        raise IndexUnavailable(f"visual index is empty; run scripts/visual_index.py ({INDEX_PATH})")
+    with CV_MODEL.acquire() as model:
+        version = embedding_key()
+        if index.model_version != version:
+            raise IndexUnavailable(f"visual index built with {index.model_version}, active model is "
+                                   f"{version}; rebuild with scripts/visual_index.py")
+        t0 = time.perf_counter()
+        q = embed_images([image], model=model)[0]
+    t1 = time.perf_counter()
+    hits = index.search(q, k)
+    t2 = time.perf_counter()
+    return {
+        "results": hits,
+        "index_size": len(index),
+        "model_version": version,
+        "embed_ms": round((t1 - t0) * 1000, 1),
+        "search_ms": round((t2 - t1) * 1000, 2),
+    }
+
+
+def archive_file(rel: str) -> Optional[Path]:
+    """Absolute path of an indexed image, or None if rel is not in the index."""
+    index = get_index()
+    if rel not in set(index.paths):
+        return None
+    return Path(index.root) / rel
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Build or query the visual similarity index.")
+    ap.add_argument("--root", default=str(ARCHIVE_DIR), help="labeled image archive")
+    ap.add_argument("--out", default=str(INDEX_PATH))
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--workers", type=int, default=0, help="decode processes (0 = cpus - 1)")
+    ap.add_argument("--full", action="store_true", help="ignore the existing index")
+    ap.add_argument("--query", default="", help="image to look up instead of building")
+    ap.add_argument("--k", type=int, default=5)
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    out = Path(args.out)
+
+    try:
+        version = embedding_key()
+    except IndexUnavailable as e:
+        raise SystemExit(str(e))
+
+    if args.query:
+        index = VisualIndex.load(out)
+        q = embed_images([decode_image(Path(args.query).read_bytes())])[0]
+        t0 = time.perf_counter()
+        hits = index.search(q, args.k)
+        print(f"{len(index)} images, search {(time.perf_counter() - t0) * 1000:.2f} ms")
+        for h in hits:
+            print(f"  {h['score']:.3f}  {h['label']:<24s} {h['path']}")
+        return
+
+    previous = None if args.full else VisualIndex.load(out)
+    t0 = time.perf_counter()
+    index, stats = build_index(Path(args.root), embed_images, version, previous,
+                               batch=args.batch, workers=args.workers)
+    index.save(out)
+    print(f"\n{len(index)} images indexed in {time.perf_counter() - t0:.1f}s ({stats}), "
+          f"model {version} -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Memory of a gunicorn master and its workers, from /proc (Linux only).
+
+    python scripts/worker_memory.py                    # pid from data/gunicorn.pid
+    python scripts/worker_memory.py --pid 12345 --out data/telemetry/rss_preload.json
+
+Per process: RSS, PSS, shared and private pages (MB). RSS counts a shared
+page in every process that maps it, PSS divides it between them, so the
+PSS total is the real footprint and the gap between the RSS and PSS totals
+is what copy-on-write sharing saves. See gunicorn.conf.py for how to
+compare preloaded and per-worker loading.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+PIDFILE = ROOT / "data" / "gunicorn.pid"
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def smaps_rollup(pid: int) -> Dict[str, float]:
+    """FIELDS in MB for one process."""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in FIELDS:
+                out[key] = int(rest.split()[0]) / 1024  # kB
+    return out
+
+
+def children(pid: int) -> List[int]:
+    kids = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        text = (task / "children").read_text().split()
+        kids += [int(x) for x in text]
+    return sorted(kids)
+
+
+def measure(master: int) -> dict:
+    procs = [("master", master)] + [(f"worker {i}", pid) for i, pid in enumerate(children(master))]
+    rows = [{"role": role, "pid": pid, **smaps_rollup(pid)} for role, pid in procs]
+    return {
+        "ts": time.time(),
+        "processes": rows,
+        "total_rss_mb": round(sum(r["Rss"] for r in rows), 1),
+        "total_pss_mb": round(sum(r["Pss"] for r in rows), 1),
+    }
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="RSS/PSS of the gunicorn master and workers.")
+    ap.add_argument("--pid", type=int, default=0, help="master pid (default: read --pidfile)")
+    ap.add_argument("--pidfile", default=str(PIDFILE))
+    ap.add_argument("--out", default="", help="also write the measurement as JSON")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    pid = args.pid or int(Path(args.pidfile).read_text().strip())
+    m = measure(pid)
+
+    print(f"{'process':10s} {'pid':>7s} " + " ".join(f"{f:>13s}" for f in FIELDS))
+    for r in m["processes"]:
+        print(f"{r['role']:10s} {r['pid']:7d} " + " ".join(f"{r.get(f, 0):13.1f}" for f in FIELDS))
+    print(f"\ntotal RSS {m['total_rss_mb']:.1f} MB, total PSS {m['total_pss_mb']:.1f} MB "
+          f"(shared pages counted once: {m['total_rss_mb'] - m['total_pss_mb']:.1f} MB saved)")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(m, indent=2), encoding="utf-8")
+        print(f"-> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# utils/json_stream.py
+"""
+Incremental JSON parsing for streamed model output.
+
+JsonStreamParser is fed text chunks as they arrive and reports every value
+that has been fully received at a depth we care about, with its path:
+
+    p = JsonStreamParser(max_depth=2)
+    p.feed('{"mechanisms": [{"name": "MIC", ')   -> []
+    p.feed('"confidence": 0.8}, ')               -> [(("mechanisms", 0), {...})]
+
+Depth 1 paths are top-level members (("immediate",)); depth 2 paths are
+their items or members (("mechanisms", 0), ("recommendations", "monitoring")).
+Text before the first "{" (stray prose from the model) is ignored.
+"""
+import json
+from typing import Any, List, Optional, Tuple
+
+_WS = " \t\r\n"
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "expect_key", "start")
+
+    def __init__(self, kind: str, start: int):
+        self.kind = kind                 # "{" or "["
+        self.key: Any = 0 if kind == "[" else None
+        self.expect_key = kind == "{"    # next string in an object is a key
+        self.start = start               # offset of this container's "{" / "["
+
+
+class JsonStreamParser:
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.buf = ""
+        self.pos = 0
+        self.stack: List[_Frame] = []
+        self.started = False
+        self.done = False
+        self.in_string = False
+        self.escape = False
+        self.value_start: Optional[int] = None   # start of the current string/scalar
+        self.string_is_key = False
+
+    def _path(self) -> tuple:
+        return tuple(f.key for f in self.stack)
+
+    def _emit(self, out: list, start: int, end: int):
+        """Value buf[start:end] just completed inside the current container."""
+        path = self._path()
+        if 1 <= len(path) <= self.max_depth:
+            try:
+                out.append((path, json.loads(self.buf[start:end])))
+            except ValueError:
+                pass
+
+    def _end_scalar(self, out: list, end: int):
+        if self.value_start is not None:
+            self._emit(out, self.value_start, end)
+            self.value_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[tuple, Any]]:
+        """Add text; return (path, value) for values completed by this chunk."""
+        out: List[Tuple[tuple, Any]] = []
+        self.buf += chunk
+        buf = self.buf
+        i = self.pos
+        n = len(buf)
+
+        while i < n and not self.done:
+            ch = buf[i]
+
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self.stack.append(_Frame("{", i))
+                i += 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    frame = self.stack[-1]
+                    if self.string_is_key:
+                        try:
+                            frame.key = json.loads(buf[self.value_start:i + 1])
+                        except ValueError:
+                            frame.key = buf[self.value_start + 1:i]
+                        self.value_start = None
+                    else:
+                        self._end_scalar(out, i + 1)
+                i += 1
+                continue
+
+            frame = self.stack[-1]
+            if ch in _WS:
+                self._end_scalar(out, i)
+            elif ch == '"':
+                self.in_string = True
+                self.string_is_key = frame.kind == "{" and frame.expect_key
+                self.value_start = i
+            elif ch == ":":
+                frame.expect_key = False
+            elif ch == ",":
+                self._end_scalar(out, i)
+                if frame.kind == "{":
+                    frame.expect_key = True
+                else:
+                    frame.key += 1
+            elif ch in "{[":
+                self.stack.append(_Frame(ch, i))
+            elif ch in "}]":
+                self._end_scalar(out, i)
+                closed = self.stack.pop()
+                if not self.stack:
+                    self.done = True
+                else:
+                    self._emit(out, closed.start, i + 1)
+            elif self.value_start is None:
+                self.value_start = i  # number / true / false / null
+            i += 1
+
+        self.pos = i
+        return out
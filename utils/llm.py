@@ -1,43 +1,65 @@
 # utils/llm.py
 import json
 import os
+import time
+from types import SimpleNamespace
+from typing import Iterator
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from utils.llm_store import StoredClient
+from utils.llm_telemetry import TELEMETRY, llm_call
+
 # load .env so OPENAI_API_KEY is available
 load_dotenv()
 
-# If OPENAI_API_KEY is set, OpenAI() will pick it up automatically
-client = OpenAI()
+# If OPENAI_API_KEY is set, OpenAI() will pick it up automatically.
+# OPENAI_BASE_URL redirects calls, e.g. to scripts/mock_llm_server.py for offline runs.
+# Responses go through the on-disk store (MECC_LLM_STORE_MODE=record|replay|passthrough).
+client = StoredClient(OpenAI)
+# forked server workers (gunicorn.conf.py) must not share the parent's connections
+os.register_at_fork(after_in_child=client.reopen)
 
 
 json_path= "utils/rag_corpus.jsonl"
-def call_llm_structured(prompt: str, json_path: str) -> str:
+def call_llm_structured(prompt: str, json_path: str, caller: str = None) -> str:
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are an expert failure analysis assistant."},
-            {"role": "user", "content": prompt},
-            {"role": "user", "content": f"Here is the data:\n{json.dumps(data, indent=2)}"}
-        ],
-        temperature=0.2,
-    )
+    with llm_call(caller, override=False):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "You are an expert failure analysis assistant."},
+                {"role": "user", "content": prompt},
+                {"role": "user", "content": f"Here is the data:\n{json.dumps(data, indent=2)}"}
+            ],
+            temperature=0.2,
+        )
 
     return response.choices[0].message.content
 
 
-def call_llm(prompt: str, json_expected: bool = False) -> str:
-    """
-    Call an OpenAI chat model.
-    - prompt: full text prompt (we already include system-style text inside it)
-    - json_expected: if True, ask the model to return a single JSON object
-    """
+def json_object_text(content: str) -> str:
+    """Ensure we return a valid JSON string (the model may add text around it)."""
     try:
+        json.loads(content)
+    except Exception:
+        # crude cleanup if model added text around JSON
+        start = content.find("{")
+        end = content.rfind("}")
+        if start != -1 and end != -1 and end > start:
+            content = content[start : end + 1]
+        else:
+            content = "{}"
+    return content
+
+
+def _complete(prompt: str, json_expected: bool, caller: str = None) -> str:
+    """One non-streaming chat completion; errors propagate."""
+    with llm_call(caller, override=False):
         resp = client.chat.completions.create(
-            model="gpt-4.1-mini",   
+            model="gpt-4.1-mini",
             messages=[
                 {"role": "user", "content": prompt},
             ],
@@ -45,26 +67,75 @@ def call_llm(prompt: str, json_expected: bool = False) -> str:
             temperature=0.2,
         )
 
-        content = resp.choices[0].message.content or ""
+    content = resp.choices[0].message.content or ""
 
-        if json_expected:
-            # Try to ensure we return valid JSON string
-            try:
-                json.loads(content)
-            except Exception:
-                # crude cleanup if model added text around JSON
-                start = content.find("{")
-                end = content.rfind("}")
-                if start != -1 and end != -1 and end > start:
-                    content = content[start : end + 1]
-                else:
-                    content = "{}"
-
-        return content
+    if json_expected:
+        content = json_object_text(content)
+
+    return content
 
+
+def call_llm(prompt: str, json_expected: bool = False, caller: str = None) -> str:
+    """
+    Call an OpenAI chat model.
+    - prompt: full text prompt (we already include system-style text inside it)
+    - json_expected: if True, ask the model to return a single JSON object
+    - caller: name recorded in LLM telemetry (e.g. "reasoner"), unless an
+      enclosing llm_call() block already named the caller
+    """
+    try:
+        return _complete(prompt, json_expected, caller)
     except Exception as e:
         print("LLM call failed:", e)
         # return a JSON error string so pydantic doesn't completely explode
         if json_expected:
             return json.dumps({"error": str(e)})
         return f"ERROR: {e}"
+
+
+def stream_llm(prompt: str, json_expected: bool = False, caller: str = None) -> Iterator[str]:
+    """
+    Like call_llm, but yields the reply in pieces as the model produces them.
+    When the response store is recording/replaying, the whole stored reply
+    is yielded at once. Errors are raised to the consumer.
+    """
+    if client.mode != "passthrough":
+        # not call_llm: that turns errors into an error reply instead of raising
+        yield _complete(prompt, json_expected, caller)
+        return
+
+    model = "gpt-4.1-mini"
+    started = time.perf_counter()
+    ttft_ms = None
+    usage = None
+    try:
+        # context is only entered around calls, never across a yield
+        with llm_call(caller, override=False):
+            stream = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "user", "content": prompt},
+                ],
+                response_format={"type": "json_object"} if json_expected else None,
+                temperature=0.2,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if ttft_ms is None:
+                    ttft_ms = round((time.perf_counter() - started) * 1000, 2)
+                yield delta
+    except Exception as e:
+        with llm_call(caller, override=False):
+            TELEMETRY.record_call("chat.completions", model, started, error=e, ttft_ms=ttft_ms)
+        raise
+
+    with llm_call(caller, override=False):
+        TELEMETRY.record_call("chat.completions", model, started,
+                              resp=SimpleNamespace(usage=usage), ttft_ms=ttft_ms)
@@ -0,0 +1,255 @@
+# utils/llm_store.py
+"""
+Content-addressed on-disk store of LLM responses, for replay and offline runs.
+
+Wrap an OpenAI client with StoredClient and every chat.completions.create /
+responses.create call is keyed by a hash of its request (model, messages or
+input, temperature, response_format and any other generation parameters).
+Modes, picked with MECC_LLM_STORE_MODE:
+
+  passthrough  call the API, store nothing (default)
+  record       serve stored responses, call the API on a miss and store it
+  replay       serve stored responses only; a miss raises LLMStoreMiss,
+               so pipelines run fully offline (CI, benchmarks)
+
+Responses live zlib-compressed in SQLite (MECC_LLM_STORE_PATH). When the
+store grows past MECC_LLM_STORE_MAX_MB, least recently used responses are
+evicted. Every call, stored or not, is also reported to utils.llm_telemetry.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from utils.llm_telemetry import TELEMETRY
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_STORE_PATH = BASE_DIR / "data" / "llm_store" / "responses.sqlite"
+DEFAULT_MAX_MB = 512
+
+MODES = ("passthrough", "record", "replay")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    kind       TEXT NOT NULL,
+    model      TEXT,
+    body_z     BLOB NOT NULL,
+    size       INTEGER NOT NULL,
+    created    REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class LLMStoreMiss(RuntimeError):
+    """Replay mode and no stored response for this request."""
+
+
+def request_key(kind: str, params: dict) -> str:
+    """Stable hash of a request; key order and whitespace don't matter."""
+    canonical = json.dumps({"kind": kind, **params}, sort_keys=True,
+                           ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseStore:
+    """SQLite table of response bodies with LRU eviction by total size."""
+
+    def __init__(self, path: Path = DEFAULT_STORE_PATH, max_bytes: int = DEFAULT_MAX_MB << 20):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+
+    def reopen(self):
+        """Fresh lock and connection in a forked child (SQLite handles can't cross a fork)."""
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT body_z FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                    (time.time(), key),
+                )
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, kind: str, model: Optional[str], body: dict):
+        blob = zlib.compress(json.dumps(body, ensure_ascii=False).encode("utf-8"), 6)
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, model, body_z, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, model, blob, len(blob), now, now),
+            )
+            self._evict()
+
+    def total_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self):
+        """Drop least recently used responses until under 90% of max_bytes."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self) -> dict:
+        count, size, hits = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+        ).fetchone()
+        return {"responses": count, "bytes": size, "hits": hits, "max_bytes": self.max_bytes}
+
+
+def _to_namespace(obj):
+    if isinstance(obj, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return [_to_namespace(v) for v in obj]
+    return obj
+
+
+def _rebuild(kind: str, body: dict):
+    """Turn a stored body back into the SDK's response object."""
+    try:
+        if kind == "chat.completions":
+            from openai.types.chat import ChatCompletion
+            return ChatCompletion.model_validate(body)
+        from openai.types.responses import Response
+        return Response.model_validate(body)
+    except Exception:
+        # older/newer SDK shapes: attribute access is all callers need
+        return _to_namespace(body)
+
+
+def _dump(resp) -> dict:
+    if hasattr(resp, "model_dump"):
+        return resp.model_dump(mode="json")
+    return json.loads(json.dumps(resp, default=lambda o: o.__dict__))
+
+
+class _Endpoint:
+    def __init__(self, owner: "StoredClient", kind: str, resolve: Callable):
+        self._owner = owner
+        self._kind = kind
+        self._resolve = resolve  # real client -> real endpoint
+
+    def create(self, **kwargs):
+        return self._owner._call(self._kind, self._resolve, kwargs)
+
+
+class StoredClient:
+    """
+    Drop-in wrapper for an OpenAI client that records/replays responses.
+    The real client is only built (via make_client) when a request has to
+    reach the API, so replay mode works without an API key.
+    """
+
+    def __init__(self, make_client: Callable, mode: Optional[str] = None,
+                 store: Optional[ResponseStore] = None):
+        self._make_client = make_client
+        self._client = None
+        self.mode = (mode or os.environ.get("MECC_LLM_STORE_MODE") or "passthrough").lower()
+        if self.mode not in MODES:
+            raise ValueError(f"MECC_LLM_STORE_MODE must be one of {MODES}, got {self.mode!r}")
+        self._store = store
+        self.chat = SimpleNamespace(completions=_Endpoint(
+            self, "chat.completions", lambda c: c.chat.completions))
+        self.responses = _Endpoint(self, "responses", lambda c: c.responses)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._make_client()
+        return self._client
+
+    @property
+    def store(self) -> ResponseStore:
+        if self._store is None:
+            path = os.environ.get("MECC_LLM_STORE_PATH") or DEFAULT_STORE_PATH
+            max_mb = int(os.environ.get("MECC_LLM_STORE_MAX_MB") or DEFAULT_MAX_MB)
+            self._store = ResponseStore(Path(path), max_bytes=max_mb << 20)
+        return self._store
+
+    def reopen(self):
+        """
+        After fork: drop the real client (its HTTP connection pool belongs to
+        the parent) and reopen the store; both are rebuilt on next use.
+        """
+        self._client = None
+        if self._store is not None:
+            self._store.reopen()
+
+    def __getattr__(self, name):
+        # anything we don't intercept goes to the real client
+        return getattr(self.client, name)
+
+    def _call(self, kind: str, resolve: Callable, kwargs: dict):
+        started = time.perf_counter()
+        model = kwargs.get("model")
+        try:
+            resp, hit = self._lookup_or_call(kind, resolve, kwargs)
+        except Exception as e:
+            TELEMETRY.record_call(kind, model, started, error=e)
+            raise
+        if not kwargs.get("stream"):
+            # streams are recorded by whoever consumes them (TTFT is only known there)
+            TELEMETRY.record_call(kind, model, started, resp=resp, cache_hit=hit)
+        return resp
+
+    def _lookup_or_call(self, kind: str, resolve: Callable, kwargs: dict):
+        """(response, served_from_store)"""
+        if self.mode == "passthrough" or kwargs.get("stream"):
+            return resolve(self.client).create(**kwargs), False
+
+        key = request_key(kind, kwargs)
+        body = self.store.get(key)
+        if body is not None:
+            resp = _rebuild(kind, body)
+            try:
+                setattr(resp, "_from_store", True)
+            except Exception:
+                pass
+            return resp, True
+
+        if self.mode == "replay":
+            raise LLMStoreMiss(f"no stored response for {kind} request {key[:12]} "
+                               f"(model={kwargs.get('model')})")
+
+        resp = resolve(self.client).create(**kwargs)
+        self.store.put(key, kind, kwargs.get("model"), _dump(resp))
+        return resp, False
+
+
+def from_store(resp) -> bool:
+    """True if a response object was served from the store."""
+    return bool(getattr(resp, "_from_store", False))
+
+
+if __name__ == "__main__":
+    # python -m utils.llm_store  -> size and hit counts of the current store
+    print(StoredClient(lambda: None, mode="record").store.stats())
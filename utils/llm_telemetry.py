@@ -0,0 +1,282 @@
+# utils/llm_telemetry.py
+"""
+Per-call LLM telemetry: who called, which model, tokens, latency, cost.
+
+Every request that goes through utils.llm_store.StoredClient produces one
+CallRecord. Callers describe themselves with the llm_call() context manager
+(caller name, request id, attempt number, time spent queued); the client
+fills in model, usage, latency and whether the response came from the store.
+
+Records are kept in an in-process aggregator (TELEMETRY) that summarizes
+percentiles per caller, and appended to a JSONL sink (MECC_LLM_TELEMETRY,
+default data/telemetry/llm_calls.jsonl; "off" disables the file).
+
+Report from a sink file:
+    python -m utils.llm_telemetry [path] [--since-hours 24]
+"""
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from utils.metrics import LLM_CALLS, LLM_SECONDS, LLM_TOKENS, observe_span, percentile
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_SINK_PATH = BASE_DIR / "data" / "telemetry" / "llm_calls.jsonl"
+
+# USD per 1M tokens (input, output); unknown models report no cost
+PRICES = {
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+_context: contextvars.ContextVar = contextvars.ContextVar("llm_call_context", default={})
+
+
+@dataclass
+class CallRecord:
+    ts: float
+    caller: str
+    model: Optional[str]
+    endpoint: str
+    request_id: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    queue_wait_ms: Optional[float] = None
+    ttft_ms: Optional[float] = None       # streaming calls only
+    latency_ms: float = 0.0
+    attempt: int = 1                       # 1 = first try; retries = attempt - 1
+    cache_hit: bool = False
+    ok: bool = True
+    error: Optional[str] = None
+    cost_usd: Optional[float] = None
+
+
+@contextmanager
+def llm_call(caller: Optional[str] = None, override: bool = True, **fields):
+    """
+    Describe the LLM calls made inside the block. Nested blocks inherit and
+    override (e.g. request_id set per HTTP request, caller set per agent).
+    With override=False the caller only applies if no outer block set one.
+    Recognised fields: request_id, attempt, queue_wait_ms.
+    """
+    ctx = dict(_context.get())
+    if caller is not None and (override or "caller" not in ctx):
+        ctx["caller"] = caller
+    ctx.update(fields)
+    token = _context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _context.reset(token)
+
+
+def current_context() -> dict:
+    return _context.get()
+
+
+def cost_usd(model: Optional[str], prompt_tokens: Optional[int],
+             completion_tokens: Optional[int]) -> Optional[float]:
+    price = PRICES.get(model or "")
+    if price is None or prompt_tokens is None:
+        return None
+    return round((prompt_tokens * price[0] + (completion_tokens or 0) * price[1]) / 1e6, 6)
+
+
+def usage_tokens(resp) -> tuple:
+    """(prompt_tokens, completion_tokens) from a chat or responses usage block."""
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return None, None
+    prompt = getattr(usage, "prompt_tokens", None)
+    if prompt is None:
+        prompt = getattr(usage, "input_tokens", None)
+    completion = getattr(usage, "completion_tokens", None)
+    if completion is None:
+        completion = getattr(usage, "output_tokens", None)
+    return prompt, completion
+
+
+def summarize(records: Iterable[dict]) -> Dict[str, dict]:
+    """Per-caller counts, latency/TTFT percentiles, mean tokens and total cost."""
+    groups: Dict[str, List[dict]] = defaultdict(list)
+    for r in records:
+        groups[r.get("caller") or "unknown"].append(r)
+
+    out = {}
+    for caller, recs in sorted(groups.items()):
+        # store hits answer in ~0 ms; they'd drag the percentiles toward zero
+        lat = [r["latency_ms"] for r in recs if r.get("ok") and not r.get("cache_hit")]
+        ttft = [r["ttft_ms"] for r in recs if r.get("ttft_ms") is not None]
+        wait = [r["queue_wait_ms"] for r in recs if r.get("queue_wait_ms") is not None]
+        prompt = [r["prompt_tokens"] for r in recs if r.get("prompt_tokens") is not None]
+        completion = [r["completion_tokens"] for r in recs if r.get("completion_tokens") is not None]
+        costs = [r["cost_usd"] for r in recs if r.get("cost_usd") is not None]
+        out[caller] = {
+            "calls": len(recs),
+            "errors": sum(1 for r in recs if not r.get("ok")),
+            "retries": sum(1 for r in recs if (r.get("attempt") or 1) > 1),
+            "cache_hits": sum(1 for r in recs if r.get("cache_hit")),
+            "latency_p50_ms": percentile(lat, 50),
+            "latency_p95_ms": percentile(lat, 95),
+            "ttft_p50_ms": percentile(ttft, 50),
+            "ttft_p95_ms": percentile(ttft, 95),
+            "queue_wait_p95_ms": percentile(wait, 95),
+            "prompt_tokens_avg": round(sum(prompt) / len(prompt), 1) if prompt else None,
+            "completion_tokens_avg": round(sum(completion) / len(completion), 1) if completion else None,
+            "cost_usd": round(sum(costs), 4) if costs else None,
+        }
+    return out
+
+
+def tokens_per_request(records: Iterable[dict]) -> Optional[float]:
+    """Mean prompt+completion tokens per request_id (e.g. one /api/analyze call)."""
+    per_req: Dict[str, int] = defaultdict(int)
+    for r in records:
+        if r.get("request_id"):
+            per_req[r["request_id"]] += (r.get("prompt_tokens") or 0) + (r.get("completion_tokens") or 0)
+    if not per_req:
+        return None
+    return round(sum(per_req.values()) / len(per_req), 1)
+
+
+def _export(rec: CallRecord):
+    """Feed /metrics and the current request's Server-Timing (llm_<caller> span)."""
+    outcome = "cache_hit" if rec.cache_hit else "ok" if rec.ok else "error"
+    LLM_CALLS.inc(1, rec.caller, outcome)
+    LLM_TOKENS.inc(rec.prompt_tokens or 0, rec.caller, "prompt")
+    LLM_TOKENS.inc(rec.completion_tokens or 0, rec.caller, "completion")
+    if not rec.cache_hit:
+        LLM_SECONDS.observe(rec.latency_ms / 1000, rec.caller, rec.model or "unknown")
+    observe_span(f"llm_{rec.caller}", rec.latency_ms / 1000)
+
+
+class Telemetry:
+    """Thread-safe in-process aggregator with an optional JSONL sink."""
+
+    def __init__(self, sink_path: Optional[Path] = None, keep: int = 10000):
+        self.sink_path = Path(sink_path) if sink_path else None
+        self.records: deque = deque(maxlen=keep)
+        self.lock = threading.Lock()
+        self._fh = None
+
+    def record(self, rec: CallRecord):
+        row = asdict(rec)
+        _export(rec)
+        with self.lock:
+            self.records.append(row)
+            if self.sink_path is not None:
+                if self._fh is None:
+                    self.sink_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._fh = self.sink_path.open("a", encoding="utf-8")
+                self._fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+                self._fh.flush()
+
+    def record_call(self, endpoint: str, model: Optional[str], started: float,
+                    resp=None, error: Optional[BaseException] = None,
+                    cache_hit: bool = False, ttft_ms: Optional[float] = None):
+        """Build a CallRecord from the current llm_call() context and store it."""
+        ctx = current_context()
+        prompt, completion = usage_tokens(resp) if resp is not None else (None, None)
+        self.record(CallRecord(
+            ts=time.time(),
+            caller=ctx.get("caller", "unknown"),
+            model=model,
+            endpoint=endpoint,
+            request_id=ctx.get("request_id"),
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            queue_wait_ms=ctx.get("queue_wait_ms"),
+            ttft_ms=ttft_ms,
+            latency_ms=round((time.perf_counter() - started) * 1000, 2),
+            attempt=ctx.get("attempt", 1),
+            cache_hit=cache_hit,
+            ok=error is None,
+            error=str(error) if error is not None else None,
+            cost_usd=0.0 if cache_hit else cost_usd(model, prompt, completion),
+        ))
+
+    def reset_after_fork(self):
+        """A forked worker reports its own calls, through its own file handle."""
+        self.lock = threading.Lock()
+        self.records.clear()
+        self._fh = None
+
+    def snapshot(self) -> List[dict]:
+        with self.lock:
+            return list(self.records)
+
+    def summary(self) -> dict:
+        recs = self.snapshot()
+        return {"callers": summarize(recs), "tokens_per_request": tokens_per_request(recs)}
+
+
+def _sink_from_env() -> Optional[Path]:
+    value = os.environ.get("MECC_LLM_TELEMETRY", "")
+    if value.lower() == "off":
+        return None
+    return Path(value) if value else DEFAULT_SINK_PATH
+
+
+TELEMETRY = Telemetry(_sink_from_env())
+os.register_at_fork(after_in_child=TELEMETRY.reset_after_fork)
+
+
+def load_records(path: Path, since: Optional[float] = None) -> List[dict]:
+    records = []
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if since is None or rec.get("ts", 0) >= since:
+                records.append(rec)
+    return records
+
+
+def _fmt(v, nd=0) -> str:
+    if v is None:
+        return "-"
+    return f"{v:.{nd}f}" if isinstance(v, float) else str(v)
+
+
+def print_report(records: List[dict]):
+    rows = summarize(records)
+    print(f"{'caller':28s} {'calls':>6s} {'err':>4s} {'retry':>5s} {'hit':>4s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'ttft95':>7s} {'in tok':>7s} {'out tok':>7s} {'cost $':>8s}")
+    for caller, s in rows.items():
+        print(f"{caller:28s} {s['calls']:6d} {s['errors']:4d} {s['retries']:5d} {s['cache_hits']:4d} "
+              f"{_fmt(s['latency_p50_ms']):>8s} {_fmt(s['latency_p95_ms']):>8s} "
+              f"{_fmt(s['ttft_p95_ms']):>7s} {_fmt(s['prompt_tokens_avg']):>7s} "
+              f"{_fmt(s['completion_tokens_avg']):>7s} {_fmt(s['cost_usd'], 4):>8s}")
+    tpr = tokens_per_request(records)
+    if tpr is not None:
+        print(f"\ntokens per request (by request_id): {tpr}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Summarize LLM call telemetry per caller.")
+    ap.add_argument("path", nargs="?", default=str(DEFAULT_SINK_PATH))
+    ap.add_argument("--since-hours", type=float, default=None,
+                    help="only include calls from the last N hours")
+    args = ap.parse_args()
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    records = load_records(Path(args.path), since)
+    if not records:
+        print(f"No telemetry records in {args.path}")
+        return
+    print_report(records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# utils/metrics.py
+"""
+In-process latency histograms and counters, plus per-request timing spans.
+
+    with span("faiss_search"):
+        ...
+
+records the stage's duration in the mecc_stage_seconds histogram and, when
+a request is being tracked (start_request()), in that request's span list.
+app.py turns the list into a Server-Timing header, and /metrics renders
+every metric in Prometheus text format (no client library needed).
+
+The span list lives in a contextvar. Work handed to a thread pool through
+contextvars.copy_context().run appends to the same list, so stages run
+concurrently also show up in Server-Timing.
+
+Metrics are collected per process (series are cleared in a forked worker,
+so the master's warm-up doesn't show up in every worker). With several
+worker processes, set MECC_METRICS_DIR (gunicorn.conf.py does): each worker
+then writes its series to <dir>/<pid>.json every MECC_METRICS_FLUSH_S
+seconds (start_snapshots) and /metrics renders the sum over all files, so
+whichever worker answers a scrape reports server-wide totals. The master
+folds an exited worker's file into <dir>/retired.json (retire), so
+counters never go down when workers are recycled.
+"""
+import copy
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# seconds; covers sub-ms vector search up to multi-second LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(x: float) -> str:
+    if x == math.inf:
+        return "+Inf"
+    return repr(float(x)) if not float(x).is_integer() else str(int(x))
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help = name, help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.lock = threading.Lock()
+        # label values -> (bucket counts, sum, count)
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        key = tuple(str(v) for v in labels)
+        with self.lock:
+            s = self.series.get(key)
+            if s is None:
+                s = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[0][i] += 1
+                    break
+            s[1] += value
+            s[2] += 1
+
+    def render(self, series: Optional[dict] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, n) in sorted((series if series is not None else self.series).items()):
+                cumulative = 0
+                for b, c in zip(self.buckets, counts):
+                    cumulative += c
+                    le = f'le="{_fmt(b)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name, self.help = name, help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str):
+        key = tuple(str(v) for v in labels)
+        with self.lock:
+            self.series[key] = self.series.get(key, 0.0) + amount
+
+    def render(self, series: Optional[dict] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, v in sorted((series if series is not None else self.series).items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(v)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help, labelnames))
+
+    def reset(self):
+        for m in self.metrics.values():
+            m.lock = threading.Lock()
+            m.series.clear()
+
+    def snapshot(self) -> Dict[str, list]:
+        """Every series as JSON-able [labels, value] pairs, by metric name."""
+        out = {}
+        for name, m in self.metrics.items():
+            with m.lock:
+                out[name] = [[list(k), copy.deepcopy(v)] for k, v in m.series.items()]
+        return out
+
+    def render(self, merged: Optional[Dict[str, dict]] = None) -> str:
+        """This process's series, or merged ones (see render_metrics)."""
+        lines: List[str] = []
+        for name, m in self.metrics.items():
+            lines.extend(m.render(merged.get(name, {}) if merged is not None else None))
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+os.register_at_fork(after_in_child=METRICS.reset)
+
+STAGE_SECONDS = METRICS.histogram(
+    "mecc_stage_seconds", "Duration of pipeline stages.", ["stage"])
+HTTP_SECONDS = METRICS.histogram(
+    "mecc_http_request_seconds", "HTTP request duration (handler time).", ["endpoint", "status"])
+LLM_SECONDS = METRICS.histogram(
+    "mecc_llm_call_seconds", "LLM call latency by caller.", ["caller", "model"])
+LLM_CALLS = METRICS.counter(
+    "mecc_llm_calls_total", "LLM calls by caller and outcome.", ["caller", "outcome"])
+LLM_TOKENS = METRICS.counter(
+    "mecc_llm_tokens_total", "LLM tokens by caller and kind.", ["caller", "kind"])
+SPECULATION_RUNS = METRICS.counter(
+    "mecc_speculation_total", "Speculative agent runs by outcome (hit, miss, error).", ["outcome"])
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not values:
+        return None
+    vals = sorted(values)
+    idx = max(0, min(len(vals) - 1, math.ceil(q / 100.0 * len(vals)) - 1))
+    return vals[idx]
+
+
+# ---- several worker processes ----
+METRICS_DIR = os.environ.get("MECC_METRICS_DIR", "")
+RETIRED = "retired.json"
+
+
+def _add(a, b):
+    # counter values add up; histogram values are [bucket counts, sum, count]
+    if isinstance(a, list):
+        return [_add(x, y) for x, y in zip(a, b)]
+    return a + b
+
+
+def _merge(snapshots: Iterable[Dict[str, list]]) -> Dict[str, dict]:
+    merged: Dict[str, dict] = {}
+    for snap in snapshots:
+        for name, pairs in snap.items():
+            series = merged.setdefault(name, {})
+            for labels, value in pairs:
+                key = tuple(labels)
+                series[key] = _add(series[key], value) if key in series else value
+    return merged
+
+
+def _read(path: Path) -> Dict[str, list]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}  # gone (retired) or not written yet
+
+
+def _write(path: Path, snap: Dict[str, list]):
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(snap), encoding="utf-8")
+    os.replace(tmp, path)  # readers never see half a file
+
+
+def write_snapshot(directory: str = METRICS_DIR):
+    """Publish this process's series as <directory>/<pid>.json."""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    _write(path / f"{os.getpid()}.json", METRICS.snapshot())
+
+
+def start_snapshots(interval_s: float, directory: str = METRICS_DIR) -> threading.Thread:
+    """Write a snapshot every interval_s seconds from a daemon thread."""
+    def run():
+        while True:
+            try:
+                write_snapshot(directory)
+            except OSError as e:
+                print("[metrics] snapshot failed:", e)
+            time.sleep(interval_s)
+
+    t = threading.Thread(target=run, name="metrics-snapshot", daemon=True)
+    t.start()
+    return t
+
+
+def retire(pid: int, directory: str = METRICS_DIR):
+    """Fold an exited worker's last snapshot into retired.json (master only)."""
+    path = Path(directory)
+    src = path / f"{pid}.json"
+    if not src.exists():
+        return
+    merged = _merge([_read(path / RETIRED), _read(src)])
+    _write(path / RETIRED, {name: [[list(k), v] for k, v in series.items()]
+                            for name, series in merged.items()})
+    src.unlink()
+
+
+def render_metrics() -> str:
+    """Prometheus text for /metrics: summed over all workers when METRICS_DIR is set."""
+    if not METRICS_DIR:
+        return METRICS.render()
+    write_snapshot()
+    return METRICS.render(_merge(_read(p) for p in Path(METRICS_DIR).glob("*.json")))
+
+
+# ---- per-request spans ----
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("mecc_spans", default=None)
+
+
+def start_request() -> List[Tuple[str, float]]:
+    """Track spans for the current request (call once per request)."""
+    spans: List[Tuple[str, float]] = []
+    _spans.set(spans)
+    return spans
+
+
+def request_spans() -> List[Tuple[str, float]]:
+    return list(_spans.get() or [])
+
+
+def observe_span(stage: str, seconds: float):
+    """Record a stage that was timed elsewhere (e.g. an LLM call)."""
+    STAGE_SECONDS.observe(seconds, stage)
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_span(stage, time.perf_counter() - t0)
+
+
+def span_totals(spans: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Milliseconds per stage name (repeated stages summed), in first-seen order."""
+    out: Dict[str, float] = {}
+    for stage, seconds in spans:
+        out[stage] = out.get(stage, 0.0) + seconds * 1000
+    return {k: round(v, 1) for k, v in out.items()}
+
+
+def server_timing(spans: List[Tuple[str, float]], total_s: Optional[float] = None) -> str:
+    """Server-Timing header value, e.g. 'embed_query;dur=11.8, faiss_search;dur=0.7'."""
+    parts = [f"{stage};dur={ms}" for stage, ms in span_totals(spans).items()]
+    if total_s is not None:
+        parts.append(f"total;dur={round(total_s * 1000, 1)}")
+    return ", ".join(parts)
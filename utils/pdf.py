@@ -0,0 +1,150 @@
+# utils/pdf.py
+"""
+Page-level PDF text extraction with a persistent on-disk cache.
+
+Every script that reads PDFs (handbook, case reports, API 571) goes through
+extract_pages()/extract_text(). Page text is stored zlib-compressed in a
+small SQLite file keyed by (file hash, page number, extractor version), so
+re-running an ingestion step on unchanged PDFs never opens pdfplumber.
+
+Set MECC_PDF_CACHE to move the cache file, or MECC_PDF_CACHE=off to disable it.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from importlib import metadata
+from pathlib import Path
+from typing import List, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_CACHE_PATH = BASE_DIR / "data" / "pdf_cache" / "pages.sqlite"
+
+# Bump when the way we call the extractor changes (options, post-processing)
+EXTRACTOR_REVISION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    file_hash  TEXT NOT NULL,
+    extractor  TEXT NOT NULL,
+    num_pages  INTEGER NOT NULL,
+    PRIMARY KEY (file_hash, extractor)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    file_hash  TEXT NOT NULL,
+    page_no    INTEGER NOT NULL,
+    extractor  TEXT NOT NULL,
+    text_z     BLOB NOT NULL,
+    PRIMARY KEY (file_hash, page_no, extractor)
+) WITHOUT ROWID;
+"""
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+
+
+def extractor_version() -> str:
+    """Identifies the extractor so a pdfplumber upgrade invalidates old pages."""
+    try:
+        lib = metadata.version("pdfplumber")
+    except metadata.PackageNotFoundError:
+        lib = "unknown"
+    return f"pdfplumber-{lib}/r{EXTRACTOR_REVISION}"
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_path() -> Optional[Path]:
+    env = os.environ.get("MECC_PDF_CACHE")
+    if env and env.lower() in ("0", "off", "false", "none"):
+        return None
+    return Path(env) if env else DEFAULT_CACHE_PATH
+
+
+def _get_conn() -> Optional[sqlite3.Connection]:
+    global _conn
+    path = _cache_path()
+    if path is None:
+        return None
+    if _conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(path), check_same_thread=False)
+        _conn.executescript(_SCHEMA)
+    return _conn
+
+
+def _read_cached(conn: sqlite3.Connection, fhash: str, extractor: str) -> Optional[List[str]]:
+    row = conn.execute(
+        "SELECT num_pages FROM docs WHERE file_hash = ? AND extractor = ?",
+        (fhash, extractor),
+    ).fetchone()
+    if row is None:
+        return None
+
+    num_pages = row[0]
+    rows = conn.execute(
+        "SELECT page_no, text_z FROM pages WHERE file_hash = ? AND extractor = ? ORDER BY page_no",
+        (fhash, extractor),
+    ).fetchall()
+    if len(rows) != num_pages:
+        return None  # partially written entry, re-extract
+    return [zlib.decompress(z).decode("utf-8") for _, z in rows]
+
+
+def _write_cached(conn: sqlite3.Connection, fhash: str, extractor: str, pages: List[str]):
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO pages (file_hash, page_no, extractor, text_z) VALUES (?, ?, ?, ?)",
+            [(fhash, i + 1, extractor, zlib.compress(t.encode("utf-8"), 6)) for i, t in enumerate(pages)],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO docs (file_hash, extractor, num_pages) VALUES (?, ?, ?)",
+            (fhash, extractor, len(pages)),
+        )
+
+
+def _extract_with_pdfplumber(pdf_path: Path) -> List[str]:
+    import pdfplumber  # only needed on a cache miss
+
+    pages = []
+    with pdfplumber.open(str(pdf_path)) as pdf:
+        for p in pdf.pages:
+            pages.append(p.extract_text() or "")
+    return pages
+
+
+def extract_pages(pdf_path) -> List[str]:
+    """
+    Return the text of every page of a PDF (index 0 = page 1).
+    Served from the cache when this exact file was extracted before.
+    """
+    pdf_path = Path(pdf_path)
+    fhash = file_hash(pdf_path)
+    extractor = extractor_version()
+
+    with _lock:
+        conn = _get_conn()
+        if conn is not None:
+            cached = _read_cached(conn, fhash, extractor)
+            if cached is not None:
+                return cached
+
+    pages = _extract_with_pdfplumber(pdf_path)
+
+    with _lock:
+        conn = _get_conn()
+        if conn is not None:
+            _write_cached(conn, fhash, extractor, pages)
+    return pages
+
+
+def extract_text(pdf_path, sep: str = "\n\n", start_page: int = 1) -> str:
+    """Join page texts from start_page (1-based) onwards with sep."""
+    return sep.join(extract_pages(pdf_path)[start_page - 1:])
@@ -0,0 +1,31 @@
+# utils/pools.py
+"""
+Thread pools that survive os.fork().
+
+A forked gunicorn worker inherits a ThreadPoolExecutor object but none of
+its threads, so work submitted to it would never run. ForkSafePool wraps
+an executor and replaces it with a fresh one in the child (at-fork hook);
+module-level pools can be created once at import time and used as is.
+"""
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class ForkSafePool:
+    """ThreadPoolExecutor.submit() with a new executor in every forked child."""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = ""):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = self._new()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _new(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.max_workers,
+                                  thread_name_prefix=self.thread_name_prefix)
+
+    def _after_fork(self):
+        self._executor = self._new()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self._executor.submit(fn, *args, **kwargs)